@@ -9,12 +9,24 @@ No business logic should exist in routes.
 
 import os
 from pathlib import Path
-from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, HTTPException, UploadFile, File
+from starlette.concurrency import run_in_threadpool
 
+from app.config import settings
 from app.models.audit import AuditResult, AuditStatus
 from app.services import audit_service
-from app.services.audit_service import AUDIT_STORE, process_audit_pipeline
-from app.services.aws_service import upload_file_to_s3, delete_multiple_files_from_s3, AWSServiceError
+from app.services.audit_service import audit_store, audit_job_queue
+from app.services.job_queue import QueueFullError, QueueClosedError
+from app.services.aws_service import AWSServiceError
+from app.services.upload_service import (
+    discard_upload,
+    gather_or_cancel,
+    normalize_bill_upload,
+    receive_document,
+    receive_photographed_bill,
+    upload_files_to_s3_concurrently,
+    UploadTooLargeError,
+)
 
 
 router = APIRouter()
@@ -22,7 +34,7 @@ router = APIRouter()
 # Upload configuration
 UPLOAD_DIR = Path("uploads")
 ALLOWED_EXTENSIONS = {".pdf"}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_FILE_SIZE = settings.max_file_size_mb * 1024 * 1024
 
 
 @router.post("/start")
@@ -47,16 +59,20 @@ async def upload_documents(
     
     Rules:
     - Only allowed when audit status == "created"
-    - Files saved to disk immediately
-    - Paths stored in audit session
+    - Files streamed in chunks (constant memory per upload), either to
+      disk then S3, or straight into S3 when upload_mode == "s3_stream"
+    - Photographed bills (JPEG/PNG) are normalized on disk before going
+      to S3 (EXIF rotation, crop, downscale, re-encode); before/after
+      sizes are stored as bill_normalization
+    - Paths, S3 keys and content hashes stored in audit session
     - No processing happens here (deferred to /complete)
     """
     
     # 1. Validate audit exists and status
-    if audit_id not in AUDIT_STORE:
+    audit = audit_store.get(audit_id)
+    if audit is None:
         raise HTTPException(status_code=404, detail="Audit not found")
     
-    audit = AUDIT_STORE[audit_id]
     if audit["status"] != AuditStatus.CREATED:
         raise HTTPException(
             status_code=400,
@@ -75,54 +91,92 @@ async def upload_documents(
     if policy_ext != 'pdf':
         raise HTTPException(status_code=400, detail=f"Policy must be PDF, got .{policy_ext}")
     
-    # 3. Validate file sizes
-    bill_content = await bill.read()
-    policy_content = await policy.read()
+    bill_s3_key = f"audits/{audit_id}/bill.pdf"
+    policy_s3_key = f"audits/{audit_id}/policy.pdf"
+    normalize_bill = bill_ext != 'pdf' and settings.image_normalization_enabled
     
-    if len(bill_content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="Bill file too large (max 10MB)")
-    if len(policy_content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="Policy file too large (max 10MB)")
-    
-    # 4. Create upload directory for this audit
+    # 3. Create upload directory for this audit (skipped when streaming
+    #    straight to S3 without a local fallback, unless a photo needs
+    #    normalizing on disk first)
     audit_upload_dir = UPLOAD_DIR / audit_id
-    audit_upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # 5. Save files to disk (for local processing)
     bill_path = audit_upload_dir / "bill.pdf"
     policy_path = audit_upload_dir / "policy.pdf"
     
-    bill_path.write_bytes(bill_content)
-    policy_path.write_bytes(policy_content)
+    stream_to_s3 = settings.upload_mode == "s3_stream"
+    if not stream_to_s3 or settings.upload_local_fallback or normalize_bill:
+        audit_upload_dir.mkdir(parents=True, exist_ok=True)
+    
+    bill_normalization = None
+    sent_to_s3 = stream_to_s3
     
-    # 6. Upload files to S3 for cloud processing
+    # 4. Receive files in chunks, enforcing size limits as we go
+    #    (never holds a whole document in memory)
     try:
-        bill_s3_key = f"audits/{audit_id}/bill.pdf"
-        policy_s3_key = f"audits/{audit_id}/policy.pdf"
+        if stream_to_s3:
+            # Both documents stream into S3 concurrently
+            if normalize_bill:
+                bill_task = receive_photographed_bill(bill, bill_path, audit_id, MAX_FILE_SIZE)
+            else:
+                bill_task = receive_document(bill, "Bill", bill_path, bill_s3_key, MAX_FILE_SIZE)
+            bill_result, policy_receipt = await gather_or_cancel(
+                bill_task,
+                receive_document(policy, "Policy", policy_path, policy_s3_key, MAX_FILE_SIZE)
+            )
+            if normalize_bill:
+                bill_receipt, bill_normalization = bill_result
+            else:
+                bill_receipt = bill_result
+            upload_timings = {"bill": bill_receipt.elapsed_ms, "policy": policy_receipt.elapsed_ms}
+        else:
+            bill_receipt = await receive_document(bill, "Bill", bill_path, bill_s3_key, MAX_FILE_SIZE)
+            if normalize_bill:
+                bill_receipt, bill_normalization = await normalize_bill_upload(bill_receipt, audit_id)
+            policy_receipt = await receive_document(policy, "Policy", policy_path, policy_s3_key, MAX_FILE_SIZE)
+            
+            # 5. Copy saved files to S3 concurrently, off the event loop
+            sent_to_s3 = True
+            upload_timings = await upload_files_to_s3_concurrently({
+                "bill": (bill_receipt.path, bill_receipt.s3_key or bill_s3_key),
+                "policy": (policy_receipt.path, policy_s3_key)
+            })
         
-        upload_file_to_s3(str(bill_path.absolute()), bill_s3_key)
-        upload_file_to_s3(str(policy_path.absolute()), policy_s3_key)
-        
-        # Store both local and S3 paths
-        audit["bill_path"] = str(bill_path.absolute())
-        audit["policy_path"] = str(policy_path.absolute())
-        audit["bill_s3_key"] = bill_s3_key
-        audit["policy_s3_key"] = policy_s3_key
-        
-    except AWSServiceError as e:
-        # Cleanup local files if S3 upload fails
-        bill_path.unlink(missing_ok=True)
-        policy_path.unlink(missing_ok=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to upload files to S3: {str(e)}"
-        )
+    except Exception as e:
+        # Whatever failed (client, disk, S3, ...), remove anything already
+        # stored for this upload before reporting the error
+        await run_in_threadpool(discard_upload, audit_id, audit_upload_dir, sent_to_s3)
+        if isinstance(e, UploadTooLargeError):
+            raise HTTPException(
+                status_code=400,
+                detail=f"{e.label or 'Upload'} file too large (max {settings.max_file_size_mb}MB)"
+            )
+        if isinstance(e, AWSServiceError):
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to upload files to S3: {str(e)}"
+            )
+        raise
+    
+    # 6. Store local paths (if kept), S3 keys and content hashes
+    audit_store.update(
+        audit_id,
+        bill_path=bill_receipt.path,
+        policy_path=policy_receipt.path,
+        bill_s3_key=bill_receipt.s3_key or bill_s3_key,
+        policy_s3_key=policy_s3_key,
+        bill_sha256=bill_receipt.sha256,
+        policy_sha256=policy_receipt.sha256,
+        bill_normalization=bill_normalization
+    )
     
     # 7. Return success (status remains "created")
     return {
         "message": "Files uploaded successfully",
-        "bill_size_kb": round(len(bill_content) / 1024, 2),
-        "policy_size_kb": round(len(policy_content) / 1024, 2),
+        "bill_size_kb": round(bill_receipt.size_bytes / 1024, 2),
+        "policy_size_kb": round(policy_receipt.size_bytes / 1024, 2),
+        "bill_sha256": bill_receipt.sha256,
+        "policy_sha256": policy_receipt.sha256,
+        "upload_timings_ms": upload_timings,
+        "bill_normalization": bill_normalization,
         "status": audit["status"]
     }
 
@@ -168,41 +222,20 @@ def get_audit_result(audit_id: str):
     return result
 
 
-def run_audit_background(audit_id: str, bill_path: str, policy_path: str, bill_s3_key: str, policy_s3_key: str):
-    """Helper to run the pipeline in background"""
-    print(f"🚀 Starting Background Audit: {audit_id}")
-    try:
-        audit = AUDIT_STORE[audit_id]
-        result = process_audit_pipeline(
-            audit_id=audit_id,
-            bill_path=bill_path,
-            policy_path=policy_path,
-            bill_s3_key=bill_s3_key,
-            policy_s3_key=policy_s3_key
-        )
-        audit["result"] = result
-        audit["status"] = AuditStatus.COMPLETED
-        print(f"✅ Background Audit Finished: {audit_id}")
-    except Exception as e:
-        print(f"❌ Background Audit Failed: {e}")
-        audit = AUDIT_STORE.get(audit_id)
-        if audit:
-            audit["status"] = AuditStatus.FAILED
-            audit["error"] = str(e)
-
 @router.post("/{audit_id}/complete")
-def complete_audit(audit_id: str, background_tasks: BackgroundTasks):
+def complete_audit(audit_id: str):
     """
     Trigger audit processing pipeline (Async).
     
-    Phase 4.2: Now uses BackgroundTasks to avoid browser timeout
+    Phase 4.2: Runs in the background to avoid browser timeout.
+    Jobs go through a bounded worker pool; when the queue is full the
+    request is rejected with 429 + Retry-After instead of piling up.
     """
     
-    if audit_id not in AUDIT_STORE:
+    audit = audit_store.get(audit_id)
+    if audit is None:
         raise HTTPException(status_code=404, detail="Audit not found")
     
-    audit = AUDIT_STORE[audit_id]
-    
     # Validate status
     if audit["status"] != AuditStatus.CREATED:
         raise HTTPException(
@@ -210,25 +243,29 @@ def complete_audit(audit_id: str, background_tasks: BackgroundTasks):
             detail=f"Cannot complete. Status is '{audit['status']}', expected 'created'"
         )
     
-    # Validate files uploaded
-    if not audit.get("bill_path") or not audit.get("policy_path"):
+    # Validate files uploaded (local paths are absent in s3_stream mode)
+    if not audit.get("bill_s3_key") or not audit.get("policy_s3_key"):
         raise HTTPException(
             status_code=400,
             detail="Files not uploaded. Call /upload first"
         )
     
-    # Set processing status
-    audit["status"] = AuditStatus.PROCESSING
-    
-    # Schedule background task
-    background_tasks.add_task(
-        run_audit_background,
-        audit_id,
-        audit["bill_path"],
-        audit["policy_path"],
-        audit.get("bill_s3_key"),
-        audit.get("policy_s3_key")
-    )
+    try:
+        # Reserve a queue slot first so a full queue leaves the audit untouched
+        with audit_job_queue.reserve() as slot:
+            # Set processing status (atomic: a concurrent /complete loses the race)
+            if not audit_store.transition(audit_id, AuditStatus.CREATED, AuditStatus.PROCESSING):
+                raise HTTPException(status_code=409, detail="Audit is already being processed")
+            
+            position = slot.submit(audit_id)
+            
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many audits in progress. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except QueueClosedError:
+        raise HTTPException(status_code=503, detail="Server is shutting down. Please retry shortly.")
     
-    return {"message": "Audit processing started in background"}
-
+    return {"message": "Audit processing started in background", "queue_position": position}
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services import metrics
+from app.services.audit_service import audit_job_queue
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Process metrics in Prometheus text format (OCR routing, engines, timings)"""
+    queue = audit_job_queue.stats()
+    gauges = "".join(
+        f"# TYPE audit_queue_{name} gauge\naudit_queue_{name} {value}\n"
+        for name, value in queue.items()
+        if isinstance(value, (int, float))
+    )
+    return metrics.render_prometheus() + gauges
+
+
+@router.get("/metrics.json")
+def get_metrics_json():
+    """Same metrics as JSON"""
+    return {**metrics.snapshot(), "audit_queue": audit_job_queue.stats()}
@@ -17,7 +17,7 @@ from fastapi import UploadFile, File, HTTPException
 
 from app.api.routes.audit import router
 from app.models.audit import AuditStatus
-from app.services.audit_service import AUDIT_STORE
+from app.services.audit_service import audit_store
 
 # Configuration
 UPLOAD_DIR = Path("uploads")
@@ -45,10 +45,10 @@ async def upload_documents(
     """
     
     # 1. Validate audit exists and status
-    if audit_id not in AUDIT_STORE:
+    audit = audit_store.get(audit_id)
+    if audit is None:
         raise HTTPException(status_code=404, detail="Audit not found")
     
-    audit = AUDIT_STORE[audit_id]
     if audit["status"] != AuditStatus.CREATED:
         raise HTTPException(
             status_code=400,
@@ -85,8 +85,11 @@ async def upload_documents(
     policy_path.write_bytes(policy_content)
     
     # 6. Store PATHS in audit session (not file objects!)
-    audit["bill_path"] = str(bill_path.absolute())
-    audit["policy_path"] = str(policy_path.absolute())
+    audit_store.update(
+        audit_id,
+        bill_path=str(bill_path.absolute()),
+        policy_path=str(policy_path.absolute())
+    )
     
     # 7. Return success (status remains "created")
     return {
@@ -10,6 +10,135 @@ class Settings(BaseSettings):
     # File storage
     upload_dir: str = "./uploads"
     max_file_size_mb: int = 10
+    upload_chunk_size_kb: int = 256
+    
+    # Upload mode: "disk" (save locally, then copy to S3) or
+    # "s3_stream" (pipe uploads straight into S3 multipart uploads)
+    upload_mode: str = "disk"
+    upload_local_fallback: bool = False  # s3_stream only: also tee to local disk
+    s3_multipart_part_size_mb: int = 8   # S3 minimum is 5MB
+    s3_multipart_concurrency: int = 4
+    s3_transfer_workers: int = 8         # shared pool for off-loop S3 transfers
+    
+    # Audit session store: "memory" (single process) or "sqlite"
+    # (survives restarts, shared by multiple workers)
+    audit_store_backend: str = "memory"
+    audit_store_path: str = "./data/audits.db"
+    audit_store_ttl_hours: int = 24
+    audit_store_max_entries: int = 1000   # memory backend only
+    
+    # Audit job queue (bounded worker pool for the pipeline)
+    audit_workers: int = 2
+    audit_queue_max_depth: int = 20
+    audit_queue_retry_after_seconds: int = 30   # used until job timings exist
+    audit_queue_drain_timeout_seconds: int = 60
+    
+    # "inprocess" (threads in the API) or "durable" (SQLite queue drained
+    # by `python -m app.worker` processes; needs audit_store_backend="sqlite")
+    audit_job_backend: str = "inprocess"
+    audit_job_queue_path: str = "./data/jobs.db"
+    audit_job_visibility_timeout_seconds: int = 900   # reclaim jobs of dead workers
+    audit_job_max_attempts: int = 2
+    worker_poll_interval_seconds: float = 1.0
+    
+    # Photographed bills (JPEG/PNG): EXIF rotate, crop to the paper, downscale
+    # and re-encode before upload
+    image_normalization_enabled: bool = True
+    image_max_long_edge_px: int = 3500         # ~300 DPI for an A4 page
+    image_jpeg_quality: int = 85
+    
+    # OCR result cache (SHA-256 of uploaded bytes -> Textract text + metadata)
+    ocr_cache_enabled: bool = True
+    ocr_cache_dir: str = "./cache/ocr"
+    ocr_cache_max_mb: int = 512
+    
+    # Parsed-policy cache (model + prompt version + policy text -> parsed dict)
+    policy_cache_enabled: bool = True
+    policy_cache_dir: str = "./cache/policy"
+    policy_cache_max_mb: int = 64
+    
+    # Bedrock response cache (whole request -> response), memory + disk tiers;
+    # deterministic calls (temperature 0) only, see services/cache/llm_cache.py
+    llm_cache_enabled: bool = True
+    llm_cache_dir: str = "./cache/llm"
+    llm_cache_max_mb: int = 256
+    llm_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_cache_memory_entries: int = 256        # per process
+    
+    # Born-digital PDF fast path (pypdf text layer instead of Textract)
+    text_layer_enabled: bool = True
+    text_layer_min_quality: float = 0.8        # per page, 0..1 (see ocr/text_layer.py)
+    text_layer_min_chars_per_page: int = 20
+    ocr_page_workers: int = 4                  # parallel Textract calls for scanned pages
+    
+    # Long scanned PDFs: OCR page ranges concurrently instead of one big job
+    ocr_shard_min_pages: int = 8               # shard fully scanned PDFs this long or longer
+    ocr_shard_pages: int = 5                   # pages per shard
+    ocr_shard_concurrency: int = 8             # shards in flight per document
+    textract_max_tps: float = 5.0              # shared Textract request rate limit
+    
+    # One Nova Lite call for policy limits + header metadata once both OCRs
+    # are done; bill items are still structured as soon as the bill OCR is
+    # (False: the three split calls)
+    combined_extraction_enabled: bool = True
+    # Also fold bill items into that call: one Nova Lite call instead of
+    # two, but bill structuring no longer overlaps the policy OCR. Worth it
+    # when the policy is usually cached or both OCRs finish together
+    combined_extraction_include_bill: bool = False
+    
+    # Prompt budgets (~tokens) for OCR text sent to Nova Lite: cleaned, and
+    # over budget, only the sections most relevant to the task (see
+    # services/ai/prompt_compaction.py). Disabled: plain truncation.
+    prompt_compaction_enabled: bool = True
+    prompt_bill_tokens: int = 4000
+    prompt_policy_tokens: int = 4000
+    prompt_header_tokens: int = 1250
+    
+    # Policies over prompt_policy_tokens: parse section-aware chunks
+    # concurrently and merge (map-reduce) instead of compacting
+    policy_map_reduce_enabled: bool = True
+    policy_chunk_tokens: int = 3000
+    policy_chunk_concurrency: int = 4
+    
+    # Nova Pro audit sampling temperature. 0.0: the same claim gets the same
+    # audit, and it can be served from the LLM cache. None: model default
+    # (sampled, never cached)
+    audit_temperature: Optional[float] = 0.0
+    
+    # Stream the Nova Pro audit and publish each line item's flag as soon as
+    # it is parsed (partial_flags on GET /status)
+    audit_streaming_enabled: bool = True
+    # partial_flags are written every N items or every T seconds (one
+    # store write each), plus once when the stream ends
+    audit_partial_flush_items: int = 10
+    audit_partial_flush_seconds: float = 0.5
+    
+    # OCR engine for pages without a text layer: "textract" or "tesseract"
+    # (offline; needs pytesseract, opencv-python and the tesseract binary)
+    ocr_engine: str = "textract"
+    tesseract_lang: str = "eng"
+    tesseract_workers: int = 2                 # processes for page-parallel recognition
+    tesseract_preprocess: bool = True          # OpenCV denoise / binarize / deskew
+    
+    # Scanned bills: text + line items from one Textract TABLES analysis
+    # (LLM only for unresolved rows); born-digital bills never call Textract
+    bill_table_extraction_enabled: bool = True
+    
+    # Async Textract jobs (tracked on one event loop, exponential backoff)
+    textract_poll_initial_seconds: float = 0.5
+    textract_poll_max_seconds: float = 5.0
+    textract_job_timeout_seconds: int = 300
+    textract_api_workers: int = 4        # threads for the blocking boto3 calls
+    
+    # boto3 clients (one pooled client per service per process, see
+    # services/aws_clients.py)
+    aws_max_pool_connections: int = 50        # boto3 default is 10
+    aws_retry_mode: str = "adaptive"          # retries + client-side throttling
+    aws_max_attempts: int = 5
+    aws_connect_timeout_seconds: float = 5.0
+    aws_read_timeout_seconds: float = 60.0
+    bedrock_read_timeout_seconds: float = 300.0   # long model generations
+    aws_tcp_keepalive: bool = True
     
     # AWS Configuration (Phase 4.2)
     aws_access_key_id: Optional[str] = None
@@ -1,13 +1,32 @@
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import audit, health
+from starlette.concurrency import run_in_threadpool
+from app.api.routes import audit, health, metrics
 from app.config import settings
+from app.services import audit_service
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI(title=settings.app_name, debug=settings.debug)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start audit workers; on shutdown stop intake and drain queued audits
+    # Warn at startup, not mid-audit, if boto3 cannot stream the audit
+    audit_service.audit_streaming_active()
+    audit_service.audit_job_queue.start()
+    yield
+    abandoned = await run_in_threadpool(
+        audit_service.audit_job_queue.shutdown,
+        settings.audit_queue_drain_timeout_seconds
+    )
+    for audit_id in abandoned:
+        audit_service.fail_audit(audit_id, "Server shut down before the audit could run")
+
+
+app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -21,6 +40,7 @@ app.add_middleware(
 # Routes
 app.include_router(health.router, tags=["Health"])
 app.include_router(audit.router, prefix="/audit", tags=["Audit"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 
 @app.get("/")
@@ -0,0 +1,110 @@
+"""
+Incremental JSON Item Parser - Line Items from a Streaming LLM Response
+
+The audit response is one JSON object whose "structured_bill.items" array
+holds an entry per line item. While the model is still streaming, each
+item can be parsed as soon as its closing brace arrives, so audit flags
+reach the client long before the full response is done.
+
+Responsibilities:
+- Scan text chunks once, tracking strings / escapes and nesting
+- Emit every complete object of any array under `array_key` ("items"),
+  or of a top-level array (models sometimes return only the items)
+- Keep the whole text for the final json.loads
+
+NOT responsible for:
+- Validating items or the final document (callers do that)
+- Code fences and prose around the JSON (skipped, since they are outside
+  any object)
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+class JsonItemStream:
+    """
+    Example:
+        >>> stream = JsonItemStream()
+        >>> stream.feed('{"structured_bill": {"items": [{"description": "Glo')
+        []
+        >>> stream.feed('ves", "amount": 500}, {"desc')
+        [{'description': 'Gloves', 'amount': 500}]
+    """
+
+    def __init__(self, array_key: str = "items"):
+        self.array_key = array_key
+        self._chunks: List[str] = []
+        self._pending = ""             # text of the item being read
+        # One frame per open container: {"kind": "object"|"array", "key": ...}
+        # ("key" of an object = key being read; of an array = its own key)
+        self._stack: List[Dict[str, Any]] = []
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_string: Optional[str] = None
+        self._item_depth: Optional[int] = None
+        self.items_emitted = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def _is_item_array(self, frame: Dict[str, Any]) -> bool:
+        return frame["kind"] == "array" and (frame["key"] == self.array_key or len(self._stack) == 1)
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add text; return the items completed by it (in order)"""
+        self._chunks.append(chunk)
+        completed = []
+        for char in chunk:
+            if self._item_depth is not None:
+                self._pending += char
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = "".join(self._string)
+                    continue
+                self._string.append(char)
+                continue
+
+            if char == '"':
+                # Quotes in prose around the JSON are not strings
+                if self._stack:
+                    self._in_string = True
+                    self._string = []
+            elif char == ":":
+                if self._stack and self._stack[-1]["kind"] == "object":
+                    self._stack[-1]["key"] = self._last_string
+            elif char == ",":
+                if self._stack and self._stack[-1]["kind"] == "object":
+                    self._stack[-1]["key"] = None
+            elif char == "{":
+                if self._item_depth is None and self._stack and self._is_item_array(self._stack[-1]):
+                    self._item_depth = len(self._stack)
+                    self._pending = char
+                self._stack.append({"kind": "object", "key": None})
+            elif char == "[":
+                parent = self._stack[-1] if self._stack else None
+                key = parent["key"] if parent and parent["kind"] == "object" else None
+                self._stack.append({"kind": "array", "key": key})
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if char == "}" and self._item_depth == len(self._stack):
+                    self._item_depth = None
+                    try:
+                        item = json.loads(self._pending)
+                    except ValueError:
+                        item = None
+                    self._pending = ""
+                    if isinstance(item, dict):
+                        completed.append(item)
+                        self.items_emitted += 1
+        return completed
@@ -0,0 +1,265 @@
+"""
+Prompt Compaction - Token-Budgeted OCR Text for Nova Lite Prompts
+
+The structuring prompts used to send the first 15,000 (or 5,000)
+characters of each document. On long policies that is mostly boilerplate
+and can cut off the limits table; on short bills it still includes page
+furniture and whitespace. Compaction cleans the text, then, only if it is
+still over budget, keeps the sections most relevant to the extraction
+task, in document order.
+
+Responsibilities:
+- Clean: page furniture ("Page 3 of 12", "Continued..."), repeated
+  running headers / footers (first occurrence kept), whitespace runs
+- Split into sections at headings, capping section size
+- Rank sections per task (limits, exclusions, PED, line items, header)
+  and pack them into a token budget
+- Chunk long documents at section boundaries for map-reduce parsing
+
+NOT responsible for:
+- Exact token counts (estimated at ~4 characters per token; budgets are
+  approximate by design)
+
+Bill rows legitimately repeat ("Room Rent" once per day), so repeated
+lines are only dropped when the task does not read line items.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence
+
+from app.config import settings
+from app.services import metrics
+
+CHARS_PER_TOKEN = 4
+
+# Keywords per extraction task (matched case-insensitively on word boundaries)
+TASK_KEYWORDS: Dict[str, Sequence[str]] = {
+    "limits": (
+        "sum insured", "room rent", "limit", "limits", "sub-limit", "sublimit", "co-pay", "copay",
+        "co-payment", "deductible", "per day", "maximum", "capped", "icu", "coverage", "per annum",
+        "up to", "upto", "% of", "table of benefits", "schedule of benefits",
+    ),
+    "exclusions": (
+        "exclusion", "exclusions", "excluded", "not covered", "not payable", "non-payable",
+        "non payable", "shall not", "waiting period", "irdai", "list i", "annexure",
+    ),
+    "ped": (
+        "pre-existing", "pre existing", "ped", "disease", "diseases", "declared", "waiting period",
+        "illness", "diabetes", "hypertension",
+    ),
+    "line_items": (
+        "amount", "qty", "quantity", "rate", "total", "charges", "charge", "rs", "inr", "₹",
+        "pharmacy", "room", "consultation", "investigation", "consumables", "surgery",
+    ),
+    "header": (
+        "policy no", "policy number", "policy holder", "insured", "insurer", "insurance", "patient",
+        "bill no", "invoice", "date", "address", "hospital", "branch", "uhid", "name",
+    ),
+}
+
+# Tasks where the document header matters (names, numbers, dates live there)
+_POSITION_TASKS = {"header"}
+
+_PAGE_FURNITURE = re.compile(
+    r"^\s*(?:[-–]?\s*page\s*\d+\s*(?:(?:of|/)\s*\d+)?\s*[-–]?|[-–]\s*\d+\s*[-–]|"
+    r"(?:continued|contd\.?)(?:\s+(?:on|from)\s+(?:next|previous)\s+page)?\.*)\s*$",
+    re.IGNORECASE,
+)
+_HEADING = re.compile(
+    r"^\s*(?:(?:section|clause|article|part|schedule|annexure|chapter)\b.{0,70}|"
+    r"\d+(?:\.\d+)*[.)]?\s+[A-Z][^.]{0,70})\s*$",
+    re.IGNORECASE,
+)
+# "Policy Wording | Page 3 of 12" -> "Policy Wording |" (then matches on every page)
+_INLINE_PAGE_NUMBER = re.compile(r"\bpage\s*\d+\s*(?:of|/)\s*\d+\b", re.IGNORECASE)
+_AMOUNT = re.compile(r"\d[\d,]*(?:\.\d{1,2})?")
+_KEYWORD_PATTERNS = {
+    task: re.compile(r"(?<!\w)(?:" + "|".join(re.escape(k) for k in keywords) + r")(?!\w)", re.IGNORECASE)
+    for task, keywords in TASK_KEYWORDS.items()
+}
+
+
+@dataclass
+class Section:
+    index: int                 # position in the document
+    text: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def clean_ocr_text(text: str, drop_repeated: bool = True, min_repeats: int = 3) -> str:
+    """
+    Remove page furniture, repeated running headers / footers (keeping the
+    first occurrence) and whitespace runs.
+    """
+    lines = [line for line in (text or "").splitlines() if not _PAGE_FURNITURE.match(line)]
+    lines = [" ".join(_INLINE_PAGE_NUMBER.sub("", line).split()) for line in lines]
+
+    if drop_repeated:
+        # Exact repeats only: clauses / table rows that differ in a number
+        # are different content
+        counts = Counter(line.lower() for line in lines if len(line) >= 8)
+        repeated = {line for line, n in counts.items() if n >= min_repeats}
+        seen = set()
+        kept = []
+        for line in lines:
+            key = line.lower()
+            if key in repeated:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+        lines = kept
+
+    cleaned = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", cleaned).strip()
+
+
+def _is_heading(line: str) -> bool:
+    letters = [c for c in line if c.isalpha()]
+    if not letters or len(line) > 80:
+        return False
+    # ALL-CAPS lines ("EXCLUSIONS", "TABLE OF BENEFITS") or numbered / named headings
+    return (len(letters) >= 4 and line.upper() == line) or bool(_HEADING.match(line))
+
+
+def _pieces(line: str, max_chars: int) -> List[str]:
+    """A line cut at spaces into pieces of at most max_chars"""
+    pieces = []
+    while len(line) > max_chars:
+        cut = line.rfind(" ", 0, max_chars + 1)
+        cut = cut if cut > 0 else max_chars
+        pieces.append(line[:cut])
+        line = line[cut:].lstrip()
+    return pieces + [line] if line else pieces
+
+
+def split_sections(text: str, max_tokens: int = 400) -> List[Section]:
+    """
+    Sections start at headings (or blank lines); sections longer than
+    max_tokens are split at line boundaries.
+    """
+    blocks: List[List[str]] = [[]]
+    for line in text.splitlines():
+        if not line.strip():
+            if blocks[-1]:
+                blocks.append([])
+            continue
+        if _is_heading(line) and blocks[-1]:
+            blocks.append([])
+        blocks[-1].append(line)
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    sections: List[Section] = []
+    for block in blocks:
+        current: List[str] = []
+        size = 0
+        for line in (piece for line in block for piece in _pieces(line, max_chars)):
+            if current and size + len(line) + 1 > max_chars:
+                sections.append(Section(len(sections), "\n".join(current)))
+                current, size = [], 0
+            current.append(line)
+            size += len(line) + 1
+        if current:
+            sections.append(Section(len(sections), "\n".join(current)))
+    return sections
+
+
+def score_section(section: Section, tasks: Iterable[str], total_sections: int = 1) -> float:
+    """Keyword density for the tasks (+ amounts for line items, + position for header)"""
+    text = section.text
+    length = max(1.0, math.sqrt(section.tokens))
+    score = 0.0
+    for task in tasks:
+        hits = len(_KEYWORD_PATTERNS[task].findall(text))
+        if task in ("line_items", "limits"):
+            hits += 0.5 * len(_AMOUNT.findall(text))
+        score += hits / length
+        if task in _POSITION_TASKS:
+            score += 2.0 * (1 - section.index / max(1, total_sections))
+    return score
+
+
+def compact_text(text: str, tasks: Sequence[str], token_budget: int) -> str:
+    """
+    OCR text for a prompt, within ~token_budget tokens.
+
+    Example:
+        >>> compact_text(policy_text, ("limits", "ped", "header"), 4000)
+    """
+    text = text or ""
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    if not settings.prompt_compaction_enabled:
+        return text[:budget_chars]
+
+    cleaned = clean_ocr_text(text, drop_repeated="line_items" not in tasks)
+    if estimate_tokens(cleaned) <= token_budget:
+        return cleaned
+
+    sections = split_sections(cleaned)
+    ranked = sorted(
+        sections,
+        key=lambda s: (score_section(s, tasks, len(sections)), -s.index),
+        reverse=True
+    )
+
+    chosen: List[Section] = []
+    used = 0
+    for section in ranked:
+        cost = len(section.text) + 2
+        if used + cost <= budget_chars:
+            chosen.append(section)
+            used += cost
+        elif not chosen:
+            # Best section alone is over budget: keep its beginning
+            chosen.append(Section(section.index, section.text[:budget_chars]))
+            break
+
+    chosen.sort(key=lambda s: s.index)
+    parts = []
+    for prev, section in zip([None] + chosen[:-1], chosen):
+        if prev is not None and section.index != prev.index + 1:
+            parts.append("[...]")
+        parts.append(section.text)
+    compacted = "\n\n".join(parts)
+    metrics.increment(
+        "prompt_compaction_tokens_saved_total", {"tasks": "/".join(tasks)},
+        value=max(0, estimate_tokens(text) - estimate_tokens(compacted))
+    )
+    print(
+        f"✂️ Compacted text for {'/'.join(tasks)}: ~{estimate_tokens(text)} -> ~{estimate_tokens(compacted)} tokens "
+        f"({len(chosen)}/{len(sections)} sections)"
+    )
+    return compacted
+
+
+def chunk_text(text: str, chunk_tokens: int) -> List[str]:
+    """
+    Cleaned text cut into consecutive chunks of at most ~chunk_tokens,
+    at section boundaries (a section is only split if it alone is larger).
+
+    Example:
+        >>> chunk_text(policy_text, 3000)    # 60-page wording -> ~12 chunks
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+    for section in split_sections(clean_ocr_text(text), max_tokens=chunk_tokens):
+        cost = len(section.text) + 2
+        if current and used + cost > chunk_tokens * CHARS_PER_TOKEN:
+            chunks.append("\n\n".join(current))
+            current, used = [], 0
+        current.append(section.text)
+        used += cost
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
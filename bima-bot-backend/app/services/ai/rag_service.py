@@ -5,12 +5,16 @@ Performs full claim audit using AWS Bedrock Knowledge Base and Nova Pro.
 This replaces generic RAG retrieval with a specialized "Audit" agent.
 """
 
-import boto3
 import os
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
 from dotenv import load_dotenv
 
+from app.config import settings
+from app.services.aws_clients import LazyClient
+from app.services.ai.json_stream import JsonItemStream
+from app.services.cache import cached_retrieve_and_generate, cached_retrieve_and_generate_stream
+
 load_dotenv()
 
 # Bedrock Knowledge Base configuration
@@ -18,11 +22,27 @@ REGION = os.getenv('AWS_REGION', 'us-east-1')
 KB_ID = os.getenv('BEDROCK_KB_ID', 'OIAANDNCSY')  # Default from user request
 MODEL_ARN = os.getenv('BEDROCK_MODEL_ARN', 'arn:aws:bedrock:us-east-1::foundation-model/amazon.nova-pro-v1:0')
 
-agent = boto3.client('bedrock-agent-runtime', region_name=REGION)
+agent = LazyClient('bedrock-agent-runtime', region_name=REGION)
 
-def audit_claim(bill_data: Dict[str, Any], policy_limits: Dict[str, Any]) -> Dict[str, Any]:
-    print(f"⚖️  Nova Pro: Running Deep Audit with Specific Explanations...")
- 
+# Whether the installed boto3 can stream RetrieveAndGenerate; checked once
+_streaming_supported: Optional[bool] = None
+
+
+def audit_streaming_supported() -> bool:
+    """
+    True if the bedrock-agent-runtime client has retrieve_and_generate_stream
+    (boto3 1.35.72+). Checked on first call; warns once if it is missing.
+    """
+    global _streaming_supported
+    if _streaming_supported is None:
+        _streaming_supported = hasattr(agent, "retrieve_and_generate_stream")
+        if not _streaming_supported:
+            print("⚠️ Installed boto3 has no retrieve_and_generate_stream (needs 1.35.72+); audits will not stream")
+    return _streaming_supported
+
+
+def _audit_request(bill_data: Dict[str, Any], policy_limits: Dict[str, Any]) -> Dict[str, Any]:
+    """retrieve_and_generate arguments for the audit prompt"""
     prompt = f"""
     You are a Senior Insurance Auditor AI.
  
@@ -68,53 +88,110 @@ def audit_claim(bill_data: Dict[str, Any], policy_limits: Dict[str, Any]) -> Dic
     - Ensure 'reason' in 'items' is specific to that item, do not repeat the same explanation for multiple items.
     """
  
-    try:
-        response = agent.retrieve_and_generate(
-            input={'text': prompt},
-            retrieveAndGenerateConfiguration={
-                'type': 'KNOWLEDGE_BASE',
-                'knowledgeBaseConfiguration': {
-                    'knowledgeBaseId': KB_ID,
-                    'modelArn': MODEL_ARN
-                }
-            }
-        )
- 
-        raw_text = response['output']['text']
-        json_str = raw_text.replace("```json", "").replace("```", "").strip()
-        data = json.loads(json_str)
- 
-        # --- THE SAFETY FIX ---
-        # If AI returns a list (e.g., just the items), we wrap it to prevent the crash
-        if isinstance(data, list):
-            print("⚠️ Warning: AI returned a list. Wrapping in default structure.")
-            return {
-                "audit_summary": {"status": "Format Warning", "total_bill_amount": "Unknown", "amount_requiring_review": 0},
-                "structured_bill": {"items": data}, # Assuming the list is the items list
-                "explanations": []
-            }
- 
-        # If AI returns a dict but missed the keys, we add safe defaults
-        if isinstance(data, dict):
-            if "structured_bill" not in data:
-                data["structured_bill"] = {"items": []}
-            if "audit_summary" not in data:
-                data["audit_summary"] = {"status": "Processed", "total_bill_amount": 0, "amount_requiring_review": 0}
-            return data
+    kb_config = {'knowledgeBaseId': KB_ID, 'modelArn': MODEL_ARN}
+    # settings.audit_temperature: 0.0 (default) makes the audit repeatable
+    # and cacheable; None keeps the model's default sampling, uncached
+    if settings.audit_temperature is not None:
+        kb_config['generationConfiguration'] = {
+            'inferenceConfig': {'textInferenceConfig': {'temperature': settings.audit_temperature}}
+        }
+    return {
+        'input': {'text': prompt},
+        'retrieveAndGenerateConfiguration': {
+            'type': 'KNOWLEDGE_BASE',
+            'knowledgeBaseConfiguration': kb_config
+        }
+    }
+
+def _parse_audit_response(raw_text: str) -> Dict[str, Any]:
+    """
+    Audit JSON from the model's text, with safe defaults for missing keys.
+    
+    Raises:
+        ValueError: If the text is not a JSON object or list
+    """
+    json_str = raw_text.replace("```json", "").replace("```", "").strip()
+    data = json.loads(json_str)
  
+    # --- THE SAFETY FIX ---
+    # If AI returns a list (e.g., just the items), we wrap it to prevent the crash
+    if isinstance(data, list):
+        print("⚠️ Warning: AI returned a list. Wrapping in default structure.")
         return {
-            "audit_summary": {"status": "Error", "total_bill_amount": 0, "amount_requiring_review": 0},
-            "structured_bill": {"items": []},
+            "audit_summary": {"status": "Format Warning", "total_bill_amount": "Unknown", "amount_requiring_review": 0},
+            "structured_bill": {"items": data}, # Assuming the list is the items list
             "explanations": []
         }
  
+    # If AI returns a dict but missed the keys, we add safe defaults
+    if isinstance(data, dict):
+        if "structured_bill" not in data:
+            data["structured_bill"] = {"items": []}
+        if "audit_summary" not in data:
+            data["audit_summary"] = {"status": "Processed", "total_bill_amount": 0, "amount_requiring_review": 0}
+        return data
+ 
+    raise ValueError(f"Expected a JSON object or list, got {type(data).__name__}")
+
+def _audit_from_response(response: Dict[str, Any]) -> Dict[str, Any]:
+    # Parsed before the LLM cache stores the response, so a malformed
+    # audit is not replayed
+    return _parse_audit_response(response['output']['text'])
+ 
+def _audit_error(message: str) -> Dict[str, Any]:
+    return {
+        "audit_summary": {"status": "Error", "message": message, "total_bill_amount": 0, "amount_requiring_review": 0},
+        "structured_bill": {"items": []},
+        "explanations": []
+    }
+
+def audit_claim(bill_data: Dict[str, Any], policy_limits: Dict[str, Any]) -> Dict[str, Any]:
+    print(f"⚖️  Nova Pro: Running Deep Audit with Specific Explanations...")
+    try:
+        return cached_retrieve_and_generate(agent, parse=_audit_from_response, **_audit_request(bill_data, policy_limits))
     except Exception as e:
         print(f"❌ Audit JSON Generation Failed: {e}")
-        return {
-            "audit_summary": {"status": "Error", "message": str(e), "total_bill_amount": 0, "amount_requiring_review": 0},
-            "structured_bill": {"items": []},
-            "explanations": []
-        }
+        return _audit_error(str(e))
+
+def audit_claim_stream(
+    bill_data: Dict[str, Any],
+    policy_limits: Dict[str, Any],
+    on_item: Callable[[Dict[str, Any]], None]
+) -> Dict[str, Any]:
+    """
+    Same audit as audit_claim, streamed: on_item gets each audited line
+    item (in order) as soon as the model has finished writing it, long
+    before the whole response is done.
+    
+    Returns the full audit JSON, like audit_claim. If the stream cannot be
+    opened, the audit is retried without streaming. Callers check
+    audit_streaming_supported first; a client without the streaming
+    operation is not a stream failure.
+    """
+    print(f"⚖️  Nova Pro: Streaming Deep Audit...")
+    items = JsonItemStream()
+    
+    def on_text(chunk):
+        for item in items.feed(chunk):
+            on_item(item)
+    
+    try:
+        audit_json = cached_retrieve_and_generate_stream(
+            agent, on_text, parse=_audit_from_response, **_audit_request(bill_data, policy_limits)
+        )
+    except ValueError as e:
+        # The stream completed but the audit JSON did not parse
+        print(f"❌ Audit JSON Generation Failed: {e}")
+        return _audit_error(str(e))
+    except Exception as e:
+        if items.items_emitted:
+            print(f"❌ Audit stream failed after {items.items_emitted} item(s): {e}")
+            return _audit_error(str(e))
+        print(f"⚠️ Audit stream unavailable, retrying without streaming: {e}")
+        return audit_claim(bill_data, policy_limits)
+    
+    print(f"⚖️  Nova Pro: {items.items_emitted} item(s) streamed")
+    return audit_json
 
 # Keep original function for backward compatibility if needed, or redirect
 def get_rag_explanation(query: str) -> Optional[str]:
@@ -1,12 +1,87 @@
-import boto3
+import hashlib
 import json
 import os
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+from app.config import settings
+from app.services.aws_clients import LazyClient
+from app.services.ai.prompt_compaction import chunk_text, clean_ocr_text, compact_text, estimate_tokens
+from app.services.cache import DiskCache, cached_converse
+from app.services.ingestion.bill_table_parser import parse_amount
 
 REGION = os.getenv('AWS_REGION', 'us-east-1')
 # Nova Lite is fast and perfect for extraction
 MODEL_ID = "amazon.nova-lite-v1:0" 
 
-bedrock = boto3.client('bedrock-runtime', region_name=REGION)
+# Bump whenever the parse_policy_limits prompt or output handling changes,
+# so cached policies parsed with the old prompt are not reused
+POLICY_PROMPT_VERSION = 2
+
+# Same for the extract_combined prompt. Its policy results are cached
+# under their own key and never handed to parse_policy_limits callers
+COMBINED_PROMPT_VERSION = 2
+
+# Extraction tasks per document (see prompt_compaction.TASK_KEYWORDS)
+BILL_TASKS = ("line_items",)
+POLICY_TASKS = ("header", "limits", "ped")
+HEADER_TASKS = ("header",)
+
+bedrock = LazyClient('bedrock-runtime', region_name=REGION)
+
+# Parsed policies, shared by all workers on the host and kept across restarts.
+# Most traffic is a few hundred popular policy wordings.
+_policy_cache = (
+    DiskCache(settings.policy_cache_dir, settings.policy_cache_max_mb * 1024 * 1024)
+    if settings.policy_cache_enabled else None
+)
+
+def _normalize_policy_text(policy_text: str) -> str:
+    """Collapse whitespace so OCR layout jitter doesn't defeat the cache"""
+    return re.sub(r"\s+", " ", policy_text or "").strip()
+
+def _policy_cache_key(policy_text: str, prompt: str = "policy") -> str:
+    """Key by model, prompt ("policy" / "combined") and that prompt's version"""
+    version = COMBINED_PROMPT_VERSION if prompt == "combined" else POLICY_PROMPT_VERSION
+    material = f"{MODEL_ID}\n{prompt}:{version}\n{_normalize_policy_text(policy_text)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def _cached_policy(cache_key: Optional[str]) -> Optional[dict]:
+    cached = _policy_cache.get(cache_key) if cache_key else None
+    return cached["policy"] if cached is not None else None
+
+def _response_json(response):
+    """JSON from a converse response's text (code fences stripped)"""
+    response_text = response['output']['message']['content'][0]['text']
+    clean_json = response_text.replace("```json", "").replace("```", "").strip()
+    return json.loads(clean_json)
+
+def _response_object(response) -> dict:
+    """
+    Raises:
+        ValueError: If the response is not a JSON object (nothing is
+                    stored in the LLM cache)
+    """
+    data = _response_json(response)
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+    return data
+
+def _bill_items(response) -> dict:
+    data = _response_json(response)
+    
+    # --- SAFETY FIX 1: Handle List Return ---
+    if isinstance(data, list):
+        return {"items": data}
+    
+    # --- SAFETY FIX 2: Empty/Bad Dict is an error, not an empty bill ---
+    if isinstance(data, dict) and "items" in data:
+        return data
+    raise ValueError("Expected {\"items\": [...]} or a list of items")
 
 def structure_and_categorize(raw_text):
     print(f"🧠 Nova Lite: Structuring Bill Data...")
@@ -22,7 +97,7 @@ def structure_and_categorize(raw_text):
     3. Assign a 'category' from: [Room Rent, Pharmacy, Consumables, Surgery, Doctor Fees, Diagnostics, Admin, Other].
     
     RAW TEXT:
-    {raw_text[:15000]}
+    {compact_text(raw_text, BILL_TASKS, settings.prompt_bill_tokens)}
     
     OUTPUT FORMAT (JSON ONLY):
     {{
@@ -34,27 +109,13 @@ def structure_and_categorize(raw_text):
     """
     
     try:
-        response = bedrock.converse(
+        return cached_converse(
+            bedrock,
+            parse=_bill_items,
             modelId=MODEL_ID,
             messages=[{"role": "user", "content": [{"text": prompt}]}],
             inferenceConfig={"temperature": 0.0}
         )
-        
-        response_text = response['output']['message']['content'][0]['text']
-        clean_json = response_text.replace("```json", "").replace("```", "").strip()
-        data = json.loads(clean_json)
-        
-        # --- SAFETY FIX 1: Handle List Return ---
-        if isinstance(data, list):
-            return {"items": data}
-            
-        # --- SAFETY FIX 2: Handle Empty/Bad Dict ---
-        if isinstance(data, dict):
-            if "items" not in data:
-                return {"items": []}
-            return data
-            
-        return {"items": []}
 
     except Exception as e:
         print(f"❌ Structuring Failed: {e}")
@@ -63,7 +124,28 @@ def structure_and_categorize(raw_text):
 def parse_policy_limits(policy_text: str) -> dict:
     """
     Extracts policy limits and entities from policy text using Nova Lite.
+    
+    Policies longer than the prompt budget are parsed map-reduce style
+    (see _parse_policy_map_reduce) instead of being truncated.
+    
+    Results are cached by (model ID, prompt version, normalized text);
+    failed or incomplete parses are never cached.
     """
+    cache_key = _policy_cache_key(policy_text) if _policy_cache is not None else None
+    cached = _cached_policy(cache_key)
+    if cached is not None:
+        print(f"⚡ Policy cache hit ({cache_key[:12]}), skipping Nova Lite")
+        return cached
+    
+    if _needs_map_reduce(policy_text):
+        data, complete = _parse_policy_map_reduce(policy_text)
+    else:
+        data, complete = _parse_policy_limits_uncached(policy_text), True
+    if cache_key and data and complete:
+        _policy_cache.set(cache_key, {"model_id": MODEL_ID, "prompt_version": POLICY_PROMPT_VERSION, "policy": data})
+    return data
+
+def _parse_policy_limits_uncached(policy_text: str) -> dict:
     print(f"🧠 Nova Lite: Structuring Policy Data...")
     prompt = f"""
     You are an Insurance Policy Analyst.
@@ -79,7 +161,7 @@ def parse_policy_limits(policy_text: str) -> dict:
     5. Extract 'ped_list' (Pre-existing Diseases if any).
     
     RAW TEXT:
-    {policy_text[:15000]}
+    {compact_text(policy_text, POLICY_TASKS, settings.prompt_policy_tokens)}
     
     OUTPUT FORMAT (JSON ONLY):
     {{
@@ -92,20 +174,14 @@ def parse_policy_limits(policy_text: str) -> dict:
     """
     
     try:
-        response = bedrock.converse(
+        return cached_converse(
+            bedrock,
+            parse=_response_object,
             modelId=MODEL_ID,
             messages=[{"role": "user", "content": [{"text": prompt}]}],
             inferenceConfig={"temperature": 0.0}
         )
         
-        response_text = response['output']['message']['content'][0]['text']
-        clean_json = response_text.replace("```json", "").replace("```", "").strip()
-        data = json.loads(clean_json)
-        
-        if isinstance(data, dict):
-            return data
-        return {}
-        
     except Exception as e:
         print(f"❌ Policy Structuring Failed: {e}")
         return {}
@@ -119,8 +195,8 @@ def extract_header_details(bill_text, policy_text):
     Extract the following entities from the texts provided.
     
     SOURCES:
-    1. BILL TEXT: {bill_text[:5000]}
-    2. POLICY TEXT: {policy_text[:5000]}
+    1. BILL TEXT: {compact_text(bill_text, HEADER_TASKS, settings.prompt_header_tokens)}
+    2. POLICY TEXT: {compact_text(policy_text, HEADER_TASKS, settings.prompt_header_tokens)}
     
     OUTPUT JSON format:
     {{
@@ -134,21 +210,343 @@ def extract_header_details(bill_text, policy_text):
     """
     
     try:
-        response = bedrock.converse(
+        return cached_converse(
+            bedrock,
+            parse=_response_object,
             modelId=MODEL_ID,
             messages=[{"role": "user", "content": [{"text": prompt}]}],
             inferenceConfig={"temperature": 0.0}
         )
-        
-        response_text = response['output']['message']['content'][0]['text']
-        clean_json = response_text.replace("```json", "").replace("```", "").strip()
-        data = json.loads(clean_json)
-        
-        # Safety check
-        if isinstance(data, dict):
-            return data
-        return {} 
 
     except Exception as e:
         print(f"❌ Entity Extraction Failed: {e}")
         return {}
+
+
+# --- Combined extraction (policy limits + header, optionally bill items, in one Nova Lite call) ---
+
+def _to_number(value):
+    # "Rs. 1,200.50" -> 1200.5 (same rules as bill table cells)
+    return parse_amount(value) if isinstance(value, str) else value
+
+
+class ExtractedItem(BaseModel, extra="allow", coerce_numbers_to_str=True):
+    description: str
+    amount: float
+    category: str = "Other"
+
+    _amount = field_validator("amount", mode="before")(_to_number)
+
+
+class ExtractedPolicy(BaseModel, extra="allow", coerce_numbers_to_str=True):
+    policy_id: Optional[str] = None
+    patient_name: Optional[str] = None
+    insurer_name: Optional[str] = None
+    coverage_amount: Optional[float] = None
+    ped_list: List[str] = []
+
+    _coverage = field_validator("coverage_amount", mode="before")(_to_number)
+
+
+class ExtractedHeader(BaseModel, extra="allow", coerce_numbers_to_str=True):
+    patient_name: Optional[str] = None
+    policy_number: Optional[str] = None
+    insurer_name: Optional[str] = None
+    insurer_address: Optional[str] = None
+    bill_number: Optional[str] = None
+    bill_date: Optional[str] = None
+
+
+class CombinedExtraction(BaseModel):
+    # Unrequested keys (e.g. bill items nobody asked for) are ignored
+    bill_items: List[ExtractedItem] = []
+    policy: Optional[ExtractedPolicy] = None
+    header: ExtractedHeader
+
+
+def _combined_extraction(response, want_items: bool) -> CombinedExtraction:
+    """
+    Raises:
+        ValidationError / ValueError: If the response does not match the
+                                      schema (nothing is cached)
+    """
+    data = _response_json(response)
+    if not want_items and isinstance(data, dict):
+        data = {key: value for key, value in data.items() if key != "bill_items"}
+    extraction = CombinedExtraction.model_validate(data)
+    if want_items and "bill_items" not in extraction.model_fields_set:
+        raise ValueError("Bill items were requested but the response has no 'bill_items'")
+    return extraction
+
+
+def extract_combined(bill_text: str, policy_text: str, bill_rows: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Merges two of the three Nova Lite extraction calls: policy limits and
+    header metadata in ONE call. With bill_rows, the third (bill items)
+    is merged in as well.
+    
+    The policy is sent once (the split calls resend the first 5,000
+    characters of both documents for the header). A cached policy (a
+    parse_policy_limits result, else this prompt's own earlier result) is
+    not re-parsed: only its header excerpt is sent. A policy too long for
+    one prompt is parsed map-reduce style first (parse_policy_limits),
+    then treated the same way.
+    
+    Args:
+        bill_rows: Bill text to itemise in the same call: bill_text itself
+                   (sent once, for items and header) or the table rows the
+                   parser could not resolve. None / "" = no bill items
+                   (structured separately, see audit_service.structure_bill)
+    
+    Returns:
+        {"policy": {...}, "header": {...}} shaped like the split calls'
+        results, plus "items" when bill_rows were given; None if the call
+        fails or the response does not match the schema (caller falls
+        back to the split calls)
+    """
+    want_items = bool(bill_rows and bill_rows.strip())
+    print(f"🧠 Nova Lite: Combined {'bill / ' if want_items else ''}policy / header extraction...")
+    cache_key = _policy_cache_key(policy_text, "combined") if _policy_cache is not None else None
+    cached_policy = None
+    if _policy_cache is not None:
+        cached_policy = _cached_policy(_policy_cache_key(policy_text)) or _cached_policy(cache_key)
+    if cached_policy is None and _needs_map_reduce(policy_text):
+        cached_policy = parse_policy_limits(policy_text) or None
+    
+    if want_items and bill_rows == bill_text:
+        sections = [f"BILL TEXT:\n{compact_text(bill_text, BILL_TASKS + HEADER_TASKS, settings.prompt_bill_tokens)}"]
+    else:
+        sections = [f"BILL HEADER:\n{compact_text(bill_text, HEADER_TASKS, settings.prompt_header_tokens)}"]
+        if want_items:
+            sections.append(f"BILL ROWS TO ITEMISE:\n{compact_text(bill_rows, BILL_TASKS, settings.prompt_bill_tokens)}")
+    if cached_policy is None:
+        sections.append(f"POLICY TEXT:\n{compact_text(policy_text, POLICY_TASKS, settings.prompt_policy_tokens)}")
+    else:
+        sections.append(f"POLICY HEADER:\n{compact_text(policy_text, HEADER_TASKS, settings.prompt_header_tokens)}")
+    
+    # Only the requested keys appear in the task list and the template
+    tasks, template = [], []
+    if want_items:
+        tasks.append("'bill_items': every bill line item with 'description', 'amount' (number) and 'category' from: [Room Rent, Pharmacy, Consumables, Surgery, Doctor Fees, Diagnostics, Admin, Other].")
+        template.append('"bill_items": [{ "description": "Gloves", "amount": 500, "category": "Consumables" }]')
+    if cached_policy is None:
+        tasks.append("'policy': policy_id (Policy Number), patient_name (Policy Holder Name), insurer_name (Insurance Company), coverage_amount (Sum Insured, number), ped_list (Pre-existing Diseases).")
+        template.append('"policy": { "policy_id": "P-12345", "patient_name": "John Doe", "insurer_name": "Health Insurer Ltd", "coverage_amount": 500000, "ped_list": ["Diabetes"] }')
+    tasks.append("'header': patient_name, policy_number, insurer_name, insurer_address (City/Branch), bill_number (Invoice No), bill_date.")
+    template.append('"header": { "patient_name": "Full Name", "policy_number": "Policy Number", "insurer_name": "Insurance Company", "insurer_address": "City/Branch", "bill_number": "Invoice No", "bill_date": "Date" }')
+    task_lines = "\n    ".join(f"{n}. {task}" for n, task in enumerate(tasks, 1))
+    template_lines = ",\n      ".join(template)
+    
+    prompt = f"""
+    You are a Medical Claims Data Extraction Expert.
+    
+    TASK:
+    Extract the following from the documents below in a single JSON object.
+    {task_lines}
+    Use null for anything not present.
+    
+    {(chr(10) + chr(10)).join(sections)}
+    
+    OUTPUT FORMAT (JSON ONLY):
+    {{
+      {template_lines}
+    }}
+    """
+    
+    try:
+        # A response that fails validation is not cached
+        extraction = cached_converse(
+            bedrock,
+            parse=lambda response: _combined_extraction(response, want_items),
+            modelId=MODEL_ID,
+            messages=[{"role": "user", "content": [{"text": prompt}]}],
+            inferenceConfig={"temperature": 0.0}
+        )
+    except (ValidationError, ValueError) as e:
+        print(f"❌ Combined extraction returned an invalid response: {e}")
+        return None
+    except Exception as e:
+        print(f"❌ Combined extraction failed: {e}")
+        return None
+    
+    if cached_policy is not None:
+        policy = cached_policy
+    elif extraction.policy is not None:
+        # Missing fields are left out (not None) so callers' .get() defaults apply
+        policy = extraction.policy.model_dump(exclude_none=True)
+        if cache_key:
+            _policy_cache.set(cache_key, {"model_id": MODEL_ID, "prompt_version": COMBINED_PROMPT_VERSION, "policy": policy})
+    else:
+        print("❌ Combined extraction returned no policy")
+        return None
+    
+    result = {
+        "policy": policy,
+        "header": extraction.header.model_dump(exclude_none=True)
+    }
+    if want_items:
+        result["items"] = [item.model_dump() for item in extraction.bill_items]
+    return result
+
+
+# --- Map-reduce policy parsing (policies longer than the prompt budget) ---
+
+class ChunkSubLimit(BaseModel, extra="ignore", coerce_numbers_to_str=True):
+    category: str
+    limit_amount: Optional[float] = None
+    limit_percentage: Optional[float] = None
+
+    _numbers = field_validator("limit_amount", "limit_percentage", mode="before")(_to_number)
+
+
+class ChunkPolicyLimits(BaseModel, extra="ignore", coerce_numbers_to_str=True):
+    """What one chunk of a policy says (null = not in this chunk)"""
+    policy_id: Optional[str] = None
+    policy_holder_name: Optional[str] = None
+    insurer_name: Optional[str] = None
+    coverage_amount: Optional[float] = None
+    room_limit_type: Optional[str] = None
+    room_limit_value: Optional[str] = None
+    copay_percentage: Optional[float] = None
+    general_waiting_period_months: Optional[int] = None
+    ped_waiting_period_months: Optional[int] = None
+    sub_limits: List[ChunkSubLimit] = []
+    ped_list: List[str] = []
+
+    _numbers = field_validator(
+        "coverage_amount", "copay_percentage", "general_waiting_period_months", "ped_waiting_period_months",
+        mode="before"
+    )(_to_number)
+
+    @field_validator("sub_limits", "ped_list", mode="before")
+    @classmethod
+    def _none_is_empty(cls, value):
+        return value if value is not None else []
+
+
+def _needs_map_reduce(policy_text: str) -> bool:
+    return (
+        settings.policy_map_reduce_enabled
+        and estimate_tokens(clean_ocr_text(policy_text)) > settings.prompt_policy_tokens
+    )
+
+
+def _parse_policy_chunk(index: int, total: int, chunk: str) -> Optional[ChunkPolicyLimits]:
+    """Map step: limits mentioned in one chunk, or None if the call failed"""
+    prompt = f"""
+    You are an Insurance Policy Analyst.
+    
+    TASK:
+    Below is part {index + 1} of {total} of an insurance policy wording.
+    Extract ONLY what this part states; use null (or []) for anything it does not mention.
+    
+    RULES:
+    1. 'policy_id' (Policy Number), 'policy_holder_name', 'insurer_name' (Insurance Company).
+    2. 'coverage_amount' (Sum Insured, number).
+    3. 'room_limit_type' ("category" or "amount") and 'room_limit_value' (e.g. "single private" or "5000").
+    4. 'copay_percentage' (number).
+    5. 'general_waiting_period_months' and 'ped_waiting_period_months' (numbers of months).
+    6. 'sub_limits': [{{ "category": "Cataract", "limit_amount": 40000, "limit_percentage": null }}].
+    7. 'ped_list' (Pre-existing Diseases named as declared / excluded).
+    
+    POLICY TEXT (PART {index + 1} OF {total}):
+    {chunk}
+    
+    OUTPUT FORMAT (JSON ONLY):
+    {{
+      "policy_id": null, "policy_holder_name": null, "insurer_name": null, "coverage_amount": null,
+      "room_limit_type": null, "room_limit_value": null, "copay_percentage": null,
+      "general_waiting_period_months": null, "ped_waiting_period_months": null,
+      "sub_limits": [], "ped_list": []
+    }}
+    """
+    
+    try:
+        return cached_converse(
+            bedrock,
+            parse=lambda response: ChunkPolicyLimits.model_validate(_response_json(response)),
+            modelId=MODEL_ID,
+            messages=[{"role": "user", "content": [{"text": prompt}]}],
+            inferenceConfig={"temperature": 0.0}
+        )
+    except Exception as e:
+        print(f"❌ Policy chunk {index + 1}/{total} failed: {e}")
+        return None
+
+
+def merge_policy_chunks(parts: List[ChunkPolicyLimits]) -> Dict[str, Any]:
+    """
+    Reduce step, deterministic for a given list of chunk results (in
+    document order):
+    - identifiers, room rent, co-pay, waiting periods: first chunk that
+      states them
+    - coverage_amount: the value stated most often (ties: the earliest)
+    - sub_limits: one per category (first mention), ped_list: union
+    
+    Returns a dict with the single-call keys (policy_id, patient_name,
+    insurer_name, coverage_amount, ped_list) plus the PolicyData limit fields.
+    """
+    def first(field):
+        return next((getattr(p, field) for p in parts if getattr(p, field) not in (None, "")), None)
+    
+    amounts = [p.coverage_amount for p in parts if p.coverage_amount]
+    coverage = None
+    if amounts:
+        counts = Counter(amounts)
+        coverage = max(amounts, key=lambda a: (counts[a], -amounts.index(a)))
+    
+    sub_limits, seen_categories = [], set()
+    peds, seen_peds = [], set()
+    for part in parts:
+        for sub_limit in part.sub_limits:
+            key = " ".join(sub_limit.category.lower().split())
+            if key and key not in seen_categories:
+                seen_categories.add(key)
+                sub_limits.append(sub_limit.model_dump())
+        for ped in part.ped_list:
+            key = " ".join(str(ped).lower().split())
+            if key and key not in seen_peds:
+                seen_peds.add(key)
+                peds.append(str(ped).strip())
+    
+    merged = {
+        "policy_id": first("policy_id"),
+        "patient_name": first("policy_holder_name"),
+        "policy_holder_name": first("policy_holder_name"),
+        "insurer_name": first("insurer_name"),
+        "coverage_amount": coverage,
+        "room_limit_type": first("room_limit_type"),
+        "room_limit_value": first("room_limit_value"),
+        "copay_percentage": first("copay_percentage"),
+        "general_waiting_period_months": first("general_waiting_period_months"),
+        "ped_waiting_period_months": first("ped_waiting_period_months"),
+        "sub_limits": sub_limits,
+        "ped_list": peds,
+    }
+    # Missing fields are left out so callers' .get() defaults apply
+    return {k: v for k, v in merged.items() if v is not None}
+
+
+def _parse_policy_map_reduce(policy_text: str) -> Tuple[dict, bool]:
+    """
+    Long policy: section-aware chunks parsed concurrently (at most
+    settings.policy_chunk_concurrency Nova Lite calls at once), then merged.
+    Latency stays roughly flat as the page count grows.
+    
+    Returns:
+        (merged dict, complete) - complete is False if any chunk failed
+    """
+    chunks = chunk_text(policy_text, settings.policy_chunk_tokens)
+    print(f"🧠 Nova Lite: Structuring Policy Data in {len(chunks)} chunks (map-reduce)...")
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(len(chunks), settings.policy_chunk_concurrency)),
+        thread_name_prefix="policy-chunk"
+    ) as executor:
+        results = list(executor.map(lambda args: _parse_policy_chunk(args[0], len(chunks), args[1]), enumerate(chunks)))
+    
+    parts = [r for r in results if r is not None]
+    if len(parts) < len(results):
+        print(f"⚠️ {len(results) - len(parts)} of {len(results)} policy chunks failed; result not cached")
+    if not parts:
+        return {}, False
+    return merge_policy_chunks(parts), len(parts) == len(results)
@@ -9,39 +9,56 @@ Integrates:
 """
 
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 import json
+import re
 import shutil
+import time
 from pathlib import Path
 
+from pydantic import ValidationError
+
 # Models
 from app.models.audit import AuditResult, AuditStatus, AuditFlag, FlagType, FlagSeverity, FlagScope
 from app.models.bill import HospitalBill, ChargeCategory
 from app.models.policy import PolicyData
 
 # Services
-from app.services.ocr.ocr_service import extract_text_from_document
-from app.services.ai.structuring_service import structure_and_categorize, extract_header_details, parse_policy_limits
-from app.services.ai.rag_service import audit_claim
+from app.config import settings
+from app.services import metrics
+from app.services.ocr.ocr_service import extract_text_from_document, extract_bill_document
+from app.services.ingestion.bill_table_parser import line_items_from_tables, parse_amount
+from app.services.ai.structuring_service import (
+    structure_and_categorize,
+    extract_header_details,
+    parse_policy_limits,
+    extract_combined
+)
+from app.services.ai.rag_service import audit_claim, audit_claim_stream, audit_streaming_supported
 from app.services.reporting.letter_generator import write_dispute_letter
 from app.services.aws_service import delete_multiple_files_from_s3
+from app.services.audit_store import create_audit_store
+from app.services.job_queue import create_job_queue
+from app.services.pipeline_dag import Stage, StageFailedError, run_stages
 
-# In-memory audit store
-# In-memory audit store
-AUDIT_STORE: Dict[str, dict] = {}
+# Audit session store (backend chosen by settings.audit_store_backend)
+audit_store = create_audit_store()
 
 def log_debug(msg):
     with open("debug_audit.log", "a", encoding="utf-8") as f:
         f.write(f"[{datetime.now()}] {msg}\n")
 
+class PipelineAbort(Exception):
+    """Raised by a pipeline stage to end the audit with a user-facing error"""
+    pass
+
 def generate_audit_id() -> str:
     return f"AUD-{uuid.uuid4().hex[:8].upper()}"
 
 def update_audit_progress(audit_id: str, step: str, message: str):
-    if audit_id in AUDIT_STORE:
-        AUDIT_STORE[audit_id]["progress_step"] = step
-        AUDIT_STORE[audit_id]["progress_message"] = message
+    audit_store.update(audit_id, progress_step=step, progress_message=message)
 def log_debug(msg):
     try:
         with open("debug_audit.log", "a", encoding="utf-8") as f:
@@ -71,70 +88,453 @@ def _map_category(raw_cat: str) -> str:
         
     return "misc"
 
+def _item_key(description) -> str:
+    return " ".join(str(description or "").lower().split())
+
+_POLICY_LIMIT_FIELDS = (
+    "general_waiting_period_months", "ped_waiting_period_months",
+    "room_limit_type", "room_limit_value", "sub_limits", "copay_percentage"
+)
+
+def _policy_limit_fields(clean_policy: Dict) -> Dict:
+    """
+    Optional PolicyData limit fields (filled by map-reduce policy parsing).
+    Dropped if malformed, so a stray LLM value cannot fail the audit.
+    """
+    fields = {k: clean_policy[k] for k in _POLICY_LIMIT_FIELDS if clean_policy.get(k) is not None}
+    try:
+        PolicyData.model_validate({
+            "policy_id": "", "policy_holder_name": "", "insurer_name": "", "coverage_amount": 0, "ped_list": [],
+            **fields
+        })
+    except ValidationError as e:
+        print(f"⚠️ Ignoring malformed policy limit fields: {e}")
+        return {}
+    return fields
+
+_LEADING_NUMBER = re.compile(r"^\s*(\d+(?:\.\d+)?)")
+
+def _to_quantity(value) -> Optional[int]:
+    """Whole-number quantity from LLM / table output ("2 Nos" -> 2); None otherwise (1.5, "N/A")"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        match = _LEADING_NUMBER.match(str(value).replace(",", ""))
+        if not match:
+            return None
+        number = float(match.group(1))
+    return int(number) if number.is_integer() else None
+
+def _to_unit_price(value) -> Optional[float]:
+    """Unit price as a number ("Rs. 1,200" -> 1200.0); None if it doesn't parse"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return parse_amount(str(value))
+
+def _first_parsed(parse, *values):
+    for value in values:
+        parsed = parse(value)
+        if parsed is not None:
+            return parsed
+    return None
+
+def _structured_items(bill_struct: Dict) -> Dict[str, Dict]:
+    # Quantity / unit price come from the table parser, not the audit LLM
+    return {
+        _item_key(item.get('description')): item
+        for item in bill_struct.get('items', []) if isinstance(item, dict)
+    }
+
+def map_audit_item(idx: int, item: Dict, structured_items: Dict[str, Dict]) -> Tuple[Dict, Optional[AuditFlag]]:
+    """
+    One audited line item (Nova Pro output) -> (charge dict, flag or None).
+    
+    Used for the final result and for partial flags while the audit streams,
+    so both give the same line_item_id / flag for an item.
+    
+    structured_items: bill_struct items by _item_key(description), for the
+    quantity / unit price read by the table parser
+    """
+    # Generate ID
+    line_item_id = f"LI-{idx+1:03d}"
+    
+    # Map Charge (using Amount as number if possible)
+    amount = 0.0
+    try:
+        amt_val = item.get('amount', '0')
+        if isinstance(amt_val, (int, float)):
+            amount = float(amt_val)
+        else:
+            amt_str = str(amt_val).replace('₹', '').replace(',', '')
+            amount = float(amt_str)
+    except:
+        amount = 0.0
+        
+    # Handle category mapping safely
+    cat_str = _map_category(item.get('category', 'misc'))
+    source_item = structured_items.get(_item_key(item.get('description')), {})
+    
+    charge = {
+        "line_item_id": line_item_id,
+        "label": item.get('description', 'Unknown'),
+        "description": item.get('description', 'Unknown'),
+        "amount": amount,
+        "category": cat_str,
+        # LLM values can be "2 Nos" / 1.5: coerce, or drop rather than fail the audit
+        "quantity": _first_parsed(_to_quantity, item.get('quantity'), source_item.get('quantity')),
+        "unit_price": _first_parsed(_to_unit_price, item.get('unit_price'), source_item.get('unit_price'))
+    }
+    
+    # Map Flags based on Status
+    status = item.get('status', 'Covered')
+    
+    # --- RULE BASED OVERRIDES (Hybrid Approach) ---
+    # We enforce strict IRDAI rules regardless of what the LLM says for these specific categories
+    
+    desc_lower = item.get('description', '').lower()
+    cat_lower = item.get('category', '').lower()
+    
+    override_severity = None
+    override_reason = None
+    
+    # Rule 1: Bio-Medical Waste / Waste Disposal
+    if "waste" in desc_lower or "disposal" in desc_lower:
+        status = "May Not Comply"
+        override_severity = FlagSeverity.ERROR
+        # override_reason = "IRDAI Non-Payable list..." -> REMOVED to let AI explain
+        
+    # Rule 2: OT Consumables (or just 'Consumables' category if not explicitly allowed)
+    elif "consumables" in desc_lower or "consumables" in cat_lower:
+        # Exclude legitimate medical consumables if any, but usually 'Consumables' category is non-payable
+         status = "May Not Comply"
+         override_severity = FlagSeverity.ERROR
+         # override_reason = "IRDAI Non-Payable list..." -> REMOVED
+
+    # Rule 3: Physiotherapy (Non-medical/Consumable context)
+    elif "physiotherapy" in desc_lower:
+         status = "May Not Comply"
+         override_severity = FlagSeverity.ERROR
+         # override_reason = "IRDAI Non-Payable list..." -> REMOVED
+
+    # Rule 4: Admission / Admin / Registration
+    elif "admission" in desc_lower or "admin" in desc_lower or "registration" in desc_lower:
+         status = "Subject to Review"
+         override_severity = FlagSeverity.WARNING # Display as Orange
+         # override_reason = "Policy Annexure A..." -> REMOVED
+
+    # --- End Rules ---
+
+    # Normalize status for other items
+    status_lower = status.lower()
+    if "may not comply" in status_lower or "non-payable" in status_lower:
+        serverity = FlagSeverity.ERROR
+        msg_status = "May Not Comply"
+    elif "subject to review" in status_lower or "review" in status_lower:
+        serverity = FlagSeverity.WARNING
+        msg_status = "Subject to Review"
+    elif "partial" in status_lower or "denied" in status_lower:
+        serverity = FlagSeverity.ERROR
+        msg_status = "May Not Comply"
+    else:
+        msg_status = "Covered"
+        serverity = None
+    
+    # Apply Override if exists
+    if override_severity:
+        serverity = override_severity
+        msg_status = status # Propagate the overridden status string
+    
+    flag = None
+    if msg_status != "Covered" or override_severity:
+        # Use override reason if available, else prioritize unique AI reason, then fallback to reference
+        reason_text = override_reason if override_reason else (item.get('reason') or item.get('reference', 'Policy Rule'))
+        
+        flag = AuditFlag(
+            flag_type=FlagType.MISC, 
+            severity=serverity,
+            flag_scope=FlagScope.CHARGE,
+            line_item_id=line_item_id,
+            amount_affected=amount,
+            reason=reason_text,
+            policy_clause=item.get('reference', ''),
+            charge_description=item.get('description', '')
+        )
+    
+    return charge, flag
+
+def _bill_rows_for_llm(bill_text: str, bill_tables) -> str:
+    """The bill text Nova Lite must itemise: unresolved table rows, else the whole bill"""
+    parsed = line_items_from_tables(bill_tables or [])
+    return "\n".join(parsed.unresolved_rows) if parsed.tables_used else bill_text
+
+def structure_bill(bill_text: str, bill_tables, structure=None) -> Dict:
+    """
+    Bill line items: read from Textract tables where the header columns
+    can be mapped, with Nova Lite only for the rows the table parser
+    could not resolve. Without a line-item table, Nova Lite structures the
+    whole bill text as before.
+    
+    structure: text -> {"items": [...]} for the LLM part (defaults to
+    structure_and_categorize; the single-call extraction passes its items)
+    """
+    structure = structure or structure_and_categorize
+    parsed = line_items_from_tables(bill_tables or [])
+    if not parsed.tables_used:
+        metrics.increment("bill_structuring_total", {"source": "llm"})
+        return structure(bill_text)
+    
+    items = list(parsed.items)
+    print(f"📊 Bill tables: {len(items)} item(s) parsed, {len(parsed.unresolved_rows)} row(s) left for Nova Lite")
+    if parsed.unresolved_rows:
+        llm_struct = structure("\n".join(parsed.unresolved_rows)) or {}
+        items.extend(dict(item, source="llm") for item in llm_struct.get("items", []))
+    
+    metrics.increment("bill_structuring_total", {"source": "tables" if not parsed.unresolved_rows else "tables_llm"})
+    metrics.increment("bill_line_items_total", {"source": "table"}, value=len(parsed.items))
+    metrics.increment("bill_line_items_total", {"source": "llm"}, value=len(items) - len(parsed.items))
+    return {"items": items}
+
+def extract_claim_data(bill_text: str, policy_text: str, bill_tables=None, include_bill: bool = False) -> Dict:
+    """
+    Policy limits and header metadata in one combined Nova Lite call (see
+    structuring_service.extract_combined), merging two of the three
+    extraction calls. By default bill items are structured separately,
+    as soon as the bill OCR is done.
+    
+    include_bill=True merges all three: the bill rows Nova Lite has to
+    itemise (after the table parser) go into the same call. If the combined
+    response is unusable, the split calls run in parallel instead.
+    
+    Returns:
+        {"policy": {...}, "header": {...}}, plus "bill_struct" with include_bill
+    """
+    bill_rows = _bill_rows_for_llm(bill_text, bill_tables) if include_bill else None
+    combined = extract_combined(bill_text, policy_text, bill_rows)
+    if combined is not None:
+        metrics.increment("structuring_mode_total", {"mode": "combined_bill" if include_bill else "combined"})
+        result = {"policy": combined["policy"], "header": combined["header"]}
+        if include_bill:
+            items = combined.get("items", [])
+            result["bill_struct"] = structure_bill(bill_text, bill_tables, structure=lambda _text: {"items": items})
+        return result
+    
+    print("↩️ Falling back to split Nova Lite calls")
+    metrics.increment("structuring_mode_total", {"mode": "combined_fallback"})
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="split-extract") as executor:
+        bill_future = executor.submit(structure_bill, bill_text, bill_tables) if include_bill else None
+        policy_future = executor.submit(parse_policy_limits, policy_text)
+        header_future = executor.submit(extract_header_details, bill_text, policy_text)
+        result = {"policy": policy_future.result(), "header": header_future.result()}
+        if bill_future is not None:
+            result["bill_struct"] = bill_future.result()
+        return result
+
 def process_audit_pipeline(
     audit_id: str, 
     bill_path: str, 
     policy_path: str,
     bill_s3_key: str = None,
-    policy_s3_key: str = None
+    policy_s3_key: str = None,
+    bill_sha256: str = None,
+    policy_sha256: str = None
 ) -> AuditResult:
     """
-    Executes the new AI-First pipeline:
-    OCR -> Nova Lite Structuring -> Nova Pro Audit (RAG) -> Nova Pro Letter
+    Executes the new AI-First pipeline as a dependency graph:
+    
+        OCR bill ─────┬─> Structure bill (tables + Nova Lite) ─┐
+                      │                                        ├─> RAG audit (Nova Pro) ─┐
+        OCR policy ───┼─> Parse policy (Nova Lite) ────────────┘                         ├─> Letter (Nova Pro)
+                      └─> Header metadata (Nova Lite, needs both OCRs) ──────────────────┘
+    
+    Every stage starts as soon as its inputs are ready, so the three Nova
+    Lite calls overlap and latency follows the critical path only.
+    
+    With settings.bill_table_extraction_enabled, a scanned bill is read with
+    one Textract table analysis (text and tables from the same call) and
+    bill structuring reads line items from the tables (see structure_bill).
+    Born-digital bills are read from their text layer, with no Textract
+    call at all.
+    
+    With settings.combined_extraction_enabled, two of the three Nova Lite
+    calls are merged: policy parsing and header extraction are one call
+    once both OCRs are done, while the bill is still structured as soon as
+    its own OCR is done, overlapping the policy OCR. With
+    settings.combined_extraction_include_bill as well, bill items join that
+    call (one Nova Lite call in total, but bill structuring waits for the
+    policy OCR). The split graph above is the fallback.
+    
+    With settings.audit_streaming_enabled (and a boto3 that supports it,
+    see audit_streaming_active), the Nova Pro audit is streamed
+    and each line item's flag is stored as a partial flag as soon as it is
+    parsed (see GET /status).
     """
     
-    # 1. OCR STEP
-    update_audit_progress(audit_id, "ocr", "Reading documents with OCR...")
-    print(f"📄 Starting OCR extraction for audit {audit_id}...")
+    # --- Stage functions (inputs arrive as keyword args named after deps) ---
     
-    from concurrent.futures import ThreadPoolExecutor
+    def checked_text(text, label):
+        if not text or len(text) < 50:
+            raise PipelineAbort(f"OCR failed: {label} text empty or too short. Check if document is readable.")
+        return text
     
-    try:
-        # Run OCR in parallel to save time
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            future_bill = executor.submit(extract_text_from_document, bill_path, bill_s3_key)
-            future_policy = executor.submit(extract_text_from_document, policy_path, policy_s3_key)
-            
-            bill_text = future_bill.result()
-            policy_text = future_policy.result()
-        
-        # Validate OCR
-        if not bill_text or len(bill_text) < 50:
-            return _create_error_result(audit_id, "OCR failed: Bill text empty or too short. Check if document is readable.")
-        if not policy_text or len(policy_text) < 50:
-            return _create_error_result(audit_id, "OCR failed: Policy text empty or too short. Check if document is readable.")
-        
-        # 2. AI STRUCTURING STEP (Nova Lite)
-        update_audit_progress(audit_id, "structuring", "Structuring data with Nova Lite...")
-        print("🧠 Nova Lite: Structuring documents...")
-        
-        print("🧠 Nova Lite: Structuring documents...")
-        
-        # Structure Bill
-        bill_struct = structure_and_categorize(bill_text)
+    def ocr_stage(file_path, s3_key, sha256, label):
+        update_audit_progress(audit_id, "ocr", "Reading documents with OCR...")
+        return checked_text(extract_text_from_document(file_path, s3_key, sha256), label)
+    
+    def bill_ocr_stage():
+        # Text and line-item tables from (at most) one Textract request
+        update_audit_progress(audit_id, "ocr", "Reading documents with OCR...")
+        document, tables = extract_bill_document(bill_path, bill_s3_key, bill_sha256)
+        return {"text": checked_text(document.text, "Bill"), "tables": tables}
+    
+    def checked_bill_struct(bill_struct):
         log_debug(f"Bill Struct: {json.dumps(bill_struct, indent=2)}")
-        
-        # Structure Policy
-        print("📄 Nova Lite: Extracting Specific Policy Limits...")
-        policy_struct = parse_policy_limits(policy_text)
-        log_debug(f"Policy Struct: {json.dumps(policy_struct, indent=2)}")
-        
         if not bill_struct:
-            return _create_error_result(audit_id, "AI failed to structure bill data")
-            
-        # 2b. EXTRACT HEADER METADATA (New Step)
+            raise PipelineAbort("AI failed to structure bill data")
+        return bill_struct
+    
+    def checked_policy_struct(policy_struct):
+        log_debug(f"Policy Struct: {json.dumps(policy_struct, indent=2)}")
+        # Use fallback policy limits if policy struct failed (safeguard)
+        return policy_struct if policy_struct else {"error": "Policy parsing failed, using default rules"}
+    
+    def structure_bill_stage(bill_text, bill_tables):
+        update_audit_progress(audit_id, "structuring", "Structuring data with Nova Lite...")
+        print("🧠 Structuring bill...")
+        return checked_bill_struct(structure_bill(bill_text, bill_tables))
+    
+    def parse_policy_stage(policy_text):
+        print("📄 Nova Lite: Extracting Specific Policy Limits...")
+        return checked_policy_struct(parse_policy_limits(policy_text))
+    
+    def extraction_stage(bill_text, policy_text):
+        print("📄 Nova Lite: Extracting policy limits and header metadata...")
+        return extract_claim_data(bill_text, policy_text)
+    
+    def full_extraction_stage(bill_text, bill_tables, policy_text):
+        update_audit_progress(audit_id, "structuring", "Structuring data with Nova Lite...")
+        print("📄 Nova Lite: Extracting bill items, policy limits and header metadata...")
+        return extract_claim_data(bill_text, policy_text, bill_tables, include_bill=True)
+    
+    def header_stage(bill_text, policy_text):
         print("🔍 Nova Lite: Extracting Header Metadata...")
-        header_metadata = extract_header_details(bill_text, policy_text)
-            
-        # 3. AI AUDIT STEP (Nova Pro + RAG)
+        return extract_header_details(bill_text, policy_text)
+    
+    def audit_stage(bill_struct, clean_policy):
         update_audit_progress(audit_id, "auditing", "Auditing claim with Nova Pro & RAG...")
         print("⚖️ Nova Pro: Running RAG Audit...")
+        if audit_streaming_active():
+            on_item, flush_partial_flags = on_audit_item(bill_struct)
+            try:
+                audit_json = audit_claim_stream(bill_struct, clean_policy, on_item)
+            finally:
+                flush_partial_flags()
+        else:
+            audit_json = audit_claim(bill_struct, clean_policy)
+        log_debug(f"RAG Audit Response: {json.dumps(audit_json, indent=2)}")
+        return audit_json
+    
+    def on_audit_item(bill_struct):
+        # Streamed items -> partial flags on the audit record, so /status can
+        # show them before the audit (and the letter) is finished. Writes are
+        # batched: each one rewrites the whole list in the store
+        structured_items = _structured_items(bill_struct)
+        reviewed, partial_flags = [], []
+        flushed = {"items": 0, "at": time.monotonic()}
+        audit_store.update(audit_id, partial_flags=[])
         
-        # Use fallback policy limits if policy struct failed (safeguard)
-        clean_policy = policy_struct if policy_struct else {"error": "Policy parsing failed, using default rules"}
+        def flush():
+            if flushed["items"] == len(reviewed):
+                return
+            audit_store.update(
+                audit_id,
+                progress_message=f"Auditing claim with Nova Pro & RAG... ({len(reviewed)} item(s) reviewed)",
+                partial_flags=list(partial_flags)
+            )
+            flushed.update(items=len(reviewed), at=time.monotonic())
         
-        audit_json = audit_claim(bill_struct, clean_policy)
-        log_debug(f"RAG Audit Response: {json.dumps(audit_json, indent=2)}")
+        def on_item(item):
+            _, flag = map_audit_item(len(reviewed), item, structured_items)
+            reviewed.append(item)
+            if flag is not None:
+                partial_flags.append(flag.model_dump(mode="json"))
+            if (len(reviewed) - flushed["items"] >= settings.audit_partial_flush_items
+                    or time.monotonic() - flushed["at"] >= settings.audit_partial_flush_seconds):
+                flush()
+        return on_item, flush
+    
+    def letter_stage(audit_json, header_metadata, bill_struct, clean_policy):
+        update_audit_progress(audit_id, "reporting", "Generating dispute letter...")
+        
+        # Merge structured header data with fallback from other sources
+        letter_metadata = {
+            "patient_name": header_metadata.get('patient_name') or bill_struct.get('patient_name', 'Unknown'),
+            "policy_number": header_metadata.get('policy_number') or clean_policy.get('policy_id', 'Unknown'),
+            "insurer_name": header_metadata.get('insurer_name') or clean_policy.get('insurer_name', 'Insurance Company'),
+            "insurer_address": header_metadata.get('insurer_address', "Claims Department, Registered Office"),
+            "bill_number": header_metadata.get('bill_number') or bill_struct.get('bill_id', 'NA'),
+            "bill_date": header_metadata.get('bill_date') or datetime.now().strftime("%d-%b-%Y")
+        }
+        
+        # Pass full audit_json (which contains structured_bill)
+        return write_dispute_letter(audit_json, letter_metadata)
+    
+    stages = [
+        Stage("bill_ocr", bill_ocr_stage),
+        Stage("bill_text", lambda bill_ocr: bill_ocr["text"], deps=("bill_ocr",)),
+        Stage("bill_tables", lambda bill_ocr: bill_ocr["tables"], deps=("bill_ocr",)),
+        Stage("policy_text", lambda: ocr_stage(policy_path, policy_s3_key, policy_sha256, "Policy")),
+    ]
+    if settings.combined_extraction_enabled and settings.combined_extraction_include_bill:
+        stages += [
+            Stage("extraction", full_extraction_stage, deps=("bill_text", "bill_tables", "policy_text")),
+            Stage("bill_struct", lambda extraction: checked_bill_struct(extraction["bill_struct"]), deps=("extraction",)),
+            Stage("clean_policy", lambda extraction: checked_policy_struct(extraction["policy"]), deps=("extraction",)),
+            Stage("header_metadata", lambda extraction: extraction["header"], deps=("extraction",)),
+        ]
+    elif settings.combined_extraction_enabled:
+        stages += [
+            Stage("bill_struct", structure_bill_stage, deps=("bill_text", "bill_tables")),
+            Stage("extraction", extraction_stage, deps=("bill_text", "policy_text")),
+            Stage("clean_policy", lambda extraction: checked_policy_struct(extraction["policy"]), deps=("extraction",)),
+            Stage("header_metadata", lambda extraction: extraction["header"], deps=("extraction",)),
+        ]
+    else:
+        stages += [
+            Stage("bill_struct", structure_bill_stage, deps=("bill_text", "bill_tables")),
+            Stage("clean_policy", parse_policy_stage, deps=("policy_text",)),
+            Stage("header_metadata", header_stage, deps=("bill_text", "policy_text")),
+        ]
+    stages += [
+        Stage("audit_json", audit_stage, deps=("bill_struct", "clean_policy")),
+        Stage("letter_content", letter_stage, deps=("audit_json", "header_metadata", "bill_struct", "clean_policy")),
+    ]
+    
+    stage_timings = {}
+    
+    def record_stage_timing(name, timing):
+        # Persisted as each stage finishes so /status shows live progress
+        stage_timings[name] = timing
+        audit_store.update(audit_id, stage_timings=dict(stage_timings))
+    
+    print(f"📄 Starting audit pipeline for {audit_id}...")
+    
+    try:
+        # 1-3. OCR -> STRUCTURING -> AUDIT -> LETTER (parallel where possible)
+        try:
+            results = run_stages(stages, on_stage_done=record_stage_timing)
+        except StageFailedError as e:
+            if isinstance(e.cause, PipelineAbort):
+                return _create_error_result(audit_id, str(e.cause))
+            raise e.cause
+        
+        bill_struct = results["bill_struct"]
+        clean_policy = results["clean_policy"]
+        audit_json = results["audit_json"]
+        letter_content = results["letter_content"]
         
         # 4. MAPPING STEP (JSON -> Object Models)
         # We need to convert the flexible JSON from LLM into strict objects for Frontend
@@ -149,111 +549,18 @@ def process_audit_pipeline(
             
         print(f"DEBUG: audit_bill_items count = {len(audit_bill_items)}")
         
+        structured_items = _structured_items(bill_struct)
+        
         # Convert to HospitalBill.charges format with line_item_ids
         charges_list = []
         flags_list = []
         
         for idx, item in enumerate(audit_bill_items):
             print(f"DEBUG: Processing item {idx}: {item.get('description')} Status={item.get('status')}")
-            # Generate ID
-            line_item_id = f"LI-{idx+1:03d}"
-            
-            # Map Charge (using Amount as number if possible)
-            amount = 0.0
-            try:
-                amt_val = item.get('amount', '0')
-                if isinstance(amt_val, (int, float)):
-                    amount = float(amt_val)
-                else:
-                    amt_str = str(amt_val).replace('₹', '').replace(',', '')
-                    amount = float(amt_str)
-            except:
-                amount = 0.0
-                
-            # Handle category mapping safely
-            cat_str = _map_category(item.get('category', 'misc'))
-            
-            charges_list.append({
-                "line_item_id": line_item_id,
-                "label": item.get('description', 'Unknown'),
-                "description": item.get('description', 'Unknown'),
-                "amount": amount,
-                "category": cat_str 
-            })
-            
-            # Map Flags based on Status
-            status = item.get('status', 'Covered')
-            
-            # --- RULE BASED OVERRIDES (Hybrid Approach) ---
-            # We enforce strict IRDAI rules regardless of what the LLM says for these specific categories
-            
-            desc_lower = item.get('description', '').lower()
-            cat_lower = item.get('category', '').lower()
-            
-            override_severity = None
-            override_reason = None
-            
-            # Rule 1: Bio-Medical Waste / Waste Disposal
-            if "waste" in desc_lower or "disposal" in desc_lower:
-                status = "May Not Comply"
-                override_severity = FlagSeverity.ERROR
-                # override_reason = "IRDAI Non-Payable list..." -> REMOVED to let AI explain
-                
-            # Rule 2: OT Consumables (or just 'Consumables' category if not explicitly allowed)
-            elif "consumables" in desc_lower or "consumables" in cat_lower:
-                # Exclude legitimate medical consumables if any, but usually 'Consumables' category is non-payable
-                 status = "May Not Comply"
-                 override_severity = FlagSeverity.ERROR
-                 # override_reason = "IRDAI Non-Payable list..." -> REMOVED
-
-            # Rule 3: Physiotherapy (Non-medical/Consumable context)
-            elif "physiotherapy" in desc_lower:
-                 status = "May Not Comply"
-                 override_severity = FlagSeverity.ERROR
-                 # override_reason = "IRDAI Non-Payable list..." -> REMOVED
-
-            # Rule 4: Admission / Admin / Registration
-            elif "admission" in desc_lower or "admin" in desc_lower or "registration" in desc_lower:
-                 status = "Subject to Review"
-                 override_severity = FlagSeverity.WARNING # Display as Orange
-                 # override_reason = "Policy Annexure A..." -> REMOVED
-
-            # --- End Rules ---
-
-            # Normalize status for other items
-            status_lower = status.lower()
-            if "may not comply" in status_lower or "non-payable" in status_lower:
-                serverity = FlagSeverity.ERROR
-                msg_status = "May Not Comply"
-            elif "subject to review" in status_lower or "review" in status_lower:
-                serverity = FlagSeverity.WARNING
-                msg_status = "Subject to Review"
-            elif "partial" in status_lower or "denied" in status_lower:
-                serverity = FlagSeverity.ERROR
-                msg_status = "May Not Comply"
-            else:
-                msg_status = "Covered"
-                serverity = None
-            
-            # Apply Override if exists
-            if override_severity:
-                serverity = override_severity
-                msg_status = status # Propagate the overridden status string
-            
-            if msg_status != "Covered" or override_severity:
-                # Use override reason if available, else prioritize unique AI reason, then fallback to reference
-                reason_text = override_reason if override_reason else (item.get('reason') or item.get('reference', 'Policy Rule'))
-                
-                flags_list.append(AuditFlag(
-                    flag_type=FlagType.MISC, 
-                    severity=serverity,
-                    flag_scope=FlagScope.CHARGE,
-                    line_item_id=line_item_id,
-                    amount_affected=amount,
-                    reason=reason_text,
-                    policy_clause=item.get('reference', ''),
-                    charge_description=item.get('description', '')
-                ))
+            charge, flag = map_audit_item(idx, item, structured_items)
+            charges_list.append(charge)
+            if flag is not None:
+                flags_list.append(flag)
         
         # Create Bill Object
         hospital_bill = HospitalBill(
@@ -272,7 +579,8 @@ def process_audit_pipeline(
             policy_holder_name=clean_policy.get('policy_holder_name', 'Unknown'),
             insurer_name=clean_policy.get('insurer_name', 'Unknown'),
             coverage_amount=clean_policy.get('coverage_amount', 0),
-            ped_list=clean_policy.get('ped_list', [])
+            ped_list=clean_policy.get('ped_list', []),
+            **_policy_limit_fields(clean_policy)
         )
         
         # Enrich Flags with Detailed Explanations
@@ -301,23 +609,6 @@ def process_audit_pipeline(
             
         fully_covered = max(0, total - under_review)
         
-        # 5. LETTER GENERATION
-        update_audit_progress(audit_id, "reporting", "Generating dispute letter...")
-        
-        # New Metadata Construction
-        # Merge structured header data with fallback from other sources
-        letter_metadata = {
-            "patient_name": header_metadata.get('patient_name') or bill_struct.get('patient_name', 'Unknown'),
-            "policy_number": header_metadata.get('policy_number') or clean_policy.get('policy_id', 'Unknown'),
-            "insurer_name": header_metadata.get('insurer_name') or clean_policy.get('insurer_name', 'Insurance Company'),
-            "insurer_address": header_metadata.get('insurer_address', "Claims Department, Registered Office"),
-            "bill_number": header_metadata.get('bill_number') or bill_struct.get('bill_id', 'NA'),
-            "bill_date": header_metadata.get('bill_date') or datetime.now().strftime("%d-%b-%Y")
-        }
-        
-        # Pass full audit_json (which contains structured_bill)
-        letter_content = write_dispute_letter(audit_json, letter_metadata)
-        
         return AuditResult(
             audit_id=audit_id,
             bill=hospital_bill,
@@ -336,9 +627,20 @@ def process_audit_pipeline(
         return _create_error_result(audit_id, str(e))
         
     finally:
+        _log_stage_timings(audit_id, stage_timings)
         _cleanup_audit_files(audit_id, bill_s3_key, policy_s3_key, bill_path, policy_path)
 
 
+def _log_stage_timings(audit_id, stage_timings):
+    """Print the per-stage breakdown (start offset + duration) in start order"""
+    if not stage_timings:
+        return
+    print(f"⏱️  Stage timings for {audit_id}:")
+    for name, t in sorted(stage_timings.items(), key=lambda kv: kv[1].get("start_ms", 0)):
+        status = "" if t.get("ok") else " (failed)"
+        print(f"   {name:<16} +{t.get('start_ms', 0):>6} ms  {t.get('duration_ms', 0):>6} ms{status}")
+
+
 def _cleanup_audit_files(audit_id, bill_s3, policy_s3, bill_local, policy_local):
     """Secure cleaning of files"""
     try:
@@ -403,39 +705,100 @@ def _create_error_result(audit_id: str, error_msg: str) -> AuditResult:
 # --- API Functions ---
 def start_audit() -> dict:
     audit_id = generate_audit_id()
-    AUDIT_STORE[audit_id] = {
+    audit_store.create({
         "audit_id": audit_id, "status": AuditStatus.CREATED, 
         "bill_path": None, "policy_path": None, "created_at": datetime.now().isoformat(), "result": None
-    }
+    })
     return {"audit_id": audit_id, "status": AuditStatus.CREATED, "message": "Session created."}
 
 def get_audit_status(audit_id: str) -> Optional[dict]:
-    s = AUDIT_STORE.get(audit_id)
-    return {"audit_id": audit_id, "status": s["status"], "progress_step": s.get("progress_step"), "progress_message": s.get("progress_message")} if s else None
+    s = audit_store.get(audit_id)
+    return {"audit_id": audit_id, "status": s["status"], "progress_step": s.get("progress_step"), "progress_message": s.get("progress_message"), "queue_position": audit_job_queue.position(audit_id), "stage_timings": s.get("stage_timings"), "partial_flags": s.get("partial_flags")} if s else None
 
 def get_audit_result(audit_id: str) -> Optional[AuditResult]:
-    session = AUDIT_STORE.get(audit_id)
+    session = audit_store.get(audit_id)
     # Check if session exists and is completed
     if not session: return None
     if session["status"] == AuditStatus.PROCESSING: return None
     
     if session["result"] is None:
         bill_path, policy_path = session.get("bill_path"), session.get("policy_path")
-        if not bill_path or not policy_path: return None
+        if not session.get("bill_s3_key") or not session.get("policy_s3_key"): return None
         
         try:
-            session["result"] = process_audit_pipeline(
+            result = process_audit_pipeline(
                 audit_id, bill_path, policy_path, 
-                session.get("bill_s3_key"), session.get("policy_s3_key")
+                session.get("bill_s3_key"), session.get("policy_s3_key"),
+                session.get("bill_sha256"), session.get("policy_sha256")
             )
         except Exception as e:
             print(f"Pipeline error: {e}")
             raise
+        audit_store.update(audit_id, result=result.model_dump(mode="json"))
+        return result
             
-    return session["result"]
+    return AuditResult.model_validate(session["result"])
+
+def run_audit_job(audit_id: str) -> Optional[str]:
+    """
+    Run the pipeline for an audit already moved to PROCESSING and record
+    the outcome in the audit store.
+    
+    Returns:
+        None if the audit completed, else the error (so a job queue can
+        mark the job failed; the audit store already says why)
+    """
+    print(f"🚀 Starting Background Audit: {audit_id}")
+    try:
+        session = audit_store.get(audit_id)
+        if session is None:
+            raise RuntimeError(f"Audit {audit_id} not found in store")
+        result = process_audit_pipeline(
+            audit_id=audit_id,
+            bill_path=session.get("bill_path"),
+            policy_path=session.get("policy_path"),
+            bill_s3_key=session.get("bill_s3_key"),
+            policy_s3_key=session.get("policy_s3_key"),
+            bill_sha256=session.get("bill_sha256"),
+            policy_sha256=session.get("policy_sha256")
+        )
+        audit_store.transition(
+            audit_id, AuditStatus.PROCESSING, AuditStatus.COMPLETED,
+            result=result.model_dump(mode="json")
+        )
+        if result.status == AuditStatus.FAILED:
+            # Pipeline error result (stored for the UI, as before)
+            return result.flags[0].reason if result.flags else "Audit pipeline failed"
+        print(f"✅ Background Audit Finished: {audit_id}")
+        return None
+    except Exception as e:
+        print(f"❌ Background Audit Failed: {e}")
+        fail_audit(audit_id, str(e))
+        return str(e)
+
+def audit_streaming_active() -> bool:
+    """
+    settings.audit_streaming_enabled, provided the installed boto3 can
+    stream (warns once if not). Called at API / worker startup too.
+    """
+    return settings.audit_streaming_enabled and audit_streaming_supported()
+
+def fail_audit(audit_id: str, error: str) -> bool:
+    """Mark a PROCESSING audit as FAILED (e.g. its job was never run)"""
+    return audit_store.transition(audit_id, AuditStatus.PROCESSING, AuditStatus.FAILED, error=error)
+
+# Queue that runs audits: in-process worker pool, or durable queue drained
+# by `python -m app.worker` (started/drained by app lifespan)
+audit_job_queue = create_job_queue(run_audit_job)
 
 def manually_complete_audit(audit_id: str) -> bool:
-    session = AUDIT_STORE.get(audit_id)
-    if not session: return False
-    session["status"] = AuditStatus.COMPLETED
+    """
+    Mark a PROCESSING audit COMPLETED by hand (lifecycle-checked).
+    
+    Returns False if the audit is missing or not PROCESSING.
+    """
+    if not audit_store.transition(audit_id, AuditStatus.PROCESSING, AuditStatus.COMPLETED):
+        session = audit_store.get(audit_id)
+        print(f"⚠️ Cannot complete audit {audit_id}: {session['status'] if session else 'not found'}")
+        return False
     return True
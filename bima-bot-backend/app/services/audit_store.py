@@ -0,0 +1,316 @@
+"""
+Audit Store - Pluggable Audit Session Persistence
+
+Replaces the process-local AUDIT_STORE dict so audits survive restarts
+and can be shared by several uvicorn workers.
+
+Backends:
+- InMemoryAuditStore: single process, TTL eviction + max-entries cap
+- SQLiteAuditStore: WAL-mode SQLite file, safe for concurrent readers and
+  multiple processes; indexed by status / created_at and last write
+
+Both backends expire an audit ttl_seconds after its last write (as the
+old dict-with-cleanup did), so a long-running audit that keeps updating
+its status is never dropped mid-flight.
+
+Records are plain JSON-serializable dicts. Status changes go through
+transition(), which is atomic: it only succeeds if the audit is still in
+the expected status, so two workers can never both pick up one audit.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.models.audit import AuditStatus
+
+
+# Legal status moves (CREATED -> PROCESSING -> COMPLETED/FAILED)
+ALLOWED_TRANSITIONS = {
+    AuditStatus.CREATED: {AuditStatus.PROCESSING},
+    AuditStatus.PROCESSING: {AuditStatus.COMPLETED, AuditStatus.FAILED},
+}
+
+
+class InvalidTransitionError(ValueError):
+    """Raised when asking for a status move the lifecycle does not allow"""
+    pass
+
+
+def _check_transition(from_status: str, to_status: str) -> None:
+    if AuditStatus(to_status) not in ALLOWED_TRANSITIONS.get(AuditStatus(from_status), set()):
+        raise InvalidTransitionError(f"Cannot move audit from '{from_status}' to '{to_status}'")
+
+
+def _normalize(fields: dict) -> dict:
+    """Round-trip through JSON so every backend hands back the same shapes"""
+    return json.loads(json.dumps(fields))
+
+
+class AuditStore(ABC):
+    """Interface every audit store backend implements"""
+
+    @abstractmethod
+    def create(self, record: dict) -> None:
+        """Insert a new audit record (must contain audit_id, status, created_at)"""
+
+    @abstractmethod
+    def get(self, audit_id: str) -> Optional[dict]:
+        """Return a copy of the record, or None if missing/expired"""
+
+    @abstractmethod
+    def update(self, audit_id: str, **fields) -> bool:
+        """Merge fields into the record. Returns False if the audit is missing"""
+
+    @abstractmethod
+    def transition(self, audit_id: str, from_status: str, to_status: str, **fields) -> bool:
+        """
+        Atomically move an audit from `from_status` to `to_status`,
+        merging `fields` in the same step.
+
+        Returns False if the audit is missing or no longer in `from_status`.
+        Raises InvalidTransitionError for moves outside the lifecycle.
+        """
+
+    @abstractmethod
+    def list_by_status(self, status: str, limit: int = 100) -> List[dict]:
+        """Records in the given status, oldest first"""
+
+    @abstractmethod
+    def delete(self, audit_id: str) -> bool:
+        """Remove a record. Returns False if it did not exist"""
+
+    def __contains__(self, audit_id: str) -> bool:
+        return self.get(audit_id) is not None
+
+
+class InMemoryAuditStore(AuditStore):
+    """
+    Process-local store with TTL eviction and a max-entries cap.
+
+    When the cap is reached the least recently written record is evicted,
+    skipping audits that are still processing where possible.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._records: "OrderedDict[str, dict]" = OrderedDict()
+        self._written_at: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def _expired(self, audit_id: str, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - self._written_at[audit_id] > self.ttl_seconds
+
+    def _evict_expired(self, now: float) -> None:
+        # Oldest writes sit at the front of the OrderedDict
+        for audit_id in list(self._records):
+            if not self._expired(audit_id, now):
+                break
+            self._pop(audit_id)
+
+    def _evict_for_capacity(self) -> None:
+        while self.max_entries and len(self._records) >= self.max_entries:
+            victim = next(
+                (aid for aid, rec in self._records.items() if rec.get("status") != AuditStatus.PROCESSING),
+                next(iter(self._records))
+            )
+            self._pop(victim)
+
+    def _pop(self, audit_id: str) -> None:
+        self._records.pop(audit_id, None)
+        self._written_at.pop(audit_id, None)
+
+    def _touch(self, audit_id: str) -> None:
+        self._written_at[audit_id] = time.monotonic()
+        self._records.move_to_end(audit_id)
+
+    def create(self, record: dict) -> None:
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            self._evict_for_capacity()
+            self._records[record["audit_id"]] = _normalize(record)
+            self._touch(record["audit_id"])
+
+    def _live(self, audit_id: str) -> Optional[dict]:
+        if audit_id not in self._records:
+            return None
+        if self._expired(audit_id, time.monotonic()):
+            self._pop(audit_id)
+            return None
+        return self._records[audit_id]
+
+    def get(self, audit_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._live(audit_id)
+            return json.loads(json.dumps(record)) if record is not None else None
+
+    def update(self, audit_id: str, **fields) -> bool:
+        with self._lock:
+            record = self._live(audit_id)
+            if record is None:
+                return False
+            record.update(_normalize(fields))
+            self._touch(audit_id)
+            return True
+
+    def transition(self, audit_id: str, from_status: str, to_status: str, **fields) -> bool:
+        _check_transition(from_status, to_status)
+        with self._lock:
+            record = self._live(audit_id)
+            if record is None or record["status"] != from_status:
+                return False
+            record.update(_normalize(fields))
+            record["status"] = AuditStatus(to_status).value
+            self._touch(audit_id)
+            return True
+
+    def list_by_status(self, status: str, limit: int = 100) -> List[dict]:
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            matches = [r for r in self._records.values() if r.get("status") == status]
+            matches.sort(key=lambda r: r.get("created_at") or "")
+            return json.loads(json.dumps(matches[:limit]))
+
+    def delete(self, audit_id: str) -> bool:
+        with self._lock:
+            existed = audit_id in self._records
+            self._pop(audit_id)
+            return existed
+
+
+class SQLiteAuditStore(AuditStore):
+    """
+    SQLite-backed store in WAL mode.
+
+    WAL lets any number of readers run alongside one writer, across
+    threads and processes. Read-modify-write operations run inside
+    BEGIN IMMEDIATE so concurrent workers serialize on the write lock
+    instead of overwriting each other.
+    """
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS audits (
+                audit_id   TEXT PRIMARY KEY,
+                status     TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                data       TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_audits_status_created ON audits(status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_audits_created ON audits(created_at);
+            CREATE INDEX IF NOT EXISTS idx_audits_updated ON audits(updated_at);
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _cutoff(self) -> Optional[float]:
+        # Records last written before this (epoch seconds) have expired
+        if not self.ttl_seconds:
+            return None
+        return time.time() - self.ttl_seconds
+
+    def _read_modify_write(self, audit_id: str, mutate) -> bool:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM audits WHERE audit_id = ? AND updated_at >= ?", (audit_id, self._cutoff() or 0)
+            ).fetchone()
+            record = json.loads(row[0]) if row else None
+            if record is None or not mutate(record):
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "UPDATE audits SET status = ?, updated_at = ?, data = ? WHERE audit_id = ?",
+                (record["status"], time.time(), json.dumps(record), audit_id)
+            )
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def create(self, record: dict) -> None:
+        record = _normalize(record)
+        conn = self._conn()
+        cutoff = self._cutoff()
+        if cutoff:
+            conn.execute("DELETE FROM audits WHERE updated_at < ?", (cutoff,))
+        conn.execute(
+            "INSERT INTO audits (audit_id, status, created_at, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+            (record["audit_id"], record["status"], record["created_at"], time.time(), json.dumps(record))
+        )
+
+    def get(self, audit_id: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT data FROM audits WHERE audit_id = ? AND updated_at >= ?", (audit_id, self._cutoff() or 0)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, audit_id: str, **fields) -> bool:
+        fields = _normalize(fields)
+
+        def mutate(record):
+            record.update(fields)
+            return True
+
+        return self._read_modify_write(audit_id, mutate)
+
+    def transition(self, audit_id: str, from_status: str, to_status: str, **fields) -> bool:
+        _check_transition(from_status, to_status)
+        fields = _normalize(fields)
+
+        def mutate(record):
+            if record["status"] != from_status:
+                return False
+            record.update(fields)
+            record["status"] = AuditStatus(to_status).value
+            return True
+
+        return self._read_modify_write(audit_id, mutate)
+
+    def list_by_status(self, status: str, limit: int = 100) -> List[dict]:
+        rows = self._conn().execute(
+            "SELECT data FROM audits WHERE status = ? AND updated_at >= ? ORDER BY created_at LIMIT ?",
+            (AuditStatus(status).value, self._cutoff() or 0, limit)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete(self, audit_id: str) -> bool:
+        cursor = self._conn().execute("DELETE FROM audits WHERE audit_id = ?", (audit_id,))
+        return cursor.rowcount > 0
+
+
+def create_audit_store() -> AuditStore:
+    """Build the store selected by settings.audit_store_backend"""
+    ttl_seconds = settings.audit_store_ttl_hours * 3600 if settings.audit_store_ttl_hours else None
+
+    if settings.audit_store_backend == "sqlite":
+        return SQLiteAuditStore(settings.audit_store_path, ttl_seconds=ttl_seconds)
+    if settings.audit_store_backend == "memory":
+        return InMemoryAuditStore(ttl_seconds=ttl_seconds, max_entries=settings.audit_store_max_entries)
+
+    raise ValueError(f"Unknown audit_store_backend: {settings.audit_store_backend}")
@@ -0,0 +1,102 @@
+"""
+AWS Clients - Shared, Pooled boto3 Clients
+
+One boto3 client per (service, region) per process, created on first use
+with connection settings from app.config.Settings instead of boto3's
+defaults (10 pooled connections, legacy retries, no timeouts), which
+caused "Connection pool is full" warnings and stuck requests when many
+audits ran at once.
+
+Responsibilities:
+- Lazily create thread-safe clients (clients are shared; creation is
+  serialised on a private Session, since the default session is not
+  thread-safe)
+- Apply pool size, adaptive retries, connect/read timeouts, TCP keep-alive
+- LazyClient: a module-level stand-in, so services keep their
+  `s3` / `textract` / `bedrock` attributes (and tests can patch them)
+
+NOT responsible for:
+- Credentials (standard boto3 chain: env, profile, instance role)
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import boto3
+from botocore.client import BaseClient
+from botocore.config import Config
+
+from app.config import settings
+
+# Bedrock generations can legitimately take minutes
+_LONG_READ_SERVICES = {"bedrock-runtime", "bedrock-agent-runtime"}
+
+_clients: Dict[Tuple[str, str], BaseClient] = {}
+_lock = threading.Lock()
+_session: Optional[boto3.session.Session] = None
+
+
+def client_config(service_name: str) -> Config:
+    """botocore Config for a service, from settings"""
+    read_timeout = (
+        settings.bedrock_read_timeout_seconds if service_name in _LONG_READ_SERVICES
+        else settings.aws_read_timeout_seconds
+    )
+    return Config(
+        max_pool_connections=settings.aws_max_pool_connections,
+        retries={"mode": settings.aws_retry_mode, "total_max_attempts": settings.aws_max_attempts},
+        connect_timeout=settings.aws_connect_timeout_seconds,
+        read_timeout=read_timeout,
+        tcp_keepalive=settings.aws_tcp_keepalive,
+    )
+
+
+def get_client(service_name: str, region_name: Optional[str] = None) -> BaseClient:
+    """
+    Shared client for a service (created on first call).
+
+    Example:
+        >>> get_client("textract").detect_document_text(...)
+    """
+    region_name = region_name or os.getenv("AWS_REGION", settings.aws_region)
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is None:
+        global _session
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                if _session is None:
+                    _session = boto3.session.Session()
+                client = _session.client(service_name, region_name=region_name, config=client_config(service_name))
+                _clients[key] = client
+    return client
+
+
+def reset_clients() -> None:
+    """Drop cached clients (e.g. after changing credentials or settings in tests)"""
+    global _session
+    with _lock:
+        _clients.clear()
+        _session = None
+
+
+class LazyClient:
+    """
+    Attribute proxy to get_client(service, region), resolved on each use.
+
+    Example:
+        >>> s3 = LazyClient("s3")
+        >>> s3.put_object(...)      # client created here, then reused
+    """
+
+    def __init__(self, service_name: str, region_name: Optional[str] = None):
+        self._service_name = service_name
+        self._region_name = region_name
+
+    def __getattr__(self, name):
+        return getattr(get_client(self._service_name, self._region_name), name)
+
+    def __repr__(self) -> str:
+        return f"LazyClient({self._service_name!r}, {self._region_name!r})"
@@ -13,28 +13,65 @@ Responsibilities:
 """
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, List, Dict, Any
-import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError, BotoCoreError
 from dotenv import load_dotenv
 
+from app.config import settings
+from app.services import metrics
+from app.services.aws_clients import LazyClient
+from app.services.ocr.ocr_document import pages_from_textract_blocks, tables_from_textract_blocks
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize AWS clients
-textract = boto3.client('textract', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-s3 = boto3.client('s3', region_name=os.getenv('AWS_REGION', 'us-east-1'))
+# Shared, pooled AWS clients (created on first use, see aws_clients.py)
+textract = LazyClient('textract', region_name=os.getenv('AWS_REGION', 'us-east-1'))
+s3 = LazyClient('s3', region_name=os.getenv('AWS_REGION', 'us-east-1'))
 
 # S3 bucket configuration
 BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'bima-bot-hackathon-2026')
 
 
+# Shared S3 transfer tuning (one config + one thread pool per process)
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=max(5, settings.s3_multipart_part_size_mb) * 1024 * 1024,
+    multipart_chunksize=max(5, settings.s3_multipart_part_size_mb) * 1024 * 1024,
+    max_concurrency=settings.s3_multipart_concurrency,
+    use_threads=True
+)
+
+_transfer_executor: Optional[ThreadPoolExecutor] = None
+_transfer_executor_lock = threading.Lock()
+
+
 class AWSServiceError(Exception):
     """Base exception for AWS service errors"""
     pass
 
 
+def get_transfer_executor() -> ThreadPoolExecutor:
+    """
+    Shared thread pool for blocking S3 transfers.
+    
+    Sized from settings.s3_transfer_workers so async routes can run
+    uploads off the event loop without creating a pool per request.
+    """
+    global _transfer_executor
+    if _transfer_executor is None:
+        with _transfer_executor_lock:
+            if _transfer_executor is None:
+                _transfer_executor = ThreadPoolExecutor(
+                    max_workers=settings.s3_transfer_workers,
+                    thread_name_prefix="s3-transfer"
+                )
+    return _transfer_executor
+
+
 def upload_file_to_s3(local_path: str, s3_key: str) -> str:
     """
     Upload a file to S3 bucket.
@@ -50,7 +87,7 @@ def upload_file_to_s3(local_path: str, s3_key: str) -> str:
         AWSServiceError: If upload fails
     """
     try:
-        s3.upload_file(local_path, BUCKET_NAME, s3_key)
+        s3.upload_file(local_path, BUCKET_NAME, s3_key, Config=TRANSFER_CONFIG)
         s3_uri = f"s3://{BUCKET_NAME}/{s3_key}"
         print(f"✅ Uploaded {local_path} to {s3_uri}")
         return s3_uri
@@ -61,6 +98,128 @@ def upload_file_to_s3(local_path: str, s3_key: str) -> str:
         raise AWSServiceError(f"Failed to upload to S3: {str(e)}")
 
 
+def upload_bytes_to_s3(data: bytes, s3_key: str) -> str:
+    """
+    Upload an in-memory payload to S3 with a single PUT.
+    
+    Used for small streamed uploads that fit in one multipart part.
+    
+    Args:
+        data: Object content
+        s3_key: S3 object key (path in bucket)
+        
+    Returns:
+        S3 URI of uploaded object (s3://bucket/key)
+        
+    Raises:
+        AWSServiceError: If upload fails
+    """
+    try:
+        s3.put_object(Bucket=BUCKET_NAME, Key=s3_key, Body=data)
+        s3_uri = f"s3://{BUCKET_NAME}/{s3_key}"
+        print(f"✅ Uploaded {len(data)} bytes to {s3_uri}")
+        return s3_uri
+    
+    except (ClientError, BotoCoreError) as e:
+        raise AWSServiceError(f"Failed to upload to S3: {str(e)}")
+
+
+def create_multipart_upload(s3_key: str) -> str:
+    """
+    Start an S3 multipart upload.
+    
+    Args:
+        s3_key: S3 object key the parts will be assembled into
+        
+    Returns:
+        Multipart UploadId
+        
+    Raises:
+        AWSServiceError: If the upload cannot be started
+    """
+    try:
+        response = s3.create_multipart_upload(Bucket=BUCKET_NAME, Key=s3_key)
+        return response['UploadId']
+    
+    except (ClientError, BotoCoreError) as e:
+        raise AWSServiceError(f"Failed to start multipart upload: {str(e)}")
+
+
+def upload_part_to_s3(s3_key: str, upload_id: str, part_number: int, data: bytes) -> Dict[str, Any]:
+    """
+    Upload one part of a multipart upload.
+    
+    Args:
+        s3_key: S3 object key
+        upload_id: UploadId from create_multipart_upload
+        part_number: 1-based part index
+        data: Part content (>= 5 MiB except for the last part)
+        
+    Returns:
+        Part descriptor ({'PartNumber', 'ETag'}) for complete_multipart_upload
+        
+    Raises:
+        AWSServiceError: If the part upload fails
+    """
+    try:
+        response = s3.upload_part(
+            Bucket=BUCKET_NAME,
+            Key=s3_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+    
+    except (ClientError, BotoCoreError) as e:
+        raise AWSServiceError(f"Failed to upload part {part_number}: {str(e)}")
+
+
+def complete_multipart_upload(s3_key: str, upload_id: str, parts: List[Dict[str, Any]]) -> str:
+    """
+    Assemble uploaded parts into the final S3 object.
+    
+    Args:
+        s3_key: S3 object key
+        upload_id: UploadId from create_multipart_upload
+        parts: Part descriptors returned by upload_part_to_s3
+        
+    Returns:
+        S3 URI of the assembled object
+        
+    Raises:
+        AWSServiceError: If completion fails
+    """
+    try:
+        s3.complete_multipart_upload(
+            Bucket=BUCKET_NAME,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': sorted(parts, key=lambda p: p['PartNumber'])}
+        )
+        s3_uri = f"s3://{BUCKET_NAME}/{s3_key}"
+        print(f"✅ Streamed {len(parts)} parts to {s3_uri}")
+        return s3_uri
+    
+    except (ClientError, BotoCoreError) as e:
+        raise AWSServiceError(f"Failed to complete multipart upload: {str(e)}")
+
+
+def abort_multipart_upload(s3_key: str, upload_id: str) -> None:
+    """
+    Abort a multipart upload so S3 discards any stored parts.
+    
+    Best-effort: failures are logged, not raised, since this only runs
+    while another error is already being handled.
+    """
+    try:
+        s3.abort_multipart_upload(Bucket=BUCKET_NAME, Key=s3_key, UploadId=upload_id)
+        print(f"🗑️  Aborted multipart upload for {s3_key}")
+        
+    except (ClientError, BotoCoreError) as e:
+        print(f"⚠️  Failed to abort multipart upload for {s3_key}: {str(e)}")
+
+
 def download_file_from_s3(s3_key: str, local_path: Optional[str] = None) -> str:
     """
     Download a file from S3 bucket.
@@ -153,6 +312,26 @@ def list_s3_files(prefix: str = '') -> List[str]:
         raise AWSServiceError(f"Failed to list S3 files: {str(e)}")
 
 
+def _summarize_blocks(blocks: List[Dict[str, Any]], api: str) -> Dict[str, Any]:
+    """
+    Join LINE blocks into text and keep the blocks' structure in compact
+    per-page form (see ocr/ocr_document.py: lines, words, bbox, confidence),
+    plus table grids when the response came from TABLES analysis
+    """
+    pages = pages_from_textract_blocks(blocks)
+    confidences = [conf for page in pages for conf in page.line_conf]
+    
+    return {
+        "text": '\n'.join(page.text for page in pages),
+        "pages": [page.to_dict() for page in pages],
+        "tables": [table.to_dict() for table in tables_from_textract_blocks(blocks)],
+        "line_count": len(confidences),
+        "page_count": len(pages),
+        "mean_confidence": round(sum(confidences) / len(confidences), 2) if confidences else None,
+        "textract_api": api
+    }
+
+
 def extract_text_with_textract(s3_key: str) -> str:
     """
     Extract text from a document in S3 using AWS Textract.
@@ -168,6 +347,20 @@ def extract_text_with_textract(s3_key: str) -> str:
     Returns:
         Extracted text from all pages/blocks
         
+    Raises:
+        AWSServiceError: If Textract processing fails
+    """
+    return detect_document_with_textract(s3_key)["text"]
+
+
+def detect_document_with_textract(s3_key: str) -> Dict[str, Any]:
+    """
+    Synchronous Textract text detection, returning text plus block metadata.
+    
+    Returns:
+        Dict with text, pages (compact OcrPage dicts), line_count,
+        page_count, mean_confidence, textract_api
+        
     Raises:
         AWSServiceError: If Textract processing fails
     """
@@ -182,14 +375,9 @@ def extract_text_with_textract(s3_key: str) -> str:
         )
         
         # Extract LINE blocks (similar to pypdf's line-by-line extraction)
-        lines = []
-        for block in response.get('Blocks', []):
-            if block['BlockType'] == 'LINE':
-                lines.append(block.get('Text', ''))
-        
-        text = '\n'.join(lines)
-        print(f"📄 Extracted {len(lines)} lines from {s3_key}")
-        return text
+        result = _summarize_blocks(response.get('Blocks', []), api="sync")
+        print(f"📄 Extracted {result['line_count']} lines from {s3_key}")
+        return result
         
     except (ClientError, BotoCoreError) as e:
         # Enhanced error handling to capture detailed AWS error info
@@ -204,6 +392,73 @@ def extract_text_with_textract(s3_key: str) -> str:
             raise AWSServiceError(f"Textract failed to process {s3_key}: {str(e)}")
 
 
+def detect_document_bytes_with_textract(data: bytes, label: str = "document") -> Dict[str, Any]:
+    """
+    Synchronous Textract text detection on in-memory bytes (no S3 round-trip).
+    
+    Used for single pages split out of a larger PDF. Textract accepts
+    JPEG/PNG/TIFF or single-page PDF bytes up to 10 MB here.
+    
+    Returns:
+        Same dict as detect_document_with_textract
+        
+    Raises:
+        AWSServiceError: If Textract processing fails
+    """
+    try:
+        response = textract.detect_document_text(Document={'Bytes': data})
+        result = _summarize_blocks(response.get('Blocks', []), api="sync")
+        print(f"📄 Extracted {result['line_count']} lines from {label}")
+        return result
+        
+    except ClientError as e:
+        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+        error_msg = e.response.get('Error', {}).get('Message', str(e))
+        print(f"❌ Textract ClientError - Code: {error_code}, Message: {error_msg}")
+        raise AWSServiceError(f"Textract error for {label}: {error_code} - {error_msg}")
+    except BotoCoreError as e:
+        print(f"❌ Textract BotoCoreError: {str(e)}")
+        raise AWSServiceError(f"Textract failed to process {label}: {str(e)}")
+
+
+def analyze_document_tables(s3_key: Optional[str] = None, data: Optional[bytes] = None, label: str = "document") -> Dict[str, Any]:
+    """
+    Synchronous Textract AnalyzeDocument with TABLES, on S3 or in-memory bytes.
+    
+    Single-page documents only (multi-page PDFs: analyze_document_tables_async).
+    
+    Returns:
+        Same dict as detect_document_with_textract, plus "tables"
+        (list of OcrTable dicts)
+        
+    Raises:
+        AWSServiceError: If Textract processing fails
+    """
+    document = {'Bytes': data} if data is not None else {'S3Object': {'Bucket': BUCKET_NAME, 'Name': s3_key}}
+    label = s3_key or label
+    try:
+        response = textract.analyze_document(Document=document, FeatureTypes=['TABLES'])
+        result = _summarize_blocks(response.get('Blocks', []), api="sync")
+        print(f"📊 Found {len(result['tables'])} table(s) in {label}")
+        return result
+        
+    except ClientError as e:
+        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+        error_msg = e.response.get('Error', {}).get('Message', str(e))
+        print(f"❌ Textract ClientError - Code: {error_code}, Message: {error_msg}")
+        raise AWSServiceError(f"Textract table analysis error for {label}: {error_code} - {error_msg}")
+    except BotoCoreError as e:
+        print(f"❌ Textract BotoCoreError: {str(e)}")
+        raise AWSServiceError(f"Textract table analysis failed for {label}: {str(e)}")
+
+
+def analyze_document_tables_async(s3_key: str) -> Dict[str, Any]:
+    """Async AnalyzeDocument (TABLES) for multi-page documents, via the job tracker"""
+    from app.services.textract_tracker import get_textract_tracker
+    
+    return get_textract_tracker().submit(s3_key, feature_types=['TABLES']).result()
+
+
 def extract_text_from_s3_file(s3_key: str) -> str:
     """
     Extract text from a file already in S3 using Textract.
@@ -219,14 +474,34 @@ def extract_text_from_s3_file(s3_key: str) -> str:
     Raises:
         AWSServiceError: If extraction fails
     """
+    return detect_document_from_s3_file(s3_key)["text"]
+
+
+def detect_document_from_s3_file(s3_key: str, api: str = "probe") -> Dict[str, Any]:
+    """
+    Same as extract_text_from_s3_file, but returns text plus block
+    metadata (pages, line_count, page_count, mean_confidence, textract_api).
+    
+    Args:
+        s3_key: S3 object key of the document
+        api: "sync" or "async" when the caller already knows the document
+             shape (see ocr/document_info.py); "probe" tries sync first and
+             falls back to async on UnsupportedDocument
+    """
+    if api == "async":
+        return detect_document_with_async_textract(s3_key)
+    if api == "sync":
+        return detect_document_with_textract(s3_key)
+    
     try:
         # Try synchronous API first (faster for simple documents)
-        return extract_text_with_textract(s3_key)
+        return detect_document_with_textract(s3_key)
     except AWSServiceError as e:
         # If sync fails with UnsupportedDocument, try async API
         if "UnsupportedDocument" in str(e) or "unsupported document format" in str(e).lower():
             print(f"⚠️  Sync Textract failed, switching to async API for {s3_key}")
-            return extract_text_with_async_textract(s3_key)
+            metrics.increment("ocr_textract_probe_fallback_total")
+            return detect_document_with_async_textract(s3_key)
         else:
             # Re-raise other errors
             raise
@@ -239,7 +514,8 @@ def extract_text_with_async_textract(s3_key: str) -> str:
     This is the production-ready approach for complex/large PDFs that fail
     with the synchronous detect_document_text API.
     
-    Uses start_document_text_detection + polling for job completion.
+    Uses start_document_text_detection; completion is tracked by the
+    shared TextractJobTracker (see textract_tracker.py).
     
     Args:
         s3_key: S3 object key of the document
@@ -250,80 +526,23 @@ def extract_text_with_async_textract(s3_key: str) -> str:
     Raises:
         AWSServiceError: If Textract processing fails or times out
     """
-    import time
+    return detect_document_with_async_textract(s3_key)["text"]
+
+
+def detect_document_with_async_textract(s3_key: str) -> Dict[str, Any]:
+    """
+    Async Textract text detection, returning text plus block metadata.
+    
+    The job is tracked by the shared TextractJobTracker (one event loop
+    for all in-flight jobs, exponential backoff); this call just waits
+    on its result.
+    
+    Raises:
+        AWSServiceError: If Textract processing fails or times out
+    """
+    from app.services.textract_tracker import get_textract_tracker
     
-    try:
-        # Start async job
-        print(f"🔄 Starting async Textract job for {s3_key}")
-        response = textract.start_document_text_detection(
-            DocumentLocation={
-                'S3Object': {
-                    'Bucket': BUCKET_NAME,
-                    'Name': s3_key
-                }
-            }
-        )
-        
-        job_id = response['JobId']
-        print(f"📋 Job ID: {job_id}")
-        
-        # Poll for completion (optimized for speed - matching reference backend)
-        max_wait_time = 90  # seconds (increased from 30s to handle larger documents)
-        poll_interval = 1    # seconds (reduced from 2s for faster completion)
-        elapsed_time = 0
-        
-        while elapsed_time < max_wait_time:
-            print(f"⏳ Polling job... ({elapsed_time}s elapsed)")
-            time.sleep(poll_interval)
-            elapsed_time += poll_interval
-            
-            response = textract.get_document_text_detection(JobId=job_id)
-            status = response['JobStatus']
-            
-            if status == 'SUCCEEDED':
-                print(f"✅ Job completed in {elapsed_time} seconds")
-                
-                # Extract text from results
-                lines = []
-                
-                # Get first page of results
-                for block in response.get('Blocks', []):
-                    if block['BlockType'] == 'LINE':
-                        lines.append(block.get('Text', ''))
-                
-                # Handle pagination if there are more results
-                next_token = response.get('NextToken')
-                while next_token:
-                    response = textract.get_document_text_detection(
-                        JobId=job_id,
-                        NextToken=next_token
-                    )
-                    for block in response.get('Blocks', []):
-                        if block['BlockType'] == 'LINE':
-                            lines.append(block.get('Text', ''))
-                    next_token = response.get('NextToken')
-                
-                text = '\n'.join(lines)
-                print(f"📄 Extracted {len(lines)} lines from {s3_key} (async)")
-                return text
-                
-            elif status == 'FAILED':
-                error_msg = response.get('StatusMessage', 'Unknown error')
-                raise AWSServiceError(f"Async Textract job failed: {error_msg}")
-            
-            # Status is IN_PROGRESS, continue polling
-        
-        # Timeout reached
-        raise AWSServiceError(f"Async Textract job timed out after {max_wait_time}s for {s3_key}")
-        
-    except ClientError as e:
-        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
-        error_msg = e.response.get('Error', {}).get('Message', str(e))
-        print(f"❌ Async Textract ClientError - Code: {error_code}, Message: {error_msg}")
-        raise AWSServiceError(f"Async Textract error for {s3_key}: {error_code} - {error_msg}")
-    except BotoCoreError as e:
-        print(f"❌ Async Textract BotoCoreError: {str(e)}")
-        raise AWSServiceError(f"Async Textract failed to process {s3_key}: {str(e)}")
+    return get_textract_tracker().submit(s3_key).result()
 
 
 def upload_and_extract_text(local_path: str, s3_key: str) -> str:
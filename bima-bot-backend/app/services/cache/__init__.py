@@ -0,0 +1,16 @@
+# Cache Package
+from app.services.cache.disk_cache import DiskCache
+from app.services.cache.llm_cache import (
+    LLMCache,
+    cached_converse,
+    cached_retrieve_and_generate,
+    cached_retrieve_and_generate_stream
+)
+
+__all__ = [
+    "DiskCache",
+    "LLMCache",
+    "cached_converse",
+    "cached_retrieve_and_generate",
+    "cached_retrieve_and_generate_stream"
+]
@@ -0,0 +1,136 @@
+"""
+Disk Cache - Content-Addressed JSON Store with an LRU Size Cap
+
+Shared by the OCR and AI caches. Entries are JSON files named after their
+key (normally a SHA-256 hex digest), so any process on the host can read
+what another process wrote, and entries survive restarts.
+
+Responsibilities:
+- Atomic writes (temp file + rename), so readers never see partial entries
+- Least-recently-used eviction once the directory exceeds max_bytes
+  (recency is the file mtime, refreshed on every hit)
+- Treat unreadable/corrupt entries as misses
+
+NOT responsible for:
+- Deciding what goes into the key (callers hash content + versions)
+- Expiry by age (entries are content-addressed, so they never go stale)
+"""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class DiskCache:
+    """
+    JSON-on-disk cache. Keys must be filesystem-safe (hex digests are).
+
+    Example:
+        >>> cache = DiskCache("./cache/ocr", max_bytes=512 * 1024 * 1024)
+        >>> cache.set(sha256, {"text": "..."})
+        >>> cache.get(sha256)
+        {'text': '...'}
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max(0, max_bytes)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size_estimate = self._scan_size()
+
+    def _path(self, key: str) -> Path:
+        # Two-level fan-out keeps directories small
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _entries(self):
+        return self.directory.glob("*/*.json")
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self._entries():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value, or None on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a JSON-serialisable value, evicting old entries if needed"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            self._size_estimate += len(data)
+            if self._size_estimate > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        """
+        Remove least-recently-used entries until under 90% of max_bytes.
+
+        Rescans the directory, since other processes share it and our
+        running size estimate only covers this process's writes.
+        """
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+
+        self._size_estimate = total
+        if removed:
+            print(f"🧹 Cache {self.directory}: evicted {removed} entries ({total // 1024} KB kept)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": str(self.directory),
+            "size_bytes": self._scan_size(),
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,277 @@
+"""
+LLM Cache - Memoized Bedrock converse / retrieve_and_generate Calls
+
+Re-running an audit, or retrying one after a transient failure, used to
+pay for every Nova Lite / Nova Pro call again. Identical requests now
+return the stored response.
+
+Responsibilities:
+- Key on the whole request: model ID, prompt (messages / system / input),
+  inference config and, for retrieve_and_generate, the knowledge base
+- Two tiers: in-process LRU (settings.llm_cache_memory_entries) in front
+  of a DiskCache shared by all workers (settings.llm_cache_max_mb)
+- Expire entries after settings.llm_cache_ttl_seconds (model output and
+  the knowledge base can change under the same request)
+- Hit / miss counters (llm_cache_requests_total{api, result})
+- Streaming calls (cached_retrieve_and_generate_stream) share entries
+  with the plain calls; a hit is replayed as one chunk
+- Storing a response only once the caller's parse= callback accepts it,
+  so a malformed answer is retried next time instead of replayed
+
+NOT responsible for:
+- Parsing responses (the caller's parse= callback does that)
+- Caching failed calls (exceptions propagate and nothing is stored)
+
+Only deterministic calls (temperature 0) are cached unless the caller
+passes cache=True; sampled output such as the dispute letter is expected
+to vary between runs.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+from app.services import metrics
+from app.services.cache.disk_cache import DiskCache
+
+# Bump when the stored response format changes
+LLM_CACHE_VERSION = 1
+
+metrics.describe("llm_cache_requests_total", "Bedrock LLM calls by cache result (memory / disk / miss / bypass)")
+
+
+class LLMCache:
+    """
+    In-memory LRU in front of a DiskCache, with a TTL on both tiers.
+
+    Example:
+        >>> cache = LLMCache("./cache/llm", 256 * 1024 * 1024, ttl_seconds=3600)
+        >>> cache.set(key, response)
+        >>> cache.lookup(key)
+        ({...}, 'memory')
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: float, memory_entries: int = 256):
+        self.disk = DiskCache(directory, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = max(0, memory_entries)
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {"memory": 0, "disk": 0, "miss": 0}
+
+    def _fresh(self, entry: Dict[str, Any]) -> bool:
+        return self.ttl_seconds <= 0 or time.time() - entry.get("created_at", 0) < self.ttl_seconds
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        # Caller holds self._lock
+        if self.memory_entries == 0:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def lookup(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Returns:
+            (response, "memory" | "disk") on a hit, (None, "miss") otherwise
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._fresh(entry):
+                    self._memory.move_to_end(key)
+                    self.counts["memory"] += 1
+                    return copy.deepcopy(entry["response"]), "memory"
+                del self._memory[key]
+
+        entry = self.disk.get(key)
+        if entry is not None and not self._fresh(entry):
+            self.disk.delete(key)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.counts["miss"] += 1
+                return None, "miss"
+            self._remember(key, entry)
+            self.counts["disk"] += 1
+        return copy.deepcopy(entry["response"]), "disk"
+
+    def set(self, key: str, response: Dict[str, Any]) -> None:
+        # Round-trip through JSON so both tiers hold the same plain data
+        entry = {"created_at": time.time(), "response": json.loads(json.dumps(response, default=str))}
+        with self._lock:
+            self._remember(key, entry)
+        self.disk.set(key, entry)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+        self.disk.delete(key)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+            memory_entries = len(self._memory)
+        return {**counts, "memory_entries": memory_entries, "ttl_seconds": self.ttl_seconds, "disk": self.disk.stats()}
+
+
+_llm_cache = (
+    LLMCache(
+        settings.llm_cache_dir,
+        settings.llm_cache_max_mb * 1024 * 1024,
+        settings.llm_cache_ttl_seconds,
+        settings.llm_cache_memory_entries
+    )
+    if settings.llm_cache_enabled else None
+)
+
+
+def llm_cache_key(api: str, request: Dict[str, Any]) -> str:
+    """SHA-256 of the canonical request (model, prompt, inference config, ...)"""
+    material = json.dumps(
+        {"version": LLM_CACHE_VERSION, "api": api, "request": request},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _is_deterministic(temperature: Any) -> bool:
+    # No temperature means the model default, which samples
+    try:
+        return temperature is not None and float(temperature) == 0.0
+    except (TypeError, ValueError):
+        return False
+
+
+def _cached_call(
+    api: str,
+    call: Callable[..., Dict[str, Any]],
+    request: Dict[str, Any],
+    cacheable: bool,
+    on_hit: Optional[Callable[[Dict[str, Any]], None]] = None,
+    parse: Optional[Callable[[Dict[str, Any]], Any]] = None
+) -> Any:
+    parse = parse or (lambda response: response)
+    cache = _llm_cache
+    if cache is None or not cacheable:
+        metrics.increment("llm_cache_requests_total", {"api": api, "result": "bypass"})
+        return parse(call(**request))
+
+    key = llm_cache_key(api, request)
+    response, tier = cache.lookup(key)
+    metrics.increment("llm_cache_requests_total", {"api": api, "result": tier})
+    if response is not None:
+        try:
+            parsed = parse(response)
+        except Exception as e:
+            # Stored before the caller's parsing got stricter: call again
+            print(f"⚠️ LLM cache entry rejected by parser ({api}): {e}")
+            cache.delete(key)
+        else:
+            print(f"♻️ LLM cache hit ({api}, {tier})")
+            if on_hit is not None:
+                on_hit(response)
+            return parsed
+
+    response = call(**request)
+    # Raises before anything is stored if the response is malformed
+    parsed = parse(response)
+    # Request IDs / retry counts belong to the original call
+    stored = {k: v for k, v in response.items() if k != "ResponseMetadata"}
+    cache.set(key, stored)
+    return parsed
+
+
+def cached_converse(
+    client,
+    cache: Optional[bool] = None,
+    parse: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    **request
+) -> Any:
+    """
+    client.converse(**request), served from the LLM cache when possible.
+
+    Args:
+        cache: True / False to force caching on or off; None = cache only
+               when inferenceConfig.temperature is 0
+        parse: Turns the response into the caller's result (returned
+               instead of the raw response). The response is cached only
+               if it returns without raising; its exception propagates.
+    """
+    if cache is None:
+        cache = _is_deterministic((request.get("inferenceConfig") or {}).get("temperature"))
+    return _cached_call("converse", client.converse, request, cache, parse=parse)
+
+
+def _rag_cacheable(request: Dict[str, Any], cache: Optional[bool]) -> bool:
+    if "sessionId" in request:
+        return False
+    if cache is not None:
+        return cache
+    kb_config = (request.get("retrieveAndGenerateConfiguration") or {}).get("knowledgeBaseConfiguration") or {}
+    text_config = ((kb_config.get("generationConfiguration") or {}).get("inferenceConfig") or {}).get("textInferenceConfig") or {}
+    return _is_deterministic(text_config.get("temperature"))
+
+
+def cached_retrieve_and_generate(
+    client,
+    cache: Optional[bool] = None,
+    parse: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    **request
+) -> Any:
+    """
+    client.retrieve_and_generate(**request), served from the LLM cache when
+    possible. Calls that continue a session are never cached.
+
+    Args:
+        cache: True / False to force caching on or off; None = cache only
+               when the generation temperature is 0
+        parse: As for cached_converse
+    """
+    return _cached_call(
+        "retrieve_and_generate", client.retrieve_and_generate, request, _rag_cacheable(request, cache), parse=parse
+    )
+
+
+def cached_retrieve_and_generate_stream(
+    client,
+    on_text: Callable[[str], None],
+    cache: Optional[bool] = None,
+    parse: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    **request
+) -> Any:
+    """
+    client.retrieve_and_generate_stream(**request): on_text gets each text
+    chunk as it arrives (the whole text at once on a cache hit).
+
+    Returns a retrieve_and_generate-shaped response ({"output": {"text"},
+    "citations", "sessionId"}), or parse(response) if given, cached under
+    the same key as the non-streaming call, so either call serves the other.
+    """
+    def stream(**request):
+        response = client.retrieve_and_generate_stream(**request)
+        chunks, citations = [], []
+        for event in response["stream"]:
+            if "output" in event:
+                text = event["output"].get("text", "")
+                chunks.append(text)
+                on_text(text)
+            elif "citation" in event:
+                citations.append(event["citation"])
+        return {"output": {"text": "".join(chunks)}, "citations": citations, "sessionId": response.get("sessionId")}
+
+    return _cached_call(
+        "retrieve_and_generate", stream, request, _rag_cacheable(request, cache),
+        on_hit=lambda response: on_text(response["output"]["text"]), parse=parse
+    )
@@ -0,0 +1,224 @@
+"""
+Durable Audit Job Queue - SQLite-backed, Multi-Process
+
+Lets the API tier enqueue audits and separate worker processes
+(`python -m app.worker`) run them, so API and pipeline capacity scale
+independently. Needs no external services: the queue is a WAL-mode
+SQLite file shared by every process on the host.
+
+Job lifecycle: queued -> running -> done | failed
+A running job whose worker stops heartbeating for longer than the
+visibility timeout is put back in the queue (up to max_attempts).
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from app.services.job_queue import QueueSlot, QueueFullError, QueueClosedError
+
+
+class SQLiteJobQueue:
+    """
+    Same submission interface as AuditJobQueue (reserve/submit/position),
+    plus claim/complete/fail for worker processes.
+    """
+
+    def __init__(self, path: str, max_depth: int, default_retry_after: int = 30):
+        self.path = path
+        self.max_depth = max(1, max_depth)
+        self.default_retry_after = default_retry_after
+        self._local = threading.local()
+        self._closed = False
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id       TEXT NOT NULL UNIQUE,
+                status       TEXT NOT NULL,
+                enqueued_at  REAL NOT NULL,
+                heartbeat_at REAL,
+                worker_id    TEXT,
+                attempts     INTEGER NOT NULL DEFAULT 0,
+                error        TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_seq ON jobs(status, seq);
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- API-side lifecycle (work happens in worker processes) ---
+
+    def start(self) -> None:
+        self._closed = False
+        print(f"📥 Durable audit queue at {self.path} (run `python -m app.worker` to process jobs)")
+
+    def shutdown(self, timeout: Optional[float] = None) -> List[str]:
+        # Queued jobs survive restarts; nothing is abandoned
+        self._closed = True
+        return []
+
+    # --- Submission ---
+
+    @contextmanager
+    def reserve(self) -> Iterator[QueueSlot]:
+        """
+        Check there is room for one more job.
+
+        Depth is shared by every API process, so this is a soft limit:
+        concurrent reservations in different processes can overshoot it
+        by a few jobs.
+        """
+        if self._closed:
+            raise QueueClosedError("Audit queue is shutting down")
+        queued = self._conn().execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        if queued >= self.max_depth:
+            raise QueueFullError(self.default_retry_after)
+        yield QueueSlot(self)
+
+    def submit(self, job_id: str) -> int:
+        with self.reserve() as slot:
+            return slot.submit(job_id)
+
+    def _enqueue_reserved(self, job_id: str) -> int:
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO jobs (job_id, status, enqueued_at) VALUES (?, 'queued', ?) "
+            "ON CONFLICT(job_id) DO UPDATE SET status = 'queued', enqueued_at = excluded.enqueued_at, "
+            "worker_id = NULL, heartbeat_at = NULL, attempts = 0, error = NULL",
+            (job_id, time.time())
+        )
+        return self.position(job_id) or 1
+
+    # --- Introspection ---
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position while waiting, 0 while running, None if unknown"""
+        conn = self._conn()
+        row = conn.execute("SELECT seq, status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        seq, status = row
+        if status == "running":
+            return 0
+        if status != "queued":
+            return None
+        return conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND seq <= ?", (seq,)
+        ).fetchone()[0]
+
+    def stats(self) -> dict:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict(rows)
+        return {
+            "running": counts.get("running", 0),
+            "queued": counts.get("queued", 0),
+            "max_depth": self.max_depth,
+        }
+
+    # --- Worker-side API ---
+
+    def reap_exhausted(self, visibility_timeout: float, max_attempts: int) -> List[str]:
+        """
+        Fail jobs whose worker stopped heartbeating and that have already
+        been tried max_attempts times.
+
+        Returns:
+            IDs of the jobs just failed, so their audits can be marked FAILED
+        """
+        conn = self._conn()
+        stale_before = time.time() - visibility_timeout
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (stale_before, max_attempts)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = 'failed', error = 'Worker died; retries exhausted' WHERE job_id = ?",
+                rows
+            )
+            conn.execute("COMMIT")
+            return [row[0] for row in rows]
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, worker_id: str, visibility_timeout: float, max_attempts: int) -> Optional[str]:
+        """
+        Atomically take the oldest queued job.
+
+        Jobs of workers that stopped heartbeating are re-queued first if
+        they have attempts left (see reap_exhausted for the rest).
+
+        Returns:
+            The claimed job_id, or None if the queue is empty
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', worker_id = NULL "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts < ?",
+                (now - visibility_timeout, max_attempts)
+            )
+
+            row = conn.execute(
+                "SELECT seq, job_id FROM jobs WHERE status = 'queued' ORDER BY seq LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker_id = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                "WHERE seq = ?",
+                (worker_id, now, row[0])
+            )
+            conn.execute("COMMIT")
+            return row[1]
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def heartbeat(self, job_id: str, worker_id: str) -> None:
+        """Keep a long-running job from being reclaimed"""
+        self._conn().execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+            (time.time(), job_id, worker_id)
+        )
+
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        """
+        Mark a job done. Only the worker still holding the claim can do so.
+
+        Returns:
+            False if the job was reclaimed by another worker meanwhile
+        """
+        cursor = self._conn().execute(
+            "UPDATE jobs SET status = 'done' WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+            (job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Mark a job failed; same claim check as complete"""
+        cursor = self._conn().execute(
+            "UPDATE jobs SET status = 'failed', error = ? WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+            (error, job_id, worker_id)
+        )
+        return cursor.rowcount > 0
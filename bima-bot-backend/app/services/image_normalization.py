@@ -0,0 +1,215 @@
+"""
+Image Normalization - Photographed Bills Before Upload
+
+Bills often arrive as 12 MP phone photos: sideways (EXIF orientation),
+with desk around the paper, at far more pixels than OCR needs. Normalizing
+them once at upload shrinks what we send to S3 and Textract and makes OCR
+faster, without hurting accuracy.
+
+Responsibilities:
+- Apply EXIF orientation
+- Crop to the document (bright paper against a darker background)
+- Downscale to an OCR-friendly size (settings.image_max_long_edge_px,
+  ~300 DPI for an A4 page)
+- Re-encode as greyscale JPEG, keeping the original if that is smaller
+- Report before/after sizes
+- Shrink an image under a byte limit for OCR (shrink_image_bytes)
+
+NOT responsible for:
+- PDFs (passed through untouched)
+- OCR-specific cleanup such as binarization (ocr/preprocessing.py)
+"""
+
+import io
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.config import settings
+
+_FORMATS = {"JPEG": "jpg", "PNG": "png"}
+
+
+@dataclass
+class ImageNormalization:
+    path: str                      # normalized file (may be the input when unchanged)
+    extension: str                 # "jpg" / "png"
+    original_bytes: int
+    normalized_bytes: int
+    original_size: Tuple[int, int]
+    normalized_size: Tuple[int, int]
+    exif_rotated: bool
+    cropped: bool
+    reencoded: bool
+    elapsed_ms: float
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data.pop("path")
+        return data
+
+
+def _otsu_threshold(histogram) -> int:
+    total = sum(histogram)
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_bg = weight_bg = 0
+    best, threshold = -1.0, 128
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += level * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best:
+            best, threshold = between, level
+    return threshold
+
+
+def find_document_bbox(image: Image.Image, min_fraction: float = 0.3) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Bounding box of the paper in a photo, or None if there is nothing
+    worth cropping (a flat scan, or no clear paper region).
+
+    Rows and columns that are mostly brighter than the Otsu threshold
+    are paper; the box spans the first to the last of them.
+    """
+    gray = image.convert("L")
+    scale = 256 / max(gray.size)
+    thumb = gray.resize((max(1, int(gray.width * scale)), max(1, int(gray.height * scale))), Image.BOX)
+    threshold = _otsu_threshold(thumb.histogram())
+    mask = thumb.point(lambda v: 255 if v > threshold else 0)
+
+    # Averaging the mask down to one column / one row gives the share of
+    # paper pixels per row / column
+    row_share = [v / 255 for v in mask.resize((1, mask.height), Image.BOX).tobytes()]
+    col_share = [v / 255 for v in mask.resize((mask.width, 1), Image.BOX).tobytes()]
+    rows = [i for i, share in enumerate(row_share) if share > 0.5]
+    cols = [i for i, share in enumerate(col_share) if share > 0.5]
+    if not rows or not cols:
+        return None
+
+    top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    area = (bottom - top) * (right - left) / (mask.width * mask.height)
+    if area > 0.95 or area < min_fraction:
+        return None
+
+    # Background shows around a photographed page on at least three sides
+    # (or both left and right); dark header/footer bands on a flat scan only
+    # touch the top and bottom edges and must not be cropped away
+    edge = 3
+    margins = {
+        "top": top >= edge, "bottom": mask.height - bottom >= edge,
+        "left": left >= edge, "right": mask.width - right >= edge,
+    }
+    if sum(margins.values()) < 3 and not (margins["left"] and margins["right"]):
+        return None
+
+    # Back to full resolution with a small margin
+    margin = 2
+    return (
+        max(0, int((left - margin) / scale)),
+        max(0, int((top - margin) / scale)),
+        min(image.width, int((right + margin) / scale)),
+        min(image.height, int((bottom + margin) / scale)),
+    )
+
+
+def is_image_file(file_path: str) -> bool:
+    with open(file_path, "rb") as f:
+        header = f.read(8)
+    return header.startswith(b"\xff\xd8\xff") or header.startswith(b"\x89PNG\r\n\x1a\n")
+
+
+def normalize_image_file(src_path: str, dest_dir: str, stem: str = "bill") -> ImageNormalization:
+    """
+    Normalize a JPEG/PNG upload into dest_dir/<stem>.<ext>.
+
+    The source file is removed once the normalized file is written (unless
+    it already is the destination).
+
+    Raises:
+        OSError / PIL.UnidentifiedImageError: If the image cannot be read
+    """
+    start = time.perf_counter()
+    src = Path(src_path)
+    original_bytes = src.stat().st_size
+
+    with Image.open(src) as opened:
+        source_format = opened.format
+        original_size = opened.size
+        exif_rotated = opened.getexif().get(0x0112, 1) != 1    # Orientation tag
+        image = ImageOps.exif_transpose(opened)
+        image.load()
+
+    box = find_document_bbox(image)
+    if box is not None:
+        image = image.crop(box)
+
+    long_edge = max(image.size)
+    if long_edge > settings.image_max_long_edge_px:
+        scale = settings.image_max_long_edge_px / long_edge
+        image = image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.convert("L").save(buffer, "JPEG", quality=settings.image_jpeg_quality, optimize=True)
+    encoded = buffer.getvalue()
+
+    changed_pixels = exif_rotated or box is not None or image.size != original_size
+    if len(encoded) < original_bytes or changed_pixels:
+        extension, data, reencoded = "jpg", encoded, True
+    else:
+        extension, data, reencoded = _FORMATS.get(source_format, "jpg"), src.read_bytes(), False
+
+    dest = Path(dest_dir) / f"{stem}.{extension}"
+    dest.write_bytes(data)
+    if dest.resolve() != src.resolve():
+        src.unlink(missing_ok=True)
+
+    return ImageNormalization(
+        path=str(dest.absolute()),
+        extension=extension,
+        original_bytes=original_bytes,
+        normalized_bytes=len(data),
+        original_size=original_size,
+        normalized_size=image.size if reencoded else original_size,
+        exif_rotated=exif_rotated,
+        cropped=box is not None,
+        reencoded=reencoded,
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 1),
+    )
+
+
+def shrink_image_bytes(src_path: str, max_bytes: int) -> bytes:
+    """
+    JPEG/PNG as greyscale JPEG bytes of at most max_bytes, for OCR APIs
+    with a request size limit. EXIF orientation is applied and the long
+    edge capped at settings.image_max_long_edge_px, then reduced further
+    until the encoding fits.
+
+    Raises:
+        OSError / PIL.UnidentifiedImageError: If the image cannot be read
+        ValueError: If it cannot be made small enough
+    """
+    with Image.open(src_path) as opened:
+        image = ImageOps.exif_transpose(opened).convert("L")
+
+    long_edge = min(max(image.size), settings.image_max_long_edge_px)
+    while long_edge >= 500:
+        scale = long_edge / max(image.size)
+        resized = image if scale >= 1 else image.resize(
+            (round(image.width * scale), round(image.height * scale)), Image.LANCZOS
+        )
+        buffer = io.BytesIO()
+        resized.save(buffer, "JPEG", quality=settings.image_jpeg_quality, optimize=True)
+        if buffer.tell() <= max_bytes:
+            return buffer.getvalue()
+        long_edge = int(long_edge * 0.75)
+    raise ValueError(f"Could not shrink {Path(src_path).name} under {max_bytes} bytes")
@@ -0,0 +1,201 @@
+"""
+Bill Table Parser - Deterministic Line Items from Textract Tables
+
+Hospital bills are almost always printed as a table (Particulars / Qty /
+Rate / Amount). When Textract TABLES analysis gives us that grid, the
+columns can be read directly instead of asking an LLM to re-discover them
+from flat text: faster, repeatable, and quantity / unit price survive.
+
+Responsibilities:
+- Find the line-item table(s) by their header row
+- Map header columns to description / quantity / unit_price / amount
+- Parse Indian-format amounts ("₹1,23,456.00", "Rs. 500/-")
+- Categorise rows by keyword into the structuring categories
+- Hand back rows it cannot resolve (no amount, unknown category) as text
+
+NOT responsible for:
+- Calling the LLM for unresolved rows (audit_service does that)
+- Validating totals against the bill
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.services.ocr.ocr_document import OcrTable
+
+# Checked in this order: "Unit Price" must win over the "unit" quantity synonym
+_HEADER_SYNONYMS = [
+    ("unit_price", ("rate", "unit price", "unit rate", "price", "mrp", "unit cost", "tariff", "per unit")),
+    ("amount", ("amount", "amt", "total", "net amount", "value", "charges")),
+    ("quantity", ("qty", "quantity", "units", "unit", "nos", "no of", "days", "count")),
+    ("description", ("description", "particulars", "particular", "item", "items", "service", "services",
+                     "details", "name", "test", "procedure")),
+]
+
+_TOTAL_ROW = re.compile(
+    r"^(sub\s*-?\s*total|grand\s+total|total|net\s+(payable|amount|total)|amount\s+payable|"
+    r"balance|round(ed)?\s*off|bill\s+amount)\b",
+    re.IGNORECASE
+)
+
+# First match wins, so the more specific categories come first
+# (e.g. "surgeon fee" is a doctor fee, "OT consumables" are consumables)
+_CATEGORY_KEYWORDS = [
+    ("ICU", ("icu", "iccu", "nicu", "intensive care", "ccu")),
+    ("Doctor Fees", ("consultation", "consultant", "doctor", "visit", "surgeon fee", "surgeons fee",
+                     "professional fee", "professional charges", "dr")),
+    ("Consumables", ("consumable", "consumables", "gloves", "syringe", "gauze", "mask", "cotton",
+                     "disposable", "kit", "catheter", "cannula")),
+    ("Room Rent", ("room", "ward", "bed charges", "bed charge", "accommodation", "nursing")),
+    ("Diagnostics", ("lab", "laboratory", "test", "x ray", "xray", "scan", "mri", "ct", "ultrasound",
+                     "usg", "ecg", "echo", "blood", "pathology", "radiology", "culture", "profile")),
+    ("Pharmacy", ("pharmacy", "medicine", "medicines", "drug", "drugs", "tablet", "tab", "inj",
+                  "injection", "syrup", "capsule", "cap", "iv fluid", "iv fluids")),
+    ("Surgery", ("surgery", "operation", "ot charges", "operation theatre", "procedure", "implant",
+                 "anaesthesia", "anesthesia")),
+    ("Admin", ("admission", "registration", "admin", "administrative", "file charges",
+               "documentation", "medical records")),
+]
+
+_AMOUNT_NOISE = re.compile(r"(₹|rs\.?|inr|/-)", re.IGNORECASE)
+
+
+@dataclass
+class TableParseResult:
+    items: List[Dict[str, Any]] = field(default_factory=list)  # same shape as structure_and_categorize items
+    unresolved_rows: List[str] = field(default_factory=list)   # "header: cell | header: cell" text
+    tables_used: int = 0
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).split())
+
+
+def _has_phrase(text: str, phrases) -> bool:
+    padded = f" {text} "
+    return any(f" {phrase} " in padded for phrase in phrases)
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """Number in a bill cell, or None ("1,200.50" -> 1200.5, "(500)" -> -500)"""
+    cleaned = _AMOUNT_NOISE.sub("", text or "").replace(",", "").strip()
+    negative = cleaned.startswith("(") and cleaned.endswith(")") or cleaned.startswith("-")
+    cleaned = cleaned.strip("()-+ ")
+    if not re.fullmatch(r"\d+(\.\d+)?", cleaned):
+        return None
+    value = float(cleaned)
+    return -value if negative else value
+
+
+def categorize(description: str) -> Optional[str]:
+    """Structuring category for a line item, or None if no keyword matches"""
+    text = _normalize(description)
+    for category, keywords in _CATEGORY_KEYWORDS:
+        if _has_phrase(text, keywords):
+            return category
+    return None
+
+
+def detect_columns(header: List[str]) -> Dict[str, int]:
+    """
+    Map roles to column indexes from a header row. The rightmost amount
+    column wins ("Gross Amount | Discount | Net Amount"); other roles take
+    the leftmost match.
+    """
+    columns: Dict[str, int] = {}
+    for index, cell in enumerate(header):
+        text = _normalize(cell)
+        if not text:
+            continue
+        for role, synonyms in _HEADER_SYNONYMS:
+            if _has_phrase(text, synonyms):
+                if role == "amount" or role not in columns:
+                    columns[role] = index
+                break
+    return columns
+
+
+def _find_header(table: OcrTable, max_rows: int = 3):
+    for index, row in enumerate(table.rows[:max_rows]):
+        columns = detect_columns(row)
+        if "description" in columns and "amount" in columns:
+            return index, columns
+    return None, None
+
+
+def _row_text(header: List[str], row: List[str]) -> str:
+    parts = []
+    for name, cell in zip(header, row):
+        if cell.strip():
+            parts.append(f"{name.strip()}: {cell.strip()}" if name.strip() else cell.strip())
+    return " | ".join(parts)
+
+
+def _resolve_row(row: List[str], columns: Dict[str, int]) -> Optional[Dict[str, Any]]:
+    def cell(role):
+        index = columns.get(role)
+        return row[index].strip() if index is not None and index < len(row) else ""
+
+    description = cell("description")
+    amount = parse_amount(cell("amount"))
+    quantity = parse_amount(cell("quantity"))
+    unit_price = parse_amount(cell("unit_price"))
+
+    if amount is None and quantity is not None and unit_price is not None:
+        amount = round(quantity * unit_price, 2)
+    category = categorize(description)
+    if not description or amount is None or category is None:
+        return None
+
+    # Quantity/rate that don't explain the amount (discounts, taxes, OCR
+    # slips) are dropped rather than fed to the room-rent rule
+    if quantity is not None and unit_price is not None and abs(quantity * unit_price - amount) > max(1.0, 0.01 * abs(amount)):
+        quantity = unit_price = None
+    if quantity is not None and quantity != int(quantity):
+        quantity = None
+
+    return {
+        "description": description,
+        "amount": amount,
+        "category": category,
+        "quantity": int(quantity) if quantity is not None else None,
+        "unit_price": unit_price,
+        "source": "table",
+    }
+
+
+def line_items_from_tables(tables: List[OcrTable]) -> TableParseResult:
+    """
+    Convert line-item tables into structured items.
+
+    Tables without a recognisable header (patient details, summaries) are
+    ignored. Within a line-item table, empty rows, repeated headers and
+    total/sub-total rows are skipped; every other row becomes an item or
+    an unresolved row.
+    """
+    result = TableParseResult()
+    for table in tables:
+        header_index, columns = _find_header(table)
+        if header_index is None:
+            continue
+        result.tables_used += 1
+        header = table.rows[header_index]
+
+        for row in table.rows[header_index + 1:]:
+            if not any(cell.strip() for cell in row):
+                continue
+            if detect_columns(row) == columns:
+                continue  # header repeated on a continuation page
+            description_index = columns["description"]
+            description = row[description_index] if description_index < len(row) else ""
+            first_text = description.strip() or next((c.strip() for c in row if c.strip()), "")
+            if _TOTAL_ROW.match(first_text):
+                continue
+
+            item = _resolve_row(row, columns)
+            if item is not None:
+                result.items.append(item)
+            else:
+                result.unresolved_rows.append(_row_text(header, row))
+    return result
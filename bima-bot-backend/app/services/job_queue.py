@@ -0,0 +1,242 @@
+"""
+Audit Job Queue - Bounded In-Process Worker Pool
+
+Replaces FastAPI BackgroundTasks for the audit pipeline so bursts of
+/complete calls cannot saturate threads or Bedrock quotas.
+
+Responsibilities:
+- Run jobs on a fixed number of worker threads
+- Bound the number of waiting jobs; reject with a Retry-After hint when full
+- Report each waiting job's queue position
+- Drain queued work on shutdown (with a timeout)
+
+NOT responsible for:
+- Audit status bookkeeping (the handler does that)
+
+With audit_job_backend="durable" jobs go to a SQLite queue instead and
+run in separate `python -m app.worker` processes (see durable_queue.py).
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Iterator, List, Optional, Set
+
+from app.config import settings
+
+
+class QueueFullError(Exception):
+    """Raised when no queue slot is free"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"Audit queue is full, retry after {retry_after}s")
+
+
+class QueueClosedError(Exception):
+    """Raised when submitting to a queue that is shutting down"""
+    pass
+
+
+class QueueSlot:
+    """A reserved place in the queue, handed out by reserve()"""
+
+    def __init__(self, queue):
+        self._queue = queue
+        self.used = False
+
+    def submit(self, job_id: str) -> int:
+        """Enqueue into the reserved slot. Returns the 1-based queue position"""
+        position = self._queue._enqueue_reserved(job_id)
+        self.used = True
+        return position
+
+
+class AuditJobQueue:
+    """
+    Fixed-size worker pool with a bounded FIFO queue.
+
+    Callers reserve a slot first (so they can do their own bookkeeping
+    knowing the job will be accepted), then submit into it.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str], None],
+        workers: int,
+        max_depth: int,
+        default_retry_after: int = 30
+    ):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_depth = max(1, max_depth)
+        self.default_retry_after = default_retry_after
+
+        self._pending: Deque[str] = deque()
+        self._running: Set[str] = set()
+        self._reserved = 0
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+        self._avg_job_seconds: Optional[float] = None
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        with self._cond:
+            if self._threads:
+                return
+            self._closed = False
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"audit-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        print(f"🧵 Audit job queue started ({self.workers} workers, max depth {self.max_depth})")
+
+    def shutdown(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        Stop accepting jobs and let workers drain the queue.
+
+        Returns:
+            IDs of queued jobs that never started because the timeout expired
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in threads:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            thread.join(remaining)
+
+        with self._cond:
+            abandoned = list(self._pending)
+            self._pending.clear()
+            self._threads = [t for t in self._threads if t.is_alive()]
+
+        if abandoned:
+            print(f"⚠️  Audit job queue shut down with {len(abandoned)} job(s) not started")
+        return abandoned
+
+    # --- Submission ---
+
+    @contextmanager
+    def reserve(self) -> Iterator[QueueSlot]:
+        """
+        Reserve a queue slot, raising QueueFullError if none is free.
+
+        The slot is released automatically if the caller never submits.
+        """
+        with self._cond:
+            if self._closed:
+                raise QueueClosedError("Audit queue is shutting down")
+            if len(self._pending) + self._reserved >= self.max_depth:
+                raise QueueFullError(self._retry_after())
+            self._reserved += 1
+
+        slot = QueueSlot(self)
+        try:
+            yield slot
+        finally:
+            if not slot.used:
+                with self._cond:
+                    self._reserved -= 1
+
+    def submit(self, job_id: str) -> int:
+        """Reserve and enqueue in one step. Returns the 1-based queue position"""
+        with self.reserve() as slot:
+            return slot.submit(job_id)
+
+    def _enqueue_reserved(self, job_id: str) -> int:
+        if not self._threads:
+            self.start()
+        with self._cond:
+            self._reserved -= 1
+            self._pending.append(job_id)
+            self._cond.notify()
+            return len(self._pending)
+
+    # --- Introspection ---
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position while waiting, 0 while running, None if unknown"""
+        with self._cond:
+            if job_id in self._running:
+                return 0
+            try:
+                return self._pending.index(job_id) + 1
+            except ValueError:
+                return None
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": len(self._running),
+                "queued": len(self._pending),
+                "max_depth": self.max_depth,
+            }
+
+    def _retry_after(self) -> int:
+        """Estimate seconds until a slot frees up from recent job durations"""
+        if self._avg_job_seconds is None:
+            return self.default_retry_after
+        waves = (len(self._pending) + self._reserved) / self.workers
+        return int(min(300, max(1, self._avg_job_seconds * max(1.0, waves))))
+
+    # --- Workers ---
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                job_id = self._pending.popleft()
+                self._running.add(job_id)
+
+            start = time.monotonic()
+            try:
+                self.handler(job_id)
+            except Exception as e:
+                print(f"❌ Audit job {job_id} crashed: {e}")
+            finally:
+                elapsed = time.monotonic() - start
+                with self._cond:
+                    self._running.discard(job_id)
+                    # Exponentially weighted average for Retry-After estimates
+                    self._avg_job_seconds = elapsed if self._avg_job_seconds is None else (
+                        0.8 * self._avg_job_seconds + 0.2 * elapsed
+                    )
+
+
+def create_job_queue(handler: Callable[[str], None]):
+    """
+    Build the queue selected by settings.audit_job_backend.
+
+    "inprocess": jobs run on worker threads inside the API process.
+    "durable":   jobs are persisted to SQLite and run by `python -m app.worker`.
+    """
+    if settings.audit_job_backend == "inprocess":
+        return AuditJobQueue(
+            handler=handler,
+            workers=settings.audit_workers,
+            max_depth=settings.audit_queue_max_depth,
+            default_retry_after=settings.audit_queue_retry_after_seconds
+        )
+
+    if settings.audit_job_backend == "durable":
+        # Workers in other processes must see the same audits
+        if settings.audit_store_backend != "sqlite":
+            raise ValueError("audit_job_backend='durable' requires audit_store_backend='sqlite'")
+        from app.services.durable_queue import SQLiteJobQueue
+        return SQLiteJobQueue(
+            settings.audit_job_queue_path,
+            max_depth=settings.audit_queue_max_depth,
+            default_retry_after=settings.audit_queue_retry_after_seconds
+        )
+
+    raise ValueError(f"Unknown audit_job_backend: {settings.audit_job_backend}")
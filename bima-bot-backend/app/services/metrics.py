@@ -0,0 +1,108 @@
+"""
+Metrics - In-Process Counters and Timings
+
+Lightweight, dependency-free metrics exposed at GET /metrics in the
+Prometheus text format (and as JSON via snapshot()).
+
+Responsibilities:
+- Counters: monotonically increasing, with optional labels
+- Summaries: count + sum (+ max) of observed values, e.g. latencies
+
+NOT responsible for:
+- Aggregating across processes (each API/worker process reports its own)
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_summaries: Dict[str, Dict[LabelKey, Dict[str, float]]] = {}
+_help: Dict[str, str] = {}
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def describe(name: str, help_text: str) -> None:
+    """Attach a HELP line to a metric"""
+    _help[name] = help_text
+
+
+def increment(name: str, labels: Optional[Dict[str, str]] = None, value: float = 1.0) -> None:
+    """Add to a counter"""
+    key = _label_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+
+def observe(name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+    """Record one observation (e.g. a duration in ms) in a summary"""
+    key = _label_key(labels)
+    with _lock:
+        series = _summaries.setdefault(name, {})
+        stats = series.setdefault(key, {"count": 0.0, "sum": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["sum"] += value
+        stats["max"] = max(stats["max"], value)
+
+
+def get_counter(name: str, labels: Optional[Dict[str, str]] = None) -> float:
+    with _lock:
+        return _counters.get(name, {}).get(_label_key(labels), 0.0)
+
+
+def snapshot() -> dict:
+    """All metrics as plain dicts (labels rendered as "k=v,k=v")"""
+    def render(key: LabelKey) -> str:
+        return ",".join(f"{k}={v}" for k, v in key)
+
+    with _lock:
+        return {
+            "counters": {
+                name: {render(key): value for key, value in series.items()}
+                for name, series in _counters.items()
+            },
+            "summaries": {
+                name: {render(key): dict(stats) for key, stats in series.items()}
+                for name, series in _summaries.items()
+            },
+        }
+
+
+def render_prometheus() -> str:
+    """Prometheus text exposition format"""
+    def labels_text(key: LabelKey, extra: str = "") -> str:
+        parts = [f'{k}="{v}"' for k, v in key]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    lines = []
+    with _lock:
+        for name in sorted(_counters):
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(_counters[name].items()):
+                lines.append(f"{name}{labels_text(key)} {value:g}")
+        for name in sorted(_summaries):
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} summary")
+            for key, stats in sorted(_summaries[name].items()):
+                lines.append(f"{name}_count{labels_text(key)} {stats['count']:g}")
+                lines.append(f"{name}_sum{labels_text(key)} {stats['sum']:g}")
+                lines.append(f"{name}_max{labels_text(key)} {stats['max']:g}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Clear everything (tests only)"""
+    with _lock:
+        _counters.clear()
+        _summaries.clear()
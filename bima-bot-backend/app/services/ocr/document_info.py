@@ -0,0 +1,101 @@
+"""
+Document Inspection - Local Properties Used for OCR Routing
+
+Reads just enough of a local upload (magic bytes, page count, size) to
+decide which Textract API can handle it, so we never waste a round-trip
+on a request that is bound to fail.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from pypdf import PdfReader
+
+from app.services import metrics
+
+# Textract synchronous APIs accept single-page documents up to 10 MB
+SYNC_MAX_BYTES = 10 * 1024 * 1024
+
+_MAGIC = [
+    (b"%PDF-", "application/pdf"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+]
+
+
+@dataclass
+class DocumentInfo:
+    mime_type: str               # sniffed from content, not the filename
+    page_count: Optional[int]    # None if it could not be determined
+    size_bytes: int
+
+
+def sniff_mime_type(header: bytes) -> str:
+    for magic, mime_type in _MAGIC:
+        if header.startswith(magic):
+            return mime_type
+    return "application/octet-stream"
+
+
+def inspect_document(file_path: str) -> Optional[DocumentInfo]:
+    """
+    Returns:
+        DocumentInfo, or None if the file cannot be read
+    """
+    path = Path(file_path)
+    try:
+        size = path.stat().st_size
+        with open(path, "rb") as f:
+            mime_type = sniff_mime_type(f.read(8))
+    except OSError:
+        return None
+
+    page_count: Optional[int] = None
+    try:
+        if mime_type == "application/pdf":
+            page_count = len(PdfReader(str(path)).pages)
+        elif mime_type == "image/tiff":
+            from PIL import Image
+            with Image.open(path) as image:
+                page_count = getattr(image, "n_frames", 1)
+        elif mime_type in ("image/jpeg", "image/png"):
+            page_count = 1
+    except Exception as e:
+        print(f"⚠️  Could not count pages of {path.name}: {e}")
+
+    return DocumentInfo(mime_type=mime_type, page_count=page_count, size_bytes=size)
+
+
+def choose_textract_api(info: Optional[DocumentInfo]) -> tuple:
+    """
+    Pick the Textract API for a whole-document OCR request.
+
+    Returns:
+        (api, reason) where api is "sync", "async", "downscale" (JPEG/PNG
+        over the sync limit: re-encode locally, then sync - the async APIs
+        only take PDF/TIFF) or "probe" (unknown document: try sync, fall
+        back to async on UnsupportedDocument)
+    """
+    if info is None or info.page_count is None:
+        return "probe", "unknown_document"
+    if info.size_bytes > SYNC_MAX_BYTES:
+        if info.mime_type in ("image/jpeg", "image/png"):
+            return "downscale", "oversized_image"
+        return "async", "over_sync_size_limit"
+    if info.page_count > 1:
+        return "async", "multi_page"
+    return "sync", "single_page"
+
+
+def route_textract_request(info: Optional[DocumentInfo]) -> tuple:
+    """
+    choose_textract_api, with the decision counted in
+    ocr_textract_route_total. Every whole-document Textract request
+    (text detection and table analysis) is routed through here.
+    """
+    api, reason = choose_textract_api(info)
+    metrics.increment("ocr_textract_route_total", {"api": api, "reason": reason})
+    return api, reason
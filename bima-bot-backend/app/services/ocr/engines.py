@@ -0,0 +1,144 @@
+"""
+OCR Engines - Pluggable Backends for Pages Without a Text Layer
+
+ocr_service decides WHAT needs OCR (text layer first, then scanned pages
+or whole documents); an OcrEngine decides HOW. settings.ocr_engine picks
+the backend:
+
+- "textract": AWS Textract (default). Scanned pages of a local PDF go as
+  single-page sync requests, long scans as concurrent shards, everything
+  else as one whole-document request routed sync/async
+- "tesseract": local Tesseract with OpenCV preprocessing, for air-gapped
+  deployments, CI and laptops (see tesseract_engine.py)
+
+Responsibilities:
+- One interface: ocr_pages (selected pages of a local PDF) and
+  ocr_document (a whole document)
+- Engine registry / process-wide instances
+
+NOT responsible for:
+- Text-layer extraction, caching, metrics (ocr_service does that)
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.aws_service import detect_document_from_s3_file, detect_document_bytes_with_textract
+from app.services.image_normalization import shrink_image_bytes
+from app.services.ocr.document_info import inspect_document, route_textract_request, SYNC_MAX_BYTES
+from app.services.ocr.ocr_document import OcrPage
+from app.services.ocr.sharded_ocr import extract_pages_sharded
+from app.services.ocr.text_layer import split_pdf_pages
+from app.services.rate_limit import get_textract_rate_limiter
+
+
+class OcrEngine(ABC):
+    """
+    Base class for OCR backends.
+
+    Engines raise AWSServiceError (Textract) or RuntimeError (local
+    engines) on failure; ocr_service wraps both.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def ocr_pages(self, file_path: str, s3_key: str, page_numbers: List[int], page_count: int) -> Dict[int, OcrPage]:
+        """
+        OCR selected pages of a local PDF.
+
+        Args:
+            file_path: Local PDF
+            s3_key: Where the PDF is stored in S3 (remote engines only)
+            page_numbers: 1-based pages to OCR
+            page_count: Total pages in the PDF
+
+        Returns:
+            page_number -> OcrPage for every requested page
+        """
+
+    @abstractmethod
+    def ocr_document(self, file_path: Optional[str], s3_key: str) -> Tuple[List[OcrPage], Dict[str, Any]]:
+        """
+        OCR a whole document (image, short scanned PDF, or no local copy).
+
+        Returns:
+            (pages, metadata); metadata["engine"] is the metrics label
+        """
+
+    def prefers_pagewise(self, scanned_page_count: int) -> bool:
+        """Whether a fully scanned local PDF should go through ocr_pages"""
+        return True
+
+
+class TextractEngine(OcrEngine):
+    name = "textract"
+
+    def ocr_pages(self, file_path: str, s3_key: str, page_numbers: List[int], page_count: int) -> Dict[int, OcrPage]:
+        if len(page_numbers) == page_count and page_count >= settings.ocr_shard_min_pages:
+            pages = extract_pages_sharded(file_path, s3_key, page_count)
+            return {number: pages[number] for number in page_numbers}
+
+        name = Path(file_path).name
+        page_pdfs = split_pdf_pages(file_path, page_numbers)
+        limiter = get_textract_rate_limiter()
+
+        def ocr_page(page_number):
+            limiter.acquire()
+            result = detect_document_bytes_with_textract(page_pdfs[page_number], label=f"{name} page {page_number}")
+            pages = result["pages"]
+            if not pages:
+                return OcrPage(page_number=page_number, source="textract")
+            return OcrPage.from_dict(pages[0]).renumbered(page_number)
+
+        with ThreadPoolExecutor(max_workers=min(len(page_numbers), max(1, settings.ocr_page_workers))) as executor:
+            return dict(zip(page_numbers, executor.map(ocr_page, page_numbers)))
+
+    def ocr_document(self, file_path: Optional[str], s3_key: str) -> Tuple[List[OcrPage], Dict[str, Any]]:
+        # File should already be uploaded to S3 by the audit route
+        info = inspect_document(file_path) if file_path and Path(file_path).exists() else None
+        api, reason = route_textract_request(info)
+        if info is not None:
+            print(f"🧭 Textract route for {s3_key}: {api} ({reason}, {info.mime_type}, {info.page_count} page(s), {info.size_bytes // 1024} KB)")
+
+        if api == "downscale":
+            data = shrink_image_bytes(file_path, SYNC_MAX_BYTES)
+            print(f"🖼️  {Path(file_path).name}: {info.size_bytes // 1024} KB -> {len(data) // 1024} KB for sync Textract")
+            result = detect_document_bytes_with_textract(data, label=Path(file_path).name)
+        else:
+            result = detect_document_from_s3_file(s3_key, api=api)
+        pages = [OcrPage.from_dict(page) for page in result["pages"]]
+        return pages, {
+            "engine": f"textract_{result['textract_api']}",
+            "mean_confidence": result["mean_confidence"],
+            "textract_api": result["textract_api"]
+        }
+
+    def prefers_pagewise(self, scanned_page_count: int) -> bool:
+        # Short scans are cheaper as one whole-document request
+        return scanned_page_count >= settings.ocr_shard_min_pages
+
+
+_engines: Dict[str, OcrEngine] = {}
+
+
+def get_ocr_engine(name: Optional[str] = None) -> OcrEngine:
+    """
+    Process-wide engine instance ("textract" or "tesseract").
+
+    Raises:
+        ValueError: If the engine name is unknown
+    """
+    name = (name or settings.ocr_engine).lower()
+    if name not in _engines:
+        if name == "textract":
+            _engines[name] = TextractEngine()
+        elif name == "tesseract":
+            from app.services.ocr.tesseract_engine import TesseractEngine
+            _engines[name] = TesseractEngine()
+        else:
+            raise ValueError(f"Unknown OCR engine '{name}' (expected 'textract' or 'tesseract')")
+    return _engines[name]
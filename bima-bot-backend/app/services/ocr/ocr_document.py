@@ -0,0 +1,265 @@
+"""
+OCR Document Model - Pages -> Lines -> Words with Geometry and Confidence
+
+Keeps what Textract gives us (bounding boxes, confidence, word grouping)
+instead of flattening it to one string, so downstream stages can still
+see where each line came from (page, position, confidence).
+
+Storage is columnar: each page holds parallel arrays (texts, confidences,
+flat bbox lists, word offsets per line) rather than one dict per block,
+which keeps the cached JSON and memory footprint small.
+
+Tables from Textract TABLES analysis are kept as OcrTable cell grids.
+
+Geometry is Textract's normalised page coordinates (0..1, origin top-left),
+as [left, top, width, height]. Pages read from a PDF text layer have text
+but no geometry or confidence.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+BBox = Tuple[float, float, float, float]
+
+
+class OcrWord(NamedTuple):
+    text: str
+    confidence: Optional[float]
+    bbox: Optional[BBox]
+
+
+class OcrLine(NamedTuple):
+    text: str
+    confidence: Optional[float]
+    bbox: Optional[BBox]
+    words: List[OcrWord]
+
+
+def _bbox_at(flat: List[float], index: int) -> Optional[BBox]:
+    if len(flat) < (index + 1) * 4:
+        return None
+    return tuple(flat[index * 4:index * 4 + 4])
+
+
+@dataclass
+class OcrPage:
+    page_number: int                                        # 1-based
+    source: str                                             # "text_layer" | "textract"
+    line_text: List[str] = field(default_factory=list)
+    line_conf: List[float] = field(default_factory=list)    # empty when unknown
+    line_bbox: List[float] = field(default_factory=list)    # 4 floats per line
+    line_word_start: List[int] = field(default_factory=lambda: [0])  # words of line i: [start[i], start[i+1])
+    word_text: List[str] = field(default_factory=list)
+    word_conf: List[float] = field(default_factory=list)
+    word_bbox: List[float] = field(default_factory=list)    # 4 floats per word
+
+    # --- Views ---
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.line_text)
+
+    @property
+    def has_geometry(self) -> bool:
+        return bool(self.line_bbox)
+
+    @property
+    def mean_confidence(self) -> Optional[float]:
+        return round(sum(self.line_conf) / len(self.line_conf), 2) if self.line_conf else None
+
+    def lines(self) -> Iterator[OcrLine]:
+        for i, text in enumerate(self.line_text):
+            start, end = self.line_word_start[i], self.line_word_start[i + 1]
+            words = [
+                OcrWord(
+                    self.word_text[w],
+                    self.word_conf[w] if self.word_conf else None,
+                    _bbox_at(self.word_bbox, w)
+                )
+                for w in range(start, end)
+            ]
+            yield OcrLine(text, self.line_conf[i] if self.line_conf else None, _bbox_at(self.line_bbox, i), words)
+
+    # --- Construction / serialisation ---
+
+    @classmethod
+    def from_text(cls, page_number: int, text: str, source: str) -> "OcrPage":
+        """Page without geometry (PDF text layer): lines split on newlines"""
+        page = cls(page_number=page_number, source=source)
+        for line in (text or "").split("\n"):
+            page.line_text.append(line)
+            page.word_text.extend(line.split())
+            page.line_word_start.append(len(page.word_text))
+        if page.line_text == [""]:
+            page.line_text, page.word_text, page.line_word_start = [], [], [0]
+        return page
+
+    def renumbered(self, page_number: int) -> "OcrPage":
+        """Same content under another page number (e.g. shard -> document)"""
+        data = self.to_dict()
+        data["page_number"] = page_number
+        return OcrPage.from_dict(data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "page_number": self.page_number,
+            "source": self.source,
+            "lines": {
+                "text": self.line_text,
+                "conf": self.line_conf,
+                "bbox": self.line_bbox,
+                "word_start": self.line_word_start,
+            },
+            "words": {
+                "text": self.word_text,
+                "conf": self.word_conf,
+                "bbox": self.word_bbox,
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OcrPage":
+        """Inverse of to_dict; a plain {"page_number", "text"} dict is also accepted"""
+        if "lines" not in data:
+            return cls.from_text(data["page_number"], data.get("text", ""), data.get("source", "textract"))
+        lines, words = data["lines"], data["words"]
+        return cls(
+            page_number=data["page_number"],
+            source=data.get("source", "textract"),
+            line_text=list(lines["text"]),
+            line_conf=list(lines.get("conf", [])),
+            line_bbox=list(lines.get("bbox", [])),
+            line_word_start=list(lines.get("word_start", [0])),
+            word_text=list(words.get("text", [])),
+            word_conf=list(words.get("conf", [])),
+            word_bbox=list(words.get("bbox", [])),
+        )
+
+
+@dataclass
+class OcrDocument:
+    pages: List[OcrPage] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        """Backwards-compatible flat text (pages joined by newlines)"""
+        return "\n".join(page.text for page in self.pages)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    @property
+    def line_count(self) -> int:
+        return sum(len(page.line_text) for page in self.pages)
+
+    def page(self, page_number: int) -> Optional[OcrPage]:
+        for page in self.pages:
+            if page.page_number == page_number:
+                return page
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"pages": [page.to_dict() for page in self.pages]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OcrDocument":
+        return cls(pages=[OcrPage.from_dict(page) for page in data.get("pages", [])])
+
+
+def _geometry(block: Dict[str, Any]) -> List[float]:
+    box = block.get("Geometry", {}).get("BoundingBox")
+    if not box:
+        return [0.0, 0.0, 0.0, 0.0]
+    return [round(box.get(k, 0.0), 4) for k in ("Left", "Top", "Width", "Height")]
+
+
+def pages_from_textract_blocks(blocks: List[Dict[str, Any]]) -> List[OcrPage]:
+    """
+    Build compact pages from Textract PAGE/LINE/WORD blocks (any API, any
+    number of result pages already concatenated). Every PAGE block gives
+    a page, so blank pages stay in as empty OcrPages (like the sharded,
+    Tesseract and hybrid paths).
+    """
+    words_by_id = {block["Id"]: block for block in blocks if block.get("BlockType") == "WORD" and "Id" in block}
+    pages: Dict[int, OcrPage] = {}
+
+    for block in blocks:
+        if block.get("BlockType") == "PAGE":
+            number = block.get("Page", 1)
+            pages.setdefault(number, OcrPage(page_number=number, source="textract"))
+
+    for block in blocks:
+        if block.get("BlockType") != "LINE":
+            continue
+        number = block.get("Page", 1)
+        page = pages.get(number)
+        if page is None:
+            page = pages[number] = OcrPage(page_number=number, source="textract")
+
+        page.line_text.append(block.get("Text", ""))
+        page.line_conf.append(round(block.get("Confidence", 0.0), 2))
+        page.line_bbox.extend(_geometry(block))
+
+        for relationship in block.get("Relationships", []):
+            if relationship.get("Type") != "CHILD":
+                continue
+            for word_id in relationship.get("Ids", []):
+                word = words_by_id.get(word_id)
+                if word is None:
+                    continue
+                page.word_text.append(word.get("Text", ""))
+                page.word_conf.append(round(word.get("Confidence", 0.0), 2))
+                page.word_bbox.extend(_geometry(word))
+        page.line_word_start.append(len(page.word_text))
+
+    return [pages[number] for number in sorted(pages)]
+
+
+@dataclass
+class OcrTable:
+    """A table from Textract TABLES analysis, as a grid of cell texts"""
+    page_number: int
+    rows: List[List[str]] = field(default_factory=list)
+    confidence: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"page_number": self.page_number, "rows": self.rows, "confidence": self.confidence}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OcrTable":
+        return cls(page_number=data["page_number"], rows=[list(row) for row in data["rows"]],
+                   confidence=data.get("confidence"))
+
+
+def tables_from_textract_blocks(blocks: List[Dict[str, Any]]) -> List[OcrTable]:
+    """
+    Build cell grids from Textract TABLE/CELL/WORD blocks. Cells spanning
+    several rows/columns are written into their top-left position only.
+    """
+    by_id = {block["Id"]: block for block in blocks if "Id" in block}
+
+    def children(block: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ids = [i for rel in block.get("Relationships", []) if rel.get("Type") == "CHILD" for i in rel.get("Ids", [])]
+        return [by_id[i] for i in ids if i in by_id]
+
+    tables = []
+    for block in blocks:
+        if block.get("BlockType") != "TABLE":
+            continue
+        cells = [cell for cell in children(block) if cell.get("BlockType") == "CELL"]
+        if not cells:
+            continue
+        n_rows = max(cell.get("RowIndex", 1) for cell in cells)
+        n_cols = max(cell.get("ColumnIndex", 1) for cell in cells)
+        grid = [["" for _ in range(n_cols)] for _ in range(n_rows)]
+        for cell in cells:
+            words = [w.get("Text", "") for w in children(cell) if w.get("BlockType") == "WORD"]
+            grid[cell.get("RowIndex", 1) - 1][cell.get("ColumnIndex", 1) - 1] = " ".join(words)
+        confidence = block.get("Confidence")
+        tables.append(OcrTable(
+            page_number=block.get("Page", 1),
+            rows=grid,
+            confidence=round(confidence, 2) if confidence is not None else None
+        ))
+    return tables
@@ -4,14 +4,14 @@ OCR Service - Phase 4.2 (AWS Textract Integration)
 DUMB LAYER: Extracts raw text only. No validation. No interpretation.
 
 Responsibilities:
-- Read PDF/image files (now via AWS Textract)
+- Read PDF/image files (embedded text layer first, else AWS Textract)
 - Extract text from all pages
+- Tell born-digital PDFs (usable text layer) from scanned ones
 - Return raw text string (even if empty)
 - Raise errors only on processing failures
 
 NOT responsible for:
 - Validating document content
-- Detecting scanned vs digital PDFs
 - Parsing or structuring text
 - Business logic decisions
 
@@ -20,15 +20,89 @@ Changes from Phase 4.1:
 - Files uploaded to S3 for processing (unique folder per audit)
 - Supports both digital and scanned PDFs
 - Multi-user safe: each audit has its own S3 folder
+
+OCR Cache:
+- Results are cached by SHA-256 of the uploaded bytes (text + Textract
+  block metadata), so a policy PDF sent for many claims is OCR'd once
+- Disk-backed (settings.ocr_cache_dir) with an LRU size cap, shared by
+  every process on the host
+
+Text-Layer Fast Path / Per-Page Hybrid OCR:
+- Pages with a good-quality text layer (see text_layer.py) are read
+  locally with pypdf: milliseconds, no network
+- In mixed PDFs (e.g. digital policy + scanned endorsements) only the
+  image-only pages go to Textract, as single-page documents in parallel
+- Long fully scanned PDFs are OCR'd as concurrent page-range shards
+  (sharded_ocr.py); shorter ones and images go to Textract as a whole
+
+Output Model:
+- extract_document returns an OcrDocument (ocr_document.py): pages ->
+  lines -> words with bounding boxes and confidence, stored compactly;
+  extract_text_from_document returns its .text view
+- Page numbers are kept on every OcrPage
+
+Textract Routing:
+- Whole-document requests pick sync vs async from the local file's
+  page count, MIME type and size (document_info.py) instead of letting
+  multi-page PDFs fail the sync call first
+- Engine and routing decisions are counted in app.services.metrics
+
+OCR Engines:
+- Pages without a text layer go to the engine in settings.ocr_engine
+  ("textract", or "tesseract" for offline use), see engines.py
+
+Table Mode:
+- extract_tables runs Textract AnalyzeDocument (TABLES) and returns cell
+  grids (OcrTable) for deterministic bill line-item parsing; cached next
+  to the text result under its own key
+- extract_bill_document gets bill text and tables from that one call
+  (no separate DetectDocumentText); born-digital bills skip it entirely,
+  mixed bills send only their scanned pages
 """
 
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from app.services.aws_service import extract_text_from_s3_file, AWSServiceError
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.aws_service import (
+    analyze_document_tables,
+    analyze_document_tables_async,
+    AWSServiceError
+)
+from app.services import metrics
+from app.services.cache import DiskCache
+from app.services.image_normalization import shrink_image_bytes
+from app.services.ocr.document_info import inspect_document, route_textract_request, SYNC_MAX_BYTES
+from app.services.ocr.ocr_document import OcrDocument, OcrPage, OcrTable
+from app.services.ocr.engines import OcrEngine, get_ocr_engine
+from app.services.ocr.text_layer import TextLayerResult, extract_text_layer, split_pdf_pages
+from app.services.rate_limit import get_textract_rate_limiter
+
+# OCR output format version (bump to invalidate cached results)
+OCR_CACHE_VERSION = 3
+
+_ocr_cache = (
+    DiskCache(settings.ocr_cache_dir, settings.ocr_cache_max_mb * 1024 * 1024)
+    if settings.ocr_cache_enabled else None
+)
+
+
+def _cache_key(content_sha256: str, mode: str = "text") -> str:
+    if mode == "text" and settings.ocr_engine != "textract":
+        mode = settings.ocr_engine
+    if mode == "text":
+        return f"{content_sha256}-v{OCR_CACHE_VERSION}"
+    return f"{content_sha256}-{mode}-v{OCR_CACHE_VERSION}"
 
 
-def extract_text_from_document(file_path: str, s3_key: str) -> str:
+def extract_text_from_document(
+    file_path: Optional[str],
+    s3_key: str,
+    content_sha256: Optional[str] = None
+) -> str:
     """
-    Extract raw text from PDF or image document using AWS Textract.
+    Extract raw text from PDF or image document (text layer or AWS Textract).
     
     This is a DUMB LAYER by design:
     - Returns text as-is, no validation
@@ -37,8 +111,12 @@ def extract_text_from_document(file_path: str, s3_key: str) -> str:
     - Single responsibility: read document → return text
     
     Args:
-        file_path: Absolute path to PDF or image file (for local access)
+        file_path: Absolute path to PDF or image file (for local access);
+                   None when the upload was streamed straight to S3
+                   (no local text-layer fast path then)
         s3_key: S3 key where this file is stored (e.g., 'audits/AUD-123/bill.pdf')
+        content_sha256: SHA-256 of the uploaded bytes; when given, a cached
+                        result is returned without calling Textract
         
     Returns:
         Raw text extracted from all pages (may be empty string)
@@ -53,20 +131,302 @@ def extract_text_from_document(file_path: str, s3_key: str) -> str:
         ... )
         >>> # text may be empty if document has no text — that's fine, ingestion handles it
     """
+    return extract_document(file_path, s3_key, content_sha256).text
+
+
+def extract_pages_from_document(
+    file_path: Optional[str],
+    s3_key: str,
+    content_sha256: Optional[str] = None
+) -> List[OcrPage]:
+    """Pages of extract_document, in document order"""
+    return extract_document(file_path, s3_key, content_sha256).pages
+
+
+def extract_document(
+    file_path: Optional[str],
+    s3_key: str,
+    content_sha256: Optional[str] = None
+) -> OcrDocument:
+    """
+    Same inputs as extract_text_from_document, but returns the structured
+    OcrDocument (pages -> lines -> words, geometry, confidence).
+    
+    Raises:
+        RuntimeError: If file cannot be processed
+    """
+    if _ocr_cache is not None and content_sha256:
+        cached = _ocr_cache.get(_cache_key(content_sha256))
+        if cached is not None:
+            print(f"⚡ OCR cache hit for {s3_key} ({content_sha256[:12]}, {cached.get('line_count', 0)} lines)")
+            metrics.increment("ocr_documents_total", {"engine": "cache"})
+            return OcrDocument.from_dict(cached)
+    
     try:
-        # Use AWS Textract to extract from S3
-        # File should already be uploaded to S3 by the audit route
+        start = time.monotonic()
+        engine = get_ocr_engine()
+        local = _extract_local_pages(file_path, s3_key, engine)
+        if local is not None:
+            document, ocr_pages = local
+            label = "text_layer"
+            if ocr_pages:
+                if len(ocr_pages) < document.page_count:
+                    label = "hybrid"
+                else:
+                    label = "sharded" if engine.name == "textract" else engine.name
+                _cache_document(content_sha256, document, start, engine=label, ocr_engine=engine.name, textract_pages=ocr_pages)
+            _record_ocr(label, start)
+            return document
+        
+        # Whole document through the engine (Textract: routed sync/async on S3)
         # S3 cleanup is handled by the audit service after completion
-        text = extract_text_from_s3_file(s3_key)
+        pages, metadata = engine.ocr_document(file_path, s3_key)
+        document = OcrDocument(pages=pages)
+        _cache_document(content_sha256, document, start, ocr_engine=engine.name, **metadata)
+        _record_ocr(metadata["engine"], start)
         
         # Return as-is, even if empty
         # Validation is the ingestion layer's job, not OCR's
-        return text
+        return document
         
     except AWSServiceError as e:
         raise RuntimeError(f"AWS Textract failed for {s3_key}: {str(e)}")
     except FileNotFoundError:
         raise RuntimeError(f"Document file not found: {file_path}")
     except Exception as e:
-        raise RuntimeError(f"Failed to process document {file_path}: {str(e)}")
+        raise RuntimeError(f"Failed to process document {file_path or s3_key}: {str(e)}")
+
+
+def _analyze_tables(file_path: Optional[str], s3_key: str) -> dict:
+    """
+    One Textract AnalyzeDocument (TABLES) request, routed like text
+    detection. The response's LINE blocks give text and pages as well.
+    
+    Raises:
+        AWSServiceError: If Textract table analysis fails
+        OSError / ValueError: If an oversized image cannot be prepared
+    """
+    info = inspect_document(file_path) if file_path and Path(file_path).exists() else None
+    api, reason = route_textract_request(info)
+    get_textract_rate_limiter().acquire()
+    
+    if api == "sync" and info is not None:
+        return analyze_document_tables(data=Path(file_path).read_bytes(), label=Path(file_path).name)
+    if api == "downscale":
+        data = shrink_image_bytes(file_path, SYNC_MAX_BYTES)
+        return analyze_document_tables(data=data, label=Path(file_path).name)
+    if api == "async":
+        return analyze_document_tables_async(s3_key)
+    try:
+        return analyze_document_tables(s3_key=s3_key)
+    except AWSServiceError as e:
+        if "UnsupportedDocument" not in str(e) and "unsupported document format" not in str(e).lower():
+            raise
+        return analyze_document_tables_async(s3_key)
+
+
+def _analyze_table_pages(file_path: str, page_numbers: List[int]) -> Tuple[Dict[int, OcrPage], List[OcrTable]]:
+    """
+    AnalyzeDocument (TABLES) on selected pages of a local PDF only, each
+    as a single-page document in parallel (like TextractEngine.ocr_pages
+    for text). Pages and tables keep their page numbers in the full PDF.
+    
+    Raises:
+        AWSServiceError: If Textract table analysis fails for any page
+    """
+    name = Path(file_path).name
+    page_pdfs = split_pdf_pages(file_path, page_numbers)
+    limiter = get_textract_rate_limiter()
+    
+    def analyze_page(page_number):
+        limiter.acquire()
+        result = analyze_document_tables(data=page_pdfs[page_number], label=f"{name} page {page_number}")
+        page = (
+            OcrPage.from_dict(result["pages"][0]).renumbered(page_number) if result["pages"]
+            else OcrPage(page_number=page_number, source="textract")
+        )
+        tables = [OcrTable.from_dict({**table, "page_number": page_number}) for table in result["tables"]]
+        return page, tables
+    
+    with ThreadPoolExecutor(max_workers=min(len(page_numbers), max(1, settings.ocr_page_workers))) as executor:
+        results = list(executor.map(analyze_page, page_numbers))
+    return {page.page_number: page for page, _ in results}, [table for _, tables in results for table in tables]
+
+
+def _cache_tables(content_sha256: Optional[str], tables: List[OcrTable], start: float, textract_api: str) -> None:
+    if _ocr_cache is None or not content_sha256:
+        return
+    _ocr_cache.set(_cache_key(content_sha256, "tables"), {
+        "tables": [table.to_dict() for table in tables],
+        "ocr_ms": int((time.monotonic() - start) * 1000),
+        "cached_at": time.time(),
+        "textract_api": textract_api
+    })
 
+
+def extract_tables(
+    file_path: Optional[str],
+    s3_key: str,
+    content_sha256: Optional[str] = None
+) -> List[OcrTable]:
+    """
+    Tables found by Textract AnalyzeDocument (TABLES), in document order.
+    
+    Single-page documents are analysed synchronously (from local bytes when
+    available), multi-page ones through an async analysis job.
+    
+    Raises:
+        RuntimeError: If Textract table analysis fails
+    """
+    if _ocr_cache is not None and content_sha256:
+        cached = _ocr_cache.get(_cache_key(content_sha256, "tables"))
+        if cached is not None:
+            print(f"⚡ Table cache hit for {s3_key} ({len(cached['tables'])} table(s))")
+            metrics.increment("ocr_documents_total", {"engine": "tables_cache"})
+            return [OcrTable.from_dict(table) for table in cached["tables"]]
+    
+    try:
+        start = time.monotonic()
+        result = _analyze_tables(file_path, s3_key)
+        tables = [OcrTable.from_dict(table) for table in result["tables"]]
+        _cache_tables(content_sha256, tables, start, result["textract_api"])
+        _record_ocr(f"tables_{result['textract_api']}", start)
+        return tables
+        
+    except AWSServiceError as e:
+        raise RuntimeError(f"AWS Textract table analysis failed for {s3_key}: {str(e)}")
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"Could not prepare {s3_key} for table analysis: {str(e)}")
+
+
+def extract_bill_document(
+    file_path: Optional[str],
+    s3_key: str,
+    content_sha256: Optional[str] = None
+) -> Tuple[OcrDocument, List[OcrTable]]:
+    """
+    Bill text and line-item tables with at most one Textract request.
+    
+    - Table mode off or a non-Textract engine: extract_document, no tables
+    - Text layer covers every page (born-digital): read locally, no tables
+      and no network (the text structures as before)
+    - Mixed PDF: only the scanned pages go to AnalyzeDocument (TABLES),
+      one single-page request each; the other pages keep the local text
+    - Otherwise a single AnalyzeDocument (TABLES) call supplies both the
+      tables and the text / pages (no DetectDocumentText as well)
+    
+    Table analysis failing falls back to extract_document without tables.
+    
+    Raises:
+        RuntimeError: If the document cannot be read at all
+    """
+    if not settings.bill_table_extraction_enabled or settings.ocr_engine != "textract":
+        return extract_document(file_path, s3_key, content_sha256), []
+    
+    if _ocr_cache is not None and content_sha256:
+        text_entry = _ocr_cache.get(_cache_key(content_sha256))
+        tables_entry = _ocr_cache.get(_cache_key(content_sha256, "tables"))
+        if text_entry is not None and tables_entry is not None:
+            print(f"⚡ OCR cache hit for {s3_key} (text + {len(tables_entry['tables'])} table(s))")
+            metrics.increment("ocr_documents_total", {"engine": "cache"})
+            return OcrDocument.from_dict(text_entry), [OcrTable.from_dict(t) for t in tables_entry["tables"]]
+    
+    layer = None
+    if settings.text_layer_enabled and file_path and Path(file_path).exists():
+        layer = extract_text_layer(file_path)
+    scanned = layer.scanned_pages(settings.text_layer_min_quality) if layer is not None else None
+    start = time.monotonic()
+    if layer is not None and layer.pages and not scanned:
+        # Already parsed above: no second pypdf pass in extract_document
+        document = _text_layer_document(layer)
+        _record_ocr("text_layer", start)
+        return document, []
+    
+    try:
+        if layer is not None and len(scanned) < len(layer.pages):
+            print(f"🧩 {Path(file_path).name}: analysing scanned page(s) {scanned} only")
+            analysed, tables = _analyze_table_pages(file_path, scanned)
+            textract_api = "sync_pages"
+            pages = [
+                analysed.get(p.page_number) or OcrPage.from_text(p.page_number, p.text, "text_layer")
+                for p in layer.pages
+            ]
+        else:
+            result = _analyze_tables(file_path, s3_key)
+            textract_api = result["textract_api"]
+            pages = [OcrPage.from_dict(page) for page in result["pages"]]
+            tables = [OcrTable.from_dict(table) for table in result["tables"]]
+    except (AWSServiceError, OSError, ValueError) as e:
+        # Tables are an optimisation: plain text OCR still works
+        print(f"⚠️ Bill table analysis failed, OCR'ing text only: {e}")
+        return extract_document(file_path, s3_key, content_sha256), []
+    
+    document = OcrDocument(pages=pages)
+    engine = f"tables_{textract_api}"
+    _cache_document(content_sha256, document, start, engine=engine, ocr_engine="textract", textract_api=textract_api)
+    _cache_tables(content_sha256, tables, start, textract_api)
+    _record_ocr(engine, start)
+    print(f"📊 {s3_key}: text and {len(tables)} table(s) from AnalyzeDocument only")
+    return document, tables
+
+
+def _record_ocr(engine: str, start: float) -> None:
+    metrics.increment("ocr_documents_total", {"engine": engine})
+    metrics.observe("ocr_duration_ms", (time.monotonic() - start) * 1000, {"engine": engine})
+
+
+def _cache_document(content_sha256: Optional[str], document: OcrDocument, start: float, **metadata) -> None:
+    if _ocr_cache is None or not content_sha256:
+        return
+    entry = {
+        **document.to_dict(),
+        "page_count": document.page_count,
+        "line_count": document.line_count,
+        "ocr_ms": int((time.monotonic() - start) * 1000),
+        "cached_at": time.time(),
+        **metadata
+    }
+    _ocr_cache.set(_cache_key(content_sha256), entry)
+
+
+def _text_layer_document(layer: TextLayerResult) -> OcrDocument:
+    return OcrDocument(pages=[OcrPage.from_text(p.page_number, p.text, "text_layer") for p in layer.pages])
+
+
+def _extract_local_pages(file_path: Optional[str], s3_key: str, engine: OcrEngine):
+    """
+    Read what we can from the PDF's text layer; OCR the rest page-wise.
+    
+    Returns:
+        (OcrDocument, ocr_page_numbers), or None when the whole document
+        should go to the engine (no local file, not a PDF, or a fully
+        scanned PDF the engine prefers to take whole)
+    """
+    if not settings.text_layer_enabled or not file_path or not Path(file_path).exists():
+        return None
+    
+    start = time.monotonic()
+    layer = extract_text_layer(file_path)
+    if layer is None:
+        return None
+    
+    name = Path(file_path).name
+    scanned = layer.scanned_pages(settings.text_layer_min_quality)
+    if not scanned:
+        elapsed_ms = int((time.monotonic() - start) * 1000)
+        print(f"⚡ {name}: born-digital PDF, read {len(layer.pages)} page(s) locally in {elapsed_ms} ms")
+        return _text_layer_document(layer), []
+    
+    if len(scanned) == len(layer.pages) and not engine.prefers_pagewise(len(scanned)):
+        print(f"🖨️  {name}: no usable text layer, using {engine.name} for the whole document")
+        return None
+    
+    if len(scanned) < len(layer.pages):
+        print(f"🧩 {name}: {len(layer.pages) - len(scanned)} digital page(s), sending scanned page(s) {scanned} to {engine.name}")
+    ocr_pages = engine.ocr_pages(file_path, s3_key, scanned, len(layer.pages))
+    
+    pages = [
+        ocr_pages.get(p.page_number) or OcrPage.from_text(p.page_number, p.text, "text_layer")
+        for p in layer.pages
+    ]
+    return OcrDocument(pages=pages), scanned
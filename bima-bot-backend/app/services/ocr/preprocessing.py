@@ -0,0 +1,96 @@
+"""
+Image Preprocessing for Local OCR (OpenCV)
+
+Phone photos and fax-quality scans of bills are grey, noisy and a few
+degrees off horizontal. Tesseract is far more sensitive to that than
+Textract, so pages are cleaned up before recognition.
+
+Responsibilities:
+- Denoise (median filter), binarize (adaptive threshold), deskew
+  (projection-profile search over small angles)
+
+NOT responsible for:
+- Page rendering / loading (tesseract_engine.py)
+
+opencv-python and numpy are imported lazily so the API does not need them
+unless the Tesseract engine is used.
+"""
+
+from typing import Tuple
+
+from PIL import Image
+
+
+def _require_cv2() -> Tuple:
+    try:
+        import cv2
+        import numpy as np
+    except ImportError as e:
+        raise RuntimeError(f"OpenCV preprocessing needs opencv-python and numpy: {e}")
+    return cv2, np
+
+
+def _rotate(image, angle: float, border: int):
+    cv2, _ = _require_cv2()
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(
+        image, matrix, (width, height),
+        flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=border
+    )
+
+
+def estimate_skew(binary, max_angle: float = 5.0, step: float = 0.5) -> float:
+    """
+    Rotation (degrees) that best aligns text lines with the rows of a
+    black-on-white binary image: the angle whose horizontal ink profile
+    has the highest variance (sharp line / gap alternation).
+    """
+    cv2, np = _require_cv2()
+    ink = (binary < 128).astype(np.uint8) * 255
+    # A ~800 px wide copy is plenty to measure the angle
+    scale = min(1.0, 800 / max(1, ink.shape[1]))
+    if scale < 1.0:
+        ink = cv2.resize(ink, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    best_angle, best_score = 0.0, -1.0
+    steps = int(round(max_angle / step))
+    for i in range(-steps, steps + 1):
+        angle = i * step
+        profile = _rotate(ink, angle, border=0).sum(axis=1, dtype=np.float64)
+        score = float(profile.var())
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def preprocess_image(
+    image: Image.Image,
+    denoise: bool = True,
+    binarize: bool = True,
+    deskew: bool = True
+) -> Image.Image:
+    """
+    Clean up a page image for OCR.
+
+    Returns:
+        Greyscale (or black/white if binarize) PIL image
+    """
+    cv2, np = _require_cv2()
+    gray = cv2.cvtColor(np.array(image.convert("RGB")), cv2.COLOR_RGB2GRAY)
+
+    if denoise:
+        # Median, not non-local means: removes scan speckle at ~1 ms per page
+        # instead of seconds
+        gray = cv2.medianBlur(gray, 3)
+    if binarize:
+        gray = cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, blockSize=31, C=15
+        )
+    if deskew:
+        binary = gray if binarize else cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+        angle = estimate_skew(binary)
+        if abs(angle) >= 0.25:
+            gray = _rotate(gray, angle, border=255)
+
+    return Image.fromarray(gray)
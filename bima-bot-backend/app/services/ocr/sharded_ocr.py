@@ -0,0 +1,100 @@
+"""
+Sharded OCR - Parallel Page-Range Textract for Long Scanned PDFs
+
+A long policy sent to async Textract as one job takes time proportional
+to its page count (and can hit the job timeout). Splitting it into page
+ranges and running the ranges concurrently bounds OCR latency by the
+slowest shard instead.
+
+Responsibilities:
+- Split a local PDF into page ranges of settings.ocr_shard_pages
+- Run shards concurrently (settings.ocr_shard_concurrency), each taking a
+  token from the shared Textract rate limiter first
+- Single-page shards: sync detect_document_text on bytes (no S3)
+- Multi-page shards: uploaded to S3 next to the original and run through
+  the async TextractJobTracker; the shard objects are deleted afterwards
+- Reassemble pages in document order
+
+NOT responsible for:
+- Deciding when to shard (ocr_service does that)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.config import settings
+from app.services.aws_service import (
+    detect_document_bytes_with_textract,
+    upload_bytes_to_s3,
+    delete_multiple_files_from_s3
+)
+from app.services.ocr.ocr_document import OcrPage
+from app.services.ocr.text_layer import split_pdf_range
+from app.services.rate_limit import get_textract_rate_limiter
+from app.services.textract_tracker import get_textract_tracker
+
+
+def plan_shards(page_count: int, shard_pages: int) -> List[Tuple[int, int]]:
+    """Inclusive 1-based (first, last) page ranges covering the document"""
+    shard_pages = max(1, shard_pages)
+    return [
+        (first, min(first + shard_pages - 1, page_count))
+        for first in range(1, page_count + 1, shard_pages)
+    ]
+
+
+def extract_pages_sharded(file_path: str, s3_key: str, page_count: int) -> Dict[int, OcrPage]:
+    """
+    OCR every page of a scanned PDF through concurrent Textract shards.
+
+    Args:
+        file_path: Local copy of the PDF (shards are cut from it)
+        s3_key: S3 key of the original; multi-page shards are stored under
+                "<s3_key>.shards/"
+        page_count: Number of pages in the PDF
+
+    Returns:
+        page_number -> OcrPage for every page (empty pages for blank ones)
+
+    Raises:
+        AWSServiceError: If any shard fails
+    """
+    shards = plan_shards(page_count, settings.ocr_shard_pages)
+    limiter = get_textract_rate_limiter()
+    name = Path(file_path).name
+    uploaded: List[str] = []
+
+    def run_shard(shard: Tuple[int, int]) -> Dict[int, OcrPage]:
+        first, last = shard
+        data = split_pdf_range(file_path, first, last)
+        limiter.acquire()
+
+        if first == last:
+            result = detect_document_bytes_with_textract(data, label=f"{name} page {first}")
+        else:
+            shard_key = f"{s3_key}.shards/{first:04d}-{last:04d}.pdf"
+            upload_bytes_to_s3(data, shard_key)
+            uploaded.append(shard_key)
+            result = get_textract_tracker().submit(shard_key).result()
+
+        # Shard-relative page numbers -> document page numbers
+        pages = [OcrPage.from_dict(page) for page in result["pages"]]
+        return {first + page.page_number - 1: page.renumbered(first + page.page_number - 1) for page in pages}
+
+    print(f"🔀 {name}: OCR of {page_count} pages in {len(shards)} shard(s) of up to {settings.ocr_shard_pages}")
+    try:
+        workers = min(len(shards), max(1, settings.ocr_shard_concurrency))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-shard") as executor:
+            shard_pages = list(executor.map(run_shard, shards))
+    finally:
+        if uploaded:
+            try:
+                delete_multiple_files_from_s3(uploaded)
+            except Exception as e:
+                print(f"Cleanup warning: {e}")
+
+    pages = {number: OcrPage(page_number=number, source="textract") for number in range(1, page_count + 1)}
+    for shard in shard_pages:
+        pages.update(shard)
+    return pages
@@ -0,0 +1,192 @@
+"""
+Tesseract OCR Engine - Offline OCR for Air-Gapped Deployments and Tests
+
+Runs the whole OCR step without network access: page images are cleaned
+up with OpenCV (preprocessing.py) and recognised by a local Tesseract,
+page-parallel in a process pool (Tesseract + OpenCV are CPU-bound).
+
+Responsibilities:
+- Load page images: embedded scan images of PDF pages (no poppler
+  needed), or the frames of JPEG/PNG/TIFF files
+- Recognise pages in parallel (settings.tesseract_workers processes)
+- Build OcrPages with word/line geometry and confidence, like Textract
+
+NOT responsible for:
+- Rendering vector-only PDF pages (those have a text layer and never
+  reach an OCR engine)
+
+pytesseract (plus the tesseract binary) and opencv-python are optional:
+they are imported on first use, so the API runs without them when
+settings.ocr_engine is "textract".
+"""
+
+import io
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageSequence
+from pypdf import PdfReader
+
+from app.config import settings
+from app.services.ocr.engines import OcrEngine
+from app.services.ocr.ocr_document import OcrPage
+from app.services.ocr.preprocessing import preprocess_image
+
+
+def _require_pytesseract():
+    try:
+        import pytesseract
+    except ImportError as e:
+        raise RuntimeError(f"Tesseract engine needs pytesseract and the tesseract binary: {e}")
+    return pytesseract
+
+
+def _png_bytes(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def load_page_images(file_path: str, page_numbers: Optional[List[int]] = None) -> Dict[int, Optional[bytes]]:
+    """
+    Page images of a local document as PNG bytes (picklable for the pool).
+
+    For PDF pages the largest embedded image is used (a scanned page is one
+    full-page image); pages without images map to None.
+    """
+    path = Path(file_path)
+    with open(path, "rb") as f:
+        is_pdf = f.read(5) == b"%PDF-"
+
+    images: Dict[int, Optional[bytes]] = {}
+    if is_pdf:
+        reader = PdfReader(str(path))
+        wanted = page_numbers or list(range(1, len(reader.pages) + 1))
+        for number in wanted:
+            page_images = list(reader.pages[number - 1].images)
+            if not page_images:
+                images[number] = None
+                continue
+            largest = max(page_images, key=lambda img: img.image.width * img.image.height)
+            images[number] = _png_bytes(largest.image)
+    else:
+        with Image.open(path) as document:
+            for number, frame in enumerate(ImageSequence.Iterator(document), start=1):
+                if page_numbers is None or number in page_numbers:
+                    images[number] = _png_bytes(frame.convert("RGB"))
+    return images
+
+
+def page_from_tesseract_data(page_number: int, data: Dict[str, List[Any]], size: Tuple[int, int]) -> OcrPage:
+    """
+    Build an OcrPage from pytesseract.image_to_data(output_type=DICT).
+
+    Words are grouped into lines by (block_num, par_num, line_num); boxes are
+    normalised to 0..1 like Textract's; line confidence is the mean of its
+    words'.
+    """
+    width, height = size
+    lines: Dict[Tuple[int, int, int], List[int]] = {}
+    for i, text in enumerate(data.get("text", [])):
+        if int(data["level"][i]) != 5 or not str(text).strip():
+            continue
+        key = (int(data["block_num"][i]), int(data["par_num"][i]), int(data["line_num"][i]))
+        lines.setdefault(key, []).append(i)
+
+    page = OcrPage(page_number=page_number, source="tesseract")
+    for key in sorted(lines):
+        indexes = lines[key]
+        confidences = [max(0.0, float(data["conf"][i])) for i in indexes]
+        left = min(int(data["left"][i]) for i in indexes)
+        top = min(int(data["top"][i]) for i in indexes)
+        right = max(int(data["left"][i]) + int(data["width"][i]) for i in indexes)
+        bottom = max(int(data["top"][i]) + int(data["height"][i]) for i in indexes)
+
+        page.line_text.append(" ".join(str(data["text"][i]).strip() for i in indexes))
+        page.line_conf.append(round(sum(confidences) / len(confidences), 2))
+        page.line_bbox.extend([
+            round(left / width, 4), round(top / height, 4),
+            round((right - left) / width, 4), round((bottom - top) / height, 4)
+        ])
+        for i, confidence in zip(indexes, confidences):
+            page.word_text.append(str(data["text"][i]).strip())
+            page.word_conf.append(round(confidence, 2))
+            page.word_bbox.extend([
+                round(int(data["left"][i]) / width, 4), round(int(data["top"][i]) / height, 4),
+                round(int(data["width"][i]) / width, 4), round(int(data["height"][i]) / height, 4)
+            ])
+        page.line_word_start.append(len(page.word_text))
+    return page
+
+
+def _recognize_page(job: Tuple[int, Optional[bytes], str, bool]) -> Dict[str, Any]:
+    """Pool worker: one page image -> OcrPage dict"""
+    page_number, png, lang, preprocess = job
+    if png is None:
+        return OcrPage(page_number=page_number, source="tesseract").to_dict()
+
+    pytesseract = _require_pytesseract()
+    image = Image.open(io.BytesIO(png))
+    if preprocess:
+        image = preprocess_image(image)
+    data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+    return page_from_tesseract_data(page_number, data, image.size).to_dict()
+
+
+class TesseractEngine(OcrEngine):
+    """
+    Example:
+        >>> engine = get_ocr_engine("tesseract")
+        >>> pages, meta = engine.ocr_document("/tmp/scan.png", "audits/AUD-1/bill.png")
+    """
+
+    name = "tesseract"
+
+    def __init__(self, lang: Optional[str] = None, workers: Optional[int] = None, preprocess: Optional[bool] = None):
+        self.lang = lang or settings.tesseract_lang
+        self.workers = max(1, workers or settings.tesseract_workers)
+        self.preprocess = settings.tesseract_preprocess if preprocess is None else preprocess
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Not fork: this process already runs threads (event
+                # loops, queue workers, boto3) whose locks a fork could copy held
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _recognize(self, images: Dict[int, Optional[bytes]]) -> Dict[int, OcrPage]:
+        jobs = [(number, png, self.lang, self.preprocess) for number, png in sorted(images.items())]
+        if self.workers == 1 or len(jobs) <= 1:
+            results = list(map(_recognize_page, jobs))
+        else:
+            results = list(self._get_pool().map(_recognize_page, jobs))
+        return {job[0]: OcrPage.from_dict(result) for job, result in zip(jobs, results)}
+
+    def ocr_pages(self, file_path: str, s3_key: str, page_numbers: List[int], page_count: int) -> Dict[int, OcrPage]:
+        print(f"🔡 Tesseract: OCR of {len(page_numbers)} page(s) of {Path(file_path).name} ({self.workers} worker(s))")
+        return self._recognize(load_page_images(file_path, page_numbers))
+
+    def ocr_document(self, file_path: Optional[str], s3_key: str) -> Tuple[List[OcrPage], Dict[str, Any]]:
+        if not file_path or not Path(file_path).exists():
+            raise RuntimeError(f"Tesseract engine needs a local copy of {s3_key}")
+        print(f"🔡 Tesseract: OCR of {Path(file_path).name} ({self.workers} worker(s))")
+        pages = list(self._recognize(load_page_images(file_path)).values())
+        confidences = [conf for page in pages for conf in page.line_conf]
+        return pages, {
+            "engine": "tesseract",
+            "mean_confidence": round(sum(confidences) / len(confidences), 2) if confidences else None
+        }
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
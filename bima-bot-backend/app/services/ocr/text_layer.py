@@ -0,0 +1,142 @@
+"""
+Text Layer Extraction - Local Fast Path for Born-Digital PDFs
+
+PDFs produced by hospital billing systems (and by generate_sample_bill.py)
+already carry a perfect text layer. Reading it with pypdf takes
+milliseconds and needs no network, so Textract is only worth calling for
+scanned pages.
+
+Responsibilities:
+- Extract the embedded text of each PDF page with pypdf
+- Score each page's text layer (0.0 = unusable/scanned, 1.0 = clean)
+- Report which pages can skip Textract
+- Split scanned pages / page ranges out as standalone PDFs for Textract
+
+NOT responsible for:
+- OCR of scanned pages (Textract does that)
+- Validating or interpreting the text
+"""
+
+import re
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from pypdf import PdfReader, PdfWriter
+
+from app.config import settings
+
+# Tokens that look like words, amounts, dates or codes on a medical bill
+_WORDLIKE = re.compile(r"^[\w₹$€£.,:;/()%&'\"+\-#@*]+$")
+
+
+@dataclass
+class TextLayerPage:
+    page_number: int
+    text: str
+    quality: float
+
+
+@dataclass
+class TextLayerResult:
+    pages: List[TextLayerPage] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(page.text for page in self.pages)
+
+    def scanned_pages(self, min_quality: float) -> List[int]:
+        """Page numbers whose text layer is too poor to use"""
+        return [page.page_number for page in self.pages if page.quality < min_quality]
+
+
+def score_text_layer(text: str, min_chars: Optional[int] = None) -> float:
+    """
+    Heuristic quality score for an embedded text layer.
+
+    Penalises empty/near-empty pages (scans), undecodable glyphs such as
+    "(cid:12)" or U+FFFD (broken font encodings) and gibberish tokens.
+
+    Returns:
+        Score between 0.0 and 1.0
+    """
+    min_chars = settings.text_layer_min_chars_per_page if min_chars is None else min_chars
+    stripped = text.strip() if text else ""
+    if len(stripped) < min_chars:
+        return 0.0
+
+    tokens = stripped.split()
+    garbage = stripped.count("(cid:") + stripped.count("�")
+    if garbage / len(tokens) > 0.05:
+        return 0.0
+
+    printable = sum(1 for ch in stripped if ch.isprintable() or ch in "\n\t") / len(stripped)
+    wordlike = sum(1 for t in tokens if _WORDLIKE.match(t) and any(c.isalnum() for c in t)) / len(tokens)
+    avg_token_len = sum(len(t) for t in tokens) / len(tokens)
+    sane_lengths = 1.0 if 2 <= avg_token_len <= 15 else 0.0
+
+    return round(0.5 * wordlike + 0.3 * printable + 0.2 * sane_lengths, 3)
+
+
+def is_pdf(file_path: str) -> bool:
+    try:
+        with open(file_path, "rb") as f:
+            return f.read(5) == b"%PDF-"
+    except OSError:
+        return False
+
+
+def extract_text_layer(file_path: str) -> Optional[TextLayerResult]:
+    """
+    Read the embedded text of every page.
+
+    Returns:
+        TextLayerResult, or None if the file is not a readable PDF
+        (images, encrypted or corrupt files go straight to Textract)
+    """
+    if not is_pdf(file_path):
+        return None
+
+    try:
+        reader = PdfReader(file_path)
+        if reader.is_encrypted:
+            return None
+
+        result = TextLayerResult()
+        for index, page in enumerate(reader.pages, start=1):
+            text = page.extract_text() or ""
+            result.pages.append(TextLayerPage(page_number=index, text=text, quality=score_text_layer(text)))
+        return result
+
+    except Exception as e:
+        print(f"⚠️  Text layer unreadable for {file_path}: {e}")
+        return None
+
+
+def split_pdf_pages(file_path: str, page_numbers: List[int]) -> Dict[int, bytes]:
+    """
+    Copy the given (1-based) pages into standalone single-page PDFs.
+
+    Returns:
+        page_number -> PDF bytes
+    """
+    reader = PdfReader(file_path)
+    pages = {}
+    for page_number in page_numbers:
+        writer = PdfWriter()
+        writer.add_page(reader.pages[page_number - 1])
+        buffer = BytesIO()
+        writer.write(buffer)
+        pages[page_number] = buffer.getvalue()
+    return pages
+
+
+def split_pdf_range(file_path: str, first: int, last: int) -> bytes:
+    """Copy pages first..last (1-based, inclusive) into a standalone PDF"""
+    reader = PdfReader(file_path)
+    writer = PdfWriter()
+    for index in range(first - 1, last):
+        writer.add_page(reader.pages[index])
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
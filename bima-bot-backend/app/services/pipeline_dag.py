@@ -0,0 +1,136 @@
+"""
+Pipeline DAG - Dependency-Ordered Parallel Stage Execution
+
+Runs a set of named stages on a thread pool, starting each stage the
+moment all of its dependencies have finished. Independent stages (e.g.
+the three Nova Lite calls) therefore overlap, and total latency is the
+critical path rather than the sum of all stages.
+
+Each stage function receives its dependencies' results as keyword
+arguments named after those dependencies:
+
+    Stage("bill_struct", lambda bill_text: structure(bill_text), deps=("bill_text",))
+
+Every stage is timed (start offset from the beginning of the run and
+duration, in ms) and reported through the optional on_stage_done hook.
+"""
+
+import time
+
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+
+
+def _timed(func: Callable[..., Any], run_start: float, timing: Dict[str, Any]) -> Callable[..., Any]:
+    def wrapper(**kwargs):
+        start = time.monotonic()
+        timing["start_ms"] = int((start - run_start) * 1000)
+        try:
+            return func(**kwargs)
+        finally:
+            timing["duration_ms"] = int((time.monotonic() - start) * 1000)
+    return wrapper
+
+
+class StageFailedError(Exception):
+    """A stage raised; wraps the original exception as `cause`"""
+
+    def __init__(self, stage: str, cause: BaseException):
+        self.stage = stage
+        self.cause = cause
+        super().__init__(f"Stage '{stage}' failed: {cause}")
+
+
+def _validate(stages: List[Stage]) -> None:
+    names = [s.name for s in stages]
+    if len(names) != len(set(names)):
+        raise ValueError("Duplicate stage names")
+
+    known = set(names)
+    for stage in stages:
+        missing = set(stage.deps) - known
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {sorted(missing)}")
+
+    # Kahn's algorithm: every stage must become ready at some point
+    remaining = {s.name: set(s.deps) for s in stages}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Dependency cycle between stages: {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def run_stages(
+    stages: List[Stage],
+    max_workers: Optional[int] = None,
+    on_stage_done: Optional[Callable[[str, Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Execute stages with maximal concurrency.
+
+    Args:
+        stages: Stage definitions (any order)
+        max_workers: Thread cap (defaults to one thread per stage)
+        on_stage_done: Called as on_stage_done(name, timing) when a stage
+            finishes or fails; timing is {"start_ms", "duration_ms", "ok"}
+
+    Returns:
+        Stage name -> result
+
+    Raises:
+        StageFailedError: On the first stage failure. Stages not yet
+            started are skipped; running ones are waited for (not
+            reported), so no stage is still using the caller's files,
+            workers or audit record once this raises.
+    """
+    _validate(stages)
+
+    by_name = {s.name: s for s in stages}
+    waiting = {s.name: set(s.deps) for s in stages}
+    results: Dict[str, Any] = {}
+    running: Dict[Future, str] = {}
+    timings: Dict[str, Dict[str, Any]] = {}
+    run_start = time.monotonic()
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(stages), thread_name_prefix="pipeline")
+
+    def launch_ready():
+        for name in [n for n, deps in waiting.items() if not deps]:
+            stage = by_name[name]
+            del waiting[name]
+            kwargs = {dep: results[dep] for dep in stage.deps}
+            timings[name] = {}
+            running[executor.submit(_timed(stage.func, run_start, timings[name]), **kwargs)] = name
+
+    try:
+        launch_ready()
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                timings[name]["ok"] = error is None
+                if on_stage_done is not None:
+                    on_stage_done(name, dict(timings[name]))
+                if error is not None:
+                    raise StageFailedError(name, error)
+                results[name] = future.result()
+                for deps in waiting.values():
+                    deps.discard(name)
+            launch_ready()
+        return results
+    finally:
+        # Threads can't be interrupted: drop pending stages, wait for running ones
+        executor.shutdown(wait=True, cancel_futures=True)
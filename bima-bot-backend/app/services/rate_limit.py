@@ -0,0 +1,66 @@
+"""
+Rate Limiting - Token Buckets for AWS API Quotas
+
+Textract (and Bedrock) enforce per-account TPS quotas. Fanning work out
+across threads is only a win if we stay under them, so every fan-out
+takes a token before calling AWS instead of hitting throttling errors.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from app.config import settings
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Example:
+        >>> bucket = TokenBucket(rate_per_second=5, burst=5)
+        >>> bucket.acquire()   # blocks until a token is free
+    """
+
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        self.rate = max(0.001, rate_per_second)
+        self.capacity = float(burst if burst is not None else max(1, int(rate_per_second)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens, sleeping until they are available.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+_textract_bucket: Optional[TokenBucket] = None
+_textract_bucket_lock = threading.Lock()
+
+
+def get_textract_rate_limiter() -> TokenBucket:
+    """Process-wide limiter for Textract DetectDocumentText / Start* calls"""
+    global _textract_bucket
+    with _textract_bucket_lock:
+        if _textract_bucket is None:
+            _textract_bucket = TokenBucket(settings.textract_max_tps)
+        return _textract_bucket
@@ -1,13 +1,15 @@
-import boto3
 import json
 import os
 from typing import Dict, Any, List
 
+from app.services.aws_clients import LazyClient
+from app.services.cache import cached_converse
+
 REGION = os.getenv('AWS_REGION', 'us-east-1')
 # Nova Pro is smarter and better for legal writing
 MODEL_ID = "amazon.nova-pro-v1:0"
 
-bedrock = boto3.client('bedrock-runtime', region_name=REGION)
+bedrock = LazyClient('bedrock-runtime', region_name=REGION)
 
 def write_dispute_letter(audit_json, metadata):
     """
@@ -70,7 +72,9 @@ def write_dispute_letter(audit_json, metadata):
     """
     
     try:
-        response = bedrock.converse(
+        # Sampled (temperature 0.7), so not served from the LLM cache
+        response = cached_converse(
+            bedrock,
             modelId=MODEL_ID,
             messages=[{"role": "user", "content": [{"text": prompt}]}],
             inferenceConfig={"temperature": 0.7}
@@ -0,0 +1,221 @@
+"""
+Textract Job Tracker - Async Textract Jobs Multiplexed on One Event Loop
+
+Replaces the per-document `time.sleep(1)` polling loop. A single asyncio
+loop (in one background thread) starts Textract jobs and waits on all of
+them at once, so hundreds of in-flight OCR jobs cost one thread plus a
+small pool for the blocking boto3 calls.
+
+Responsibilities:
+- Start async text-detection (or TABLES analysis) jobs and hand callers
+  a Future per job
+- Poll with jittered exponential backoff (fast for small jobs, cheap for big ones)
+- Wake a job early via notify(job_id), for an SNS/SQS completion channel
+- Page through results and summarise blocks exactly like the sync path
+
+NOT responsible for:
+- Deciding sync vs async Textract (aws_service does that)
+"""
+
+import asyncio
+import functools
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError, BotoCoreError
+
+from app.config import settings
+from app.services import aws_service
+from app.services.aws_service import AWSServiceError
+
+
+class TextractJobTracker:
+    """
+    Tracks async Textract jobs on a private event loop.
+
+    Example:
+        >>> tracker = get_textract_tracker()
+        >>> result = tracker.submit("audits/AUD-1/policy.pdf").result()
+        >>> result["text"]
+    """
+
+    def __init__(
+        self,
+        api_workers: int,
+        initial_delay: float,
+        max_delay: float,
+        timeout: float
+    ):
+        self.initial_delay = initial_delay
+        self.max_delay = max(initial_delay, max_delay)
+        self.timeout = timeout
+
+        self._api_pool = ThreadPoolExecutor(max_workers=max(1, api_workers), thread_name_prefix="textract-api")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._wakeups: Dict[str, asyncio.Event] = {}
+
+    # --- Lifecycle ---
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._run_loop, args=(loop,), name="textract-tracker", daemon=True
+                )
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def shutdown(self) -> None:
+        with self._start_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop = None
+                self._thread = None
+        self._api_pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- Public API (thread-safe) ---
+
+    def submit(self, s3_key: str, feature_types: Optional[List[str]] = None) -> Future:
+        """
+        Start an async Textract job for s3_key.
+        
+        With feature_types (e.g. ["TABLES"]) the job is a document
+        analysis instead of plain text detection.
+
+        Returns:
+            Future resolving to the same dict as detect_document_with_textract
+            (text, line_count, page_count, mean_confidence, textract_api),
+            or raising AWSServiceError
+        """
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._track(s3_key, feature_types), loop)
+
+    def notify(self, job_id: str) -> None:
+        """Signal that Textract reported job_id finished (e.g. from SNS/SQS)"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake, job_id)
+
+    def in_flight(self) -> int:
+        return len(self._wakeups)
+
+    # --- Loop internals ---
+
+    def _wake(self, job_id: str) -> None:
+        event = self._wakeups.get(job_id)
+        if event is not None:
+            event.set()
+
+    async def _call(self, func, **kwargs) -> Dict[str, Any]:
+        # boto3 is blocking: run the request on the small API pool
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._api_pool, functools.partial(func, **kwargs))
+
+    async def _track(self, s3_key: str, feature_types: Optional[List[str]]) -> Dict[str, Any]:
+        try:
+            return await self._run_job(s3_key, feature_types)
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+            error_msg = e.response.get('Error', {}).get('Message', str(e))
+            print(f"❌ Async Textract ClientError - Code: {error_code}, Message: {error_msg}")
+            raise AWSServiceError(f"Async Textract error for {s3_key}: {error_code} - {error_msg}")
+        except BotoCoreError as e:
+            print(f"❌ Async Textract BotoCoreError: {str(e)}")
+            raise AWSServiceError(f"Async Textract failed to process {s3_key}: {str(e)}")
+
+    async def _run_job(self, s3_key: str, feature_types: Optional[List[str]]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        textract = aws_service.textract
+        location = {'S3Object': {'Bucket': aws_service.BUCKET_NAME, 'Name': s3_key}}
+
+        print(f"🔄 Starting async Textract job for {s3_key}")
+        if feature_types:
+            response = await self._call(
+                textract.start_document_analysis, DocumentLocation=location, FeatureTypes=feature_types
+            )
+            get_results = textract.get_document_analysis
+        else:
+            response = await self._call(textract.start_document_text_detection, DocumentLocation=location)
+            get_results = textract.get_document_text_detection
+        job_id = response['JobId']
+        print(f"📋 Job ID: {job_id}")
+
+        wakeup = asyncio.Event()
+        self._wakeups[job_id] = wakeup
+        started = loop.time()
+        deadline = started + self.timeout
+        delay = self.initial_delay
+        polls = 0
+
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise AWSServiceError(f"Async Textract job timed out after {self.timeout:.0f}s for {s3_key}")
+
+                # Sleep until the backoff expires or a notification arrives
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=min(delay * random.uniform(0.8, 1.2), remaining))
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+
+                polls += 1
+                response = await self._call(get_results, JobId=job_id)
+                status = response['JobStatus']
+
+                if status == 'SUCCEEDED':
+                    blocks = await self._collect_blocks(get_results, job_id, response)
+                    result = aws_service._summarize_blocks(blocks, api="async")
+                    print(
+                        f"📄 Extracted {result['line_count']} lines from {s3_key} (async, "
+                        f"{loop.time() - started:.1f}s, {polls} polls)"
+                    )
+                    return result
+
+                if status == 'FAILED':
+                    error_msg = response.get('StatusMessage', 'Unknown error')
+                    raise AWSServiceError(f"Async Textract job failed: {error_msg}")
+
+                # Still IN_PROGRESS: back off
+                delay = min(delay * 2, self.max_delay)
+        finally:
+            self._wakeups.pop(job_id, None)
+
+    async def _collect_blocks(self, get_results, job_id: str, first_page: Dict[str, Any]) -> List[Dict[str, Any]]:
+        blocks = list(first_page.get('Blocks', []))
+        next_token = first_page.get('NextToken')
+        while next_token:
+            response = await self._call(get_results, JobId=job_id, NextToken=next_token)
+            blocks.extend(response.get('Blocks', []))
+            next_token = response.get('NextToken')
+        return blocks
+
+
+_tracker: Optional[TextractJobTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_textract_tracker() -> TextractJobTracker:
+    """Process-wide tracker, created on first use from settings"""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = TextractJobTracker(
+                api_workers=settings.textract_api_workers,
+                initial_delay=settings.textract_poll_initial_seconds,
+                max_delay=settings.textract_poll_max_seconds,
+                timeout=settings.textract_job_timeout_seconds
+            )
+        return _tracker
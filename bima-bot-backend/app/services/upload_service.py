@@ -0,0 +1,439 @@
+"""
+Upload Service - Streaming Document Ingest
+
+Reads uploaded documents in fixed-size chunks so peak memory per upload
+stays constant regardless of file size.
+
+Responsibilities:
+- Enforce the size limit incrementally (abort as soon as it is crossed)
+- Write chunks to disk through a bounded buffer
+- Compute a SHA-256 content hash on the fly
+- Optionally pipe chunks straight into an S3 multipart upload
+  (upload_mode="s3_stream"), skipping the local disk round-trip
+- Receive a document per upload mode; normalize photographed bills
+- Remove what a failed upload already stored (disk files, S3 objects)
+
+NOT responsible for:
+- Validating file types (route's job)
+- Mapping errors to HTTP responses (route's job)
+- Audit session bookkeeping
+"""
+
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Awaitable, Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services import metrics
+from app.services.image_normalization import normalize_image_file
+from app.services.aws_service import (
+    AWSServiceError,
+    delete_multiple_files_from_s3,
+    get_transfer_executor,
+    upload_file_to_s3,
+    upload_bytes_to_s3,
+    create_multipart_upload,
+    upload_part_to_s3,
+    complete_multipart_upload,
+    abort_multipart_upload,
+)
+
+# S3 rejects non-final multipart parts smaller than 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised as soon as an upload crosses the configured size limit"""
+
+    def __init__(self, limit_bytes: int, label: Optional[str] = None):
+        self.limit_bytes = limit_bytes
+        self.label = label      # "Bill" / "Policy", set by receive_document
+        super().__init__(f"Upload exceeds limit of {limit_bytes} bytes")
+
+
+@dataclass
+class UploadReceipt:
+    """What we know about a stored upload without holding its bytes"""
+    path: Optional[str]
+    size_bytes: int
+    sha256: str
+    s3_key: Optional[str] = None
+    elapsed_ms: Optional[float] = None
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _run_s3(func, *args):
+    """
+    Run a blocking S3 call on the shared transfer pool.
+
+    Cancelling only drops calls still queued on the pool; a call already
+    running in its thread cannot be interrupted, so cancellation waits for
+    it to settle. Otherwise a PUT could land after the caller's cleanup.
+    """
+    future = get_transfer_executor().submit(partial(func, *args))
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        if not future.cancelled():
+            await asyncio.wait({asyncio.wrap_future(future)})
+        raise
+
+
+async def gather_or_cancel(*aws: Awaitable) -> list:
+    """
+    Like asyncio.gather, but if one awaitable fails the others are
+    cancelled (and awaited) before the error propagates, so no upload
+    keeps running for a request that has already failed. S3 calls made
+    through _run_s3 have settled by the time this raises.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def get_chunk_size() -> int:
+    """Chunk size in bytes used for every streamed read/write"""
+    return max(1, settings.upload_chunk_size_kb) * 1024
+
+
+async def stream_upload_to_disk(
+    upload: UploadFile,
+    dest: Path,
+    max_bytes: int,
+    chunk_size: Optional[int] = None
+) -> UploadReceipt:
+    """
+    Stream an UploadFile to disk chunk by chunk.
+
+    The file is written to a `.part` sibling and only renamed into place
+    once fully received, so a rejected or interrupted upload never leaves
+    a truncated document behind.
+
+    Args:
+        upload: Incoming multipart file
+        dest: Final path on disk
+        max_bytes: Size limit; exceeded uploads are aborted immediately
+        chunk_size: Bytes per read (defaults to settings.upload_chunk_size_kb)
+
+    Returns:
+        UploadReceipt with absolute path, size and SHA-256 hex digest
+
+    Raises:
+        UploadTooLargeError: If the upload is larger than max_bytes
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    start = time.perf_counter()
+    digest = hashlib.sha256()
+    size = 0
+    part_path = dest.with_name(dest.name + ".part")
+
+    try:
+        with open(part_path, "wb", buffering=chunk_size) as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+
+                digest.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+
+        part_path.replace(dest)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+    return UploadReceipt(
+        path=str(dest.absolute()),
+        size_bytes=size,
+        sha256=digest.hexdigest(),
+        elapsed_ms=_elapsed_ms(start)
+    )
+
+
+def file_sha256(path: str, chunk_size: Optional[int] = None) -> str:
+    """SHA-256 of a file on disk, read in chunks (e.g. after it was rewritten)"""
+    chunk_size = chunk_size or get_chunk_size()
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_part_size() -> int:
+    """Multipart part size in bytes, clamped to the S3 minimum"""
+    return max(MIN_PART_SIZE, settings.s3_multipart_part_size_mb * 1024 * 1024)
+
+
+async def stream_upload_to_s3(
+    upload: UploadFile,
+    s3_key: str,
+    max_bytes: int,
+    tee_path: Optional[Path] = None,
+    part_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None
+) -> UploadReceipt:
+    """
+    Stream an UploadFile straight into S3.
+
+    Chunks are accumulated into parts of `part_size` bytes and each full
+    part is uploaded on the shared S3 transfer pool while reading continues. At most
+    `max_concurrency` parts are in flight, so memory stays bounded at
+    roughly part_size * (max_concurrency + 1). Documents smaller than one
+    part are sent with a single PUT instead.
+
+    Args:
+        upload: Incoming multipart file
+        s3_key: Destination S3 object key
+        max_bytes: Size limit; exceeded uploads are aborted immediately
+        tee_path: If set, the bytes are also written to this local path
+        part_size: Multipart part size (defaults to settings)
+        max_concurrency: Parts uploaded in parallel (defaults to settings)
+
+    Returns:
+        UploadReceipt with S3 key, size, SHA-256 and tee path (if any)
+
+    Raises:
+        UploadTooLargeError: If the upload is larger than max_bytes
+        AWSServiceError: If any S3 call fails
+    """
+    part_size = part_size or get_part_size()
+    max_concurrency = max(1, max_concurrency or settings.s3_multipart_concurrency)
+    chunk_size = min(get_chunk_size(), part_size)
+
+    start = time.perf_counter()
+    digest = hashlib.sha256()
+    size = 0
+    buffer = bytearray()
+    upload_id: Optional[str] = None
+    part_number = 0
+    in_flight: List[asyncio.Future] = []
+    parts: List[dict] = []
+
+    tee_part = tee_path.with_name(tee_path.name + ".part") if tee_path else None
+    tee_file = open(tee_part, "wb", buffering=chunk_size) if tee_part else None
+
+    async def flush_part(data: bytes):
+        nonlocal upload_id, part_number
+        if upload_id is None:
+            upload_id = await _run_s3(create_multipart_upload, s3_key)
+        part_number += 1
+        in_flight.append(asyncio.ensure_future(
+            _run_s3(upload_part_to_s3, s3_key, upload_id, part_number, data)
+        ))
+        # Backpressure: wait for the oldest part before buffering more
+        if len(in_flight) >= max_concurrency:
+            parts.append(await in_flight.pop(0))
+
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+
+            digest.update(chunk)
+            if tee_file:
+                await run_in_threadpool(tee_file.write, chunk)
+
+            buffer.extend(chunk)
+            if len(buffer) >= part_size:
+                await flush_part(bytes(buffer[:part_size]))
+                del buffer[:part_size]
+
+        if upload_id is None:
+            # Whole document fits in one part - a single PUT is cheaper
+            await _run_s3(upload_bytes_to_s3, bytes(buffer), s3_key)
+        else:
+            if buffer:
+                await flush_part(bytes(buffer))
+            parts.extend(await asyncio.gather(*in_flight))
+            in_flight.clear()
+            await _run_s3(complete_multipart_upload, s3_key, upload_id, parts)
+
+        if tee_file:
+            tee_file.close()
+            tee_part.replace(tee_path)
+
+    except BaseException:
+        for future in in_flight:
+            future.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        if upload_id is not None:
+            await _run_s3(abort_multipart_upload, s3_key, upload_id)
+        if tee_file:
+            tee_file.close()
+            tee_part.unlink(missing_ok=True)
+        raise
+
+    return UploadReceipt(
+        path=str(tee_path.absolute()) if tee_path else None,
+        size_bytes=size,
+        sha256=digest.hexdigest(),
+        s3_key=s3_key,
+        elapsed_ms=_elapsed_ms(start)
+    )
+
+
+async def upload_files_to_s3_concurrently(files: Dict[str, Tuple[str, str]]) -> Dict[str, float]:
+    """
+    Upload several local files to S3 at once, off the event loop.
+
+    Each upload runs on the shared transfer pool using the tuned
+    TransferConfig, so a slow file neither serializes the others nor
+    blocks other requests on this worker.
+
+    Args:
+        files: label -> (local_path, s3_key), e.g. {"bill": (path, key)}
+
+    Returns:
+        label -> upload time in milliseconds
+
+    Raises:
+        AWSServiceError: If any upload fails (the rest are cancelled)
+    """
+    async def timed_upload(label: str, local_path: str, s3_key: str) -> Tuple[str, float]:
+        start = time.perf_counter()
+        await _run_s3(upload_file_to_s3, local_path, s3_key)
+        return label, _elapsed_ms(start)
+
+    results = await gather_or_cancel(*(
+        timed_upload(label, local_path, s3_key)
+        for label, (local_path, s3_key) in files.items()
+    ))
+    return dict(results)
+
+
+async def receive_document(
+    upload: UploadFile,
+    label: str,
+    local_path: Path,
+    s3_key: Optional[str],
+    max_bytes: int,
+    to_disk: bool = False
+) -> UploadReceipt:
+    """
+    Stream one document to disk or S3 depending on settings.upload_mode.
+
+    Raises:
+        UploadTooLargeError: With .label set, if the upload is too large
+    """
+    try:
+        if settings.upload_mode == "s3_stream" and not to_disk:
+            tee_path = local_path if settings.upload_local_fallback else None
+            return await stream_upload_to_s3(upload, s3_key, max_bytes, tee_path=tee_path)
+        return await stream_upload_to_disk(upload, local_path, max_bytes)
+    except UploadTooLargeError as e:
+        raise UploadTooLargeError(e.limit_bytes, label) from None
+
+
+async def normalize_bill_upload(receipt: UploadReceipt, audit_id: str) -> Tuple[UploadReceipt, Optional[dict]]:
+    """
+    Normalize a photographed bill saved on disk (off the event loop).
+
+    Returns:
+        (receipt for the normalized file with its S3 key, before/after
+        summary); the original receipt and None if the image can't be read
+    """
+    try:
+        result = await run_in_threadpool(normalize_image_file, receipt.path, str(Path(receipt.path).parent))
+    except Exception as e:
+        print(f"⚠️ Bill image normalization failed, uploading as received: {e}")
+        return receipt, None
+
+    metrics.increment("upload_image_bytes_total", {"stage": "original"}, value=result.original_bytes)
+    metrics.increment("upload_image_bytes_total", {"stage": "normalized"}, value=result.normalized_bytes)
+    metrics.observe("upload_image_normalize_ms", result.elapsed_ms)
+    print(
+        f"🖼️  Bill image {result.original_size[0]}x{result.original_size[1]} -> "
+        f"{result.normalized_size[0]}x{result.normalized_size[1]}, "
+        f"{result.original_bytes // 1024} KB -> {result.normalized_bytes // 1024} KB in {result.elapsed_ms} ms"
+    )
+
+    normalized = UploadReceipt(
+        path=result.path,
+        size_bytes=result.normalized_bytes,
+        sha256=await run_in_threadpool(file_sha256, result.path),
+        s3_key=f"audits/{audit_id}/bill.{result.extension}",
+        elapsed_ms=round((receipt.elapsed_ms or 0) + result.elapsed_ms, 1)
+    )
+    return normalized, result.to_dict()
+
+
+async def receive_photographed_bill(
+    upload: UploadFile,
+    local_path: Path,
+    audit_id: str,
+    max_bytes: int
+) -> Tuple[UploadReceipt, Optional[dict]]:
+    """
+    s3_stream mode for photographed bills: the photo is received on disk,
+    normalized, then uploaded (a 12 MP photo would otherwise be streamed
+    to S3 as-is). The local copy is kept only with upload_local_fallback.
+    """
+    receipt = await receive_document(upload, "Bill", local_path, None, max_bytes, to_disk=True)
+    receipt, summary = await normalize_bill_upload(receipt, audit_id)
+    s3_key = receipt.s3_key or f"audits/{audit_id}/bill.pdf"
+
+    timings = await upload_files_to_s3_concurrently({"bill": (receipt.path, s3_key)})
+    path = receipt.path
+    if not settings.upload_local_fallback:
+        # The audit's upload dir existed only for this photo
+        Path(receipt.path).unlink(missing_ok=True)
+        _remove_empty_dir(Path(receipt.path).parent)
+        path = None
+    return UploadReceipt(
+        path=path,
+        size_bytes=receipt.size_bytes,
+        sha256=receipt.sha256,
+        s3_key=s3_key,
+        elapsed_ms=round((receipt.elapsed_ms or 0) + timings["bill"], 1)
+    ), summary
+
+
+def _remove_empty_dir(directory: Path) -> None:
+    try:
+        directory.rmdir()
+    except OSError:
+        pass    # already gone, or still holds other files
+
+
+def discard_upload(audit_id: str, upload_dir: Path, delete_from_s3: bool) -> None:
+    """
+    Remove everything a failed upload may have stored: local copies of the
+    bill (any normalized extension) and policy, the upload dir once empty
+    and, if requested, the matching S3 objects. Never raises, so the
+    original error is reported.
+    """
+    names = ["bill.pdf", "bill.jpg", "bill.png", "policy.pdf"]
+    for name in names:
+        (upload_dir / name).unlink(missing_ok=True)
+    _remove_empty_dir(upload_dir)
+    if delete_from_s3:
+        try:
+            delete_multiple_files_from_s3([f"audits/{audit_id}/{name}" for name in names])
+        except AWSServiceError as e:
+            print(f"Cleanup warning: {e}")
@@ -0,0 +1,131 @@
+"""
+Audit Worker - Out-of-Process Pipeline Runner
+
+Pulls audit jobs from the durable SQLite queue and runs the pipeline
+(OCR, Nova Lite structuring, RAG audit, letter) outside the API process.
+Results are written back to the shared SQLite audit store, so any API
+process can serve them.
+
+Requires:
+    AUDIT_JOB_BACKEND=durable
+    AUDIT_STORE_BACKEND=sqlite
+
+Usage:
+    python -m app.worker                 # settings.audit_workers threads
+    python -m app.worker --concurrency 4
+
+Run as many worker processes as the host has cores/quota for; each one
+claims jobs atomically and only the worker holding a claim can finish
+the job. A worker whose heartbeats stop for longer than the visibility
+timeout loses its claim and the audit is retried elsewhere.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import threading
+
+from app.config import settings
+from app.services import audit_service
+from app.services.durable_queue import SQLiteJobQueue
+
+
+def _heartbeat_loop(queue: SQLiteJobQueue, job_id: str, worker_id: str, stop: threading.Event) -> None:
+    interval = max(1.0, settings.audit_job_visibility_timeout_seconds / 3)
+    while not stop.wait(interval):
+        try:
+            queue.heartbeat(job_id, worker_id)
+        except Exception as e:
+            # e.g. "database is locked"; the next beat may get through
+            # before the visibility timeout, so keep beating
+            print(f"⚠️ [{worker_id}] Heartbeat for audit {job_id} failed: {e}")
+
+
+def _worker_loop(queue: SQLiteJobQueue, worker_id: str, shutdown: threading.Event) -> None:
+    idle_sleep = settings.worker_poll_interval_seconds
+
+    while not shutdown.is_set():
+        for job_id in queue.reap_exhausted(
+            settings.audit_job_visibility_timeout_seconds, settings.audit_job_max_attempts
+        ):
+            audit_service.fail_audit(job_id, "Audit worker stopped responding; retries exhausted")
+
+        job_id = queue.claim(
+            worker_id,
+            settings.audit_job_visibility_timeout_seconds,
+            settings.audit_job_max_attempts
+        )
+        if job_id is None:
+            # Back off gently while idle, up to 5x the poll interval
+            shutdown.wait(idle_sleep)
+            idle_sleep = min(idle_sleep * 1.5, settings.worker_poll_interval_seconds * 5)
+            continue
+        idle_sleep = settings.worker_poll_interval_seconds
+
+        print(f"🛠️  [{worker_id}] Claimed audit {job_id}")
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=_heartbeat_loop, args=(queue, job_id, worker_id, stop_heartbeat), daemon=True
+        )
+        heartbeat.start()
+        try:
+            error = audit_service.run_audit_job(job_id)
+        except Exception as e:
+            # run_audit_job records pipeline failures itself; this is the
+            # audit store failing while it did so
+            print(f"❌ [{worker_id}] Audit {job_id} crashed: {e}")
+            error = str(e)
+        finally:
+            stop_heartbeat.set()
+
+        if error is None:
+            finalized = queue.complete(job_id, worker_id)
+        else:
+            finalized = queue.fail(job_id, worker_id, error)
+        if not finalized:
+            # Our claim lapsed and another worker owns the job now
+            print(f"⚠️ [{worker_id}] Lost the claim on audit {job_id}; leaving its status to the new owner")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="BimaBot audit worker")
+    parser.add_argument("--concurrency", type=int, default=settings.audit_workers,
+                        help="Audits processed in parallel by this process")
+    args = parser.parse_args()
+
+    queue = audit_service.audit_job_queue
+    if not isinstance(queue, SQLiteJobQueue):
+        raise SystemExit("app.worker needs AUDIT_JOB_BACKEND=durable (and AUDIT_STORE_BACKEND=sqlite)")
+
+    # Warn at startup, not mid-audit, if boto3 cannot stream the audit
+    audit_service.audit_streaming_active()
+    shutdown = threading.Event()
+
+    def request_shutdown(signum, frame):
+        # Finish in-flight audits, stop claiming new ones
+        print("🛑 Shutdown requested, finishing in-flight audits...")
+        shutdown.set()
+
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(signal.SIGTERM, request_shutdown)
+
+    base_id = f"{socket.gethostname()}-{os.getpid()}"
+    threads = [
+        threading.Thread(target=_worker_loop, args=(queue, f"{base_id}-{i}", shutdown), name=f"audit-worker-{i}")
+        for i in range(max(1, args.concurrency))
+    ]
+    for thread in threads:
+        thread.start()
+    print(f"🚀 Audit worker {base_id} running {len(threads)} thread(s) on {queue.path}")
+
+    # Join with a timeout so signals are handled promptly on all platforms
+    while any(t.is_alive() for t in threads):
+        for thread in threads:
+            thread.join(0.5)
+
+    print("✅ Audit worker stopped")
+
+
+if __name__ == "__main__":
+    main()
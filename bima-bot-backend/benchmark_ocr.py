@@ -0,0 +1,88 @@
+"""
+Benchmark OCR Engines - Latency vs Accuracy per Engine
+
+Runs each OCR engine over the given documents and prints wall time,
+pages, mean confidence and (when a ground-truth file is given) character
+accuracy against the expected text.
+
+Usage:
+    python benchmark_ocr.py scan.pdf [bill.png ...] [--engines textract,tesseract]
+                            [--truth scan.txt ...] [--runs 3]
+
+Textract needs AWS credentials and an S3 bucket (the document is uploaded
+under benchmarks/); Tesseract runs fully offline.
+"""
+
+import argparse
+import difflib
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.ocr.engines import get_ocr_engine
+
+
+def char_accuracy(expected: str, actual: str) -> float:
+    """Similarity of whitespace-normalised texts, 0..1"""
+    a, b = " ".join(expected.split()), " ".join(actual.split())
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def benchmark(engine_name: str, file_path: str, truth: str = None, runs: int = 1) -> dict:
+    engine = get_ocr_engine(engine_name)
+    s3_key = f"benchmarks/{Path(file_path).name}"
+    if engine_name == "textract":
+        from app.services.aws_service import upload_file_to_s3
+        upload_file_to_s3(file_path, s3_key)
+
+    timings, pages = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pages, _ = engine.ocr_document(file_path, s3_key)
+        timings.append(time.perf_counter() - start)
+
+    text = "\n".join(page.text for page in pages)
+    confidences = [conf for page in pages for conf in page.line_conf]
+    return {
+        "engine": engine_name,
+        "file": Path(file_path).name,
+        "pages": len(pages),
+        "median_s": statistics.median(timings),
+        "confidence": round(sum(confidences) / len(confidences), 1) if confidences else None,
+        "accuracy": round(char_accuracy(truth, text), 3) if truth is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR engines")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--engines", default="textract,tesseract")
+    parser.add_argument("--truth", nargs="*", default=[], help="Expected text files, in the same order as files")
+    parser.add_argument("--runs", type=int, default=1)
+    args = parser.parse_args()
+
+    truths = [Path(t).read_text(encoding="utf-8") for t in args.truth]
+    print(f"{'engine':<10} {'file':<32} {'pages':>5} {'median s':>9} {'conf':>6} {'accuracy':>9}")
+    for file_path, truth in zip(args.files, truths + [None] * (len(args.files) - len(truths))):
+        for engine_name in args.engines.split(","):
+            try:
+                r = benchmark(engine_name.strip(), file_path, truth, args.runs)
+            except Exception as e:
+                print(f"{engine_name:<10} {Path(file_path).name:<32} ❌ {e}")
+                continue
+            print(
+                f"{r['engine']:<10} {r['file']:<32} {r['pages']:>5} {r['median_s']:>9.2f} "
+                f"{r['confidence'] if r['confidence'] is not None else '-':>6} "
+                f"{r['accuracy'] if r['accuracy'] is not None else '-':>9}"
+            )
+    for engine_name in args.engines.split(","):
+        shutdown = getattr(get_ocr_engine(engine_name.strip()), "shutdown", None)
+        if shutdown:
+            shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Test Audit Store Backends
+
+Runs the same lifecycle checks against the in-memory and SQLite stores:
+1. create / get / update round-trip
+2. Atomic CREATED -> PROCESSING -> COMPLETED transitions
+3. Status lookups ordered by created_at
+4. TTL + max-entries eviction (memory) and concurrent claims (SQLite)
+5. Both backends expire an audit a TTL after its last write
+6. manually_complete_audit goes through the lifecycle check
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.models.audit import AuditStatus
+from app.services import audit_service
+from app.services.audit_store import (
+    InMemoryAuditStore,
+    SQLiteAuditStore,
+    InvalidTransitionError,
+)
+
+
+def _record(audit_id, created_at="2026-01-01T10:00:00"):
+    return {"audit_id": audit_id, "status": AuditStatus.CREATED, "created_at": created_at, "result": None}
+
+
+def _check_lifecycle(store):
+    store.create(_record("AUD-1", "2026-01-01T10:00:00"))
+    store.create(_record("AUD-2", "2026-01-01T09:00:00"))
+
+    assert store.get("AUD-1")["status"] == AuditStatus.CREATED
+    assert store.update("AUD-1", bill_s3_key="audits/AUD-1/bill.pdf")
+    assert store.get("AUD-1")["bill_s3_key"] == "audits/AUD-1/bill.pdf"
+    assert not store.update("AUD-MISSING", foo=1)
+
+    assert [r["audit_id"] for r in store.list_by_status(AuditStatus.CREATED)] == ["AUD-2", "AUD-1"]
+
+    assert store.transition("AUD-1", AuditStatus.CREATED, AuditStatus.PROCESSING)
+    assert not store.transition("AUD-1", AuditStatus.CREATED, AuditStatus.PROCESSING)
+    assert store.transition("AUD-1", AuditStatus.PROCESSING, AuditStatus.COMPLETED, result={"ok": True})
+    assert store.get("AUD-1")["result"] == {"ok": True}
+
+    try:
+        store.transition("AUD-2", AuditStatus.CREATED, AuditStatus.COMPLETED)
+        raise AssertionError("Expected InvalidTransitionError")
+    except InvalidTransitionError:
+        pass
+
+    assert store.delete("AUD-2")
+    assert store.get("AUD-2") is None
+
+
+def test_memory_store_lifecycle():
+    _check_lifecycle(InMemoryAuditStore())
+    print("✅ In-memory store lifecycle")
+
+
+def test_sqlite_store_lifecycle():
+    with tempfile.TemporaryDirectory() as tmp:
+        _check_lifecycle(SQLiteAuditStore(str(Path(tmp) / "audits.db")))
+    print("✅ SQLite store lifecycle")
+
+
+def test_memory_store_eviction():
+    store = InMemoryAuditStore(max_entries=2)
+    store.create(_record("AUD-A"))
+    store.create(_record("AUD-B"))
+    store.transition("AUD-A", AuditStatus.CREATED, AuditStatus.PROCESSING)
+    store.create(_record("AUD-C"))
+    # AUD-B is evicted first because AUD-A is still processing
+    assert store.get("AUD-A") is not None
+    assert store.get("AUD-B") is None
+
+    ttl_store = InMemoryAuditStore(ttl_seconds=0.05)
+    ttl_store.create(_record("AUD-T"))
+    time.sleep(0.1)
+    assert ttl_store.get("AUD-T") is None
+    print("✅ In-memory eviction (cap + TTL)")
+
+
+def _check_ttl_from_last_write(store):
+    # created_at is long past; only the last write counts
+    store.create(_record("AUD-TTL"))
+    time.sleep(0.2)
+    assert store.update("AUD-TTL", progress_message="OCR")
+    time.sleep(0.2)
+    assert store.get("AUD-TTL") is not None, "written 0.2 s ago, TTL 0.3 s"
+    assert [r["audit_id"] for r in store.list_by_status(AuditStatus.CREATED)] == ["AUD-TTL"]
+    time.sleep(0.2)
+    assert store.get("AUD-TTL") is None
+    assert store.list_by_status(AuditStatus.CREATED) == []
+    assert not store.update("AUD-TTL", progress_message="late")
+
+
+def test_ttl_from_last_write_both_backends():
+    _check_ttl_from_last_write(InMemoryAuditStore(ttl_seconds=0.3))
+    with tempfile.TemporaryDirectory() as tmp:
+        _check_ttl_from_last_write(SQLiteAuditStore(str(Path(tmp) / "audits.db"), ttl_seconds=0.3))
+    print("✅ Memory and SQLite both expire an audit a TTL after its last write")
+
+
+def test_sqlite_concurrent_claims():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteAuditStore(str(Path(tmp) / "audits.db"))
+        store.create(_record("AUD-RACE"))
+
+        wins = []
+        def claim():
+            if store.transition("AUD-RACE", AuditStatus.CREATED, AuditStatus.PROCESSING):
+                wins.append(threading.current_thread().name)
+
+        threads = [threading.Thread(target=claim) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(wins) == 1
+    print("✅ SQLite transition won by exactly one of 8 threads")
+
+
+def test_manual_completion_checks_lifecycle():
+    store = InMemoryAuditStore()
+    store.create(_record("AUD-1"))
+    with patch.object(audit_service, "audit_store", store):
+        # CREATED (not yet uploaded) cannot jump to COMPLETED
+        assert not audit_service.manually_complete_audit("AUD-1")
+        assert store.get("AUD-1")["status"] == AuditStatus.CREATED
+        assert not audit_service.manually_complete_audit("AUD-MISSING")
+
+        store.transition("AUD-1", AuditStatus.CREATED, AuditStatus.PROCESSING)
+        assert audit_service.manually_complete_audit("AUD-1")
+        assert store.get("AUD-1")["status"] == AuditStatus.COMPLETED
+        assert not audit_service.manually_complete_audit("AUD-1")
+    print("✅ Manual completion only from PROCESSING")
+
+
+if __name__ == "__main__":
+    test_memory_store_lifecycle()
+    test_sqlite_store_lifecycle()
+    test_memory_store_eviction()
+    test_ttl_from_last_write_both_backends()
+    test_sqlite_concurrent_claims()
+    test_manual_completion_checks_lifecycle()
@@ -0,0 +1,197 @@
+"""
+Test Streaming Nova Pro Audit (No Real AWS Required)
+
+Checks that:
+1. The incremental parser emits each line item as soon as its closing
+   brace arrives, whatever the chunking (code fences, nested objects,
+   braces inside strings)
+2. audit_claim_stream hands items over before the stream ends and returns
+   the same audit JSON as audit_claim
+3. A stream that cannot be opened falls back to the non-streaming call
+4. The pipeline publishes partial flags while the audit streams
+5. Partial-flag writes are batched (every N items / T seconds, plus once
+   at the end), not one store write per item
+6. A boto3 without retrieve_and_generate_stream is detected once and the
+   pipeline audits without streaming, instead of failing into the fallback
+"""
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services import audit_service
+from app.services.ai import rag_service
+from app.services.ai.json_stream import JsonItemStream
+from app.services.cache import llm_cache
+from app.services.ocr.ocr_document import OcrDocument, OcrPage
+
+AUDIT = {
+    "audit_summary": {"total_bill_amount": 1700, "amount_requiring_review": 500, "status": "Potential Policy Discrepancies"},
+    "structured_bill": {"items": [
+        {"description": "Gloves", "category": "Consumables", "amount": 500, "status": "May Not Comply",
+         "reference": "IRDAI List I", "reason": "Consumables {gloves} are \"non-payable\""},
+        {"description": "Room Rent", "category": "Room Rent", "amount": "1,200", "status": "Covered",
+         "reference": "Clause 4.1", "reason": "Within limit"},
+    ]},
+}
+AUDIT_TEXT = "```json\n" + json.dumps(AUDIT, indent=2) + "\n```"
+
+
+def _document(text):
+    return OcrDocument(pages=[OcrPage.from_text(1, text, "text_layer")])
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_items_parsed_incrementally():
+    expected = AUDIT["structured_bill"]["items"]
+    for size in (1, 7, 64, len(AUDIT_TEXT)):
+        stream, items = JsonItemStream(), []
+        for chunk in _chunks(AUDIT_TEXT, size):
+            items += stream.feed(chunk)
+        assert items == expected, f"chunk size {size}"
+        assert stream.text == AUDIT_TEXT
+
+    # The first item is out as soon as it is closed, not at the end
+    stream = JsonItemStream()
+    first_end = AUDIT_TEXT.index('"reason": "Within limit"') - 1
+    assert stream.feed(AUDIT_TEXT[:first_end]) == expected[:1]
+    # A bare list of items (model skipped the wrapper) works too
+    assert JsonItemStream().feed(json.dumps(expected)) == expected
+    print("✅ Items parsed as soon as they close, for any chunking")
+
+
+def _streaming_agent(seen):
+    agent = MagicMock()
+
+    def events():
+        for chunk in _chunks(AUDIT_TEXT, 16):
+            seen.append(("chunk", chunk))
+            yield {"output": {"text": chunk}}
+
+    agent.retrieve_and_generate_stream.return_value = {"stream": events(), "sessionId": "s-1"}
+    agent.retrieve_and_generate.return_value = {"output": {"text": AUDIT_TEXT}}
+    return agent
+
+
+def test_audit_claim_stream():
+    seen = []
+    agent = _streaming_agent(seen)
+    with patch.object(rag_service, "agent", agent), patch.object(llm_cache, "_llm_cache", None):
+        result = rag_service.audit_claim_stream({"items": []}, {}, lambda item: seen.append(("item", item["description"])))
+        assert result == rag_service.audit_claim({"items": []}, {})
+
+    item_positions = [i for i, (kind, _) in enumerate(seen) if kind == "item"]
+    assert [seen[i][1] for i in item_positions] == ["Gloves", "Room Rent"]
+    streamed_before_first = sum(len(text) for kind, text in seen[:item_positions[0]] if kind == "chunk")
+    assert streamed_before_first < AUDIT_TEXT.index('"description": "Room Rent"'), "first item must arrive mid-stream"
+
+    # Streaming not available (e.g. IAM) -> plain call
+    agent.retrieve_and_generate_stream.side_effect = RuntimeError("AccessDenied")
+    with patch.object(rag_service, "agent", agent), patch.object(llm_cache, "_llm_cache", None):
+        items = []
+        assert rag_service.audit_claim_stream({"items": []}, {}, items.append) == result
+        assert items == []
+    print("✅ audit_claim_stream: items mid-stream, same result as audit_claim, falls back when stream fails")
+
+
+def _run_pipeline(fake_stream, bill_struct):
+    audit_id = audit_service.start_audit()["audit_id"]
+    extraction = {"policy": {"policy_id": "P-1"}, "header": {}}
+    with patch.object(audit_service, "extract_text_from_document", return_value="x" * 100), \
+         patch.object(audit_service, "extract_bill_document", return_value=(_document("x" * 100), [])), \
+         patch.object(audit_service, "structure_bill", return_value=bill_struct), \
+         patch.object(audit_service, "extract_claim_data", return_value=extraction), \
+         patch.object(audit_service, "audit_claim_stream", side_effect=lambda *args: fake_stream(audit_id, *args)), \
+         patch.object(audit_service, "audit_streaming_supported", return_value=True), \
+         patch.object(audit_service, "write_dispute_letter", return_value="LETTER"), \
+         patch.object(audit_service, "_cleanup_audit_files"):
+        return audit_id, audit_service.process_audit_pipeline(audit_id, None, None, "b", "p", "1" * 64, "2" * 64)
+
+
+def test_pipeline_publishes_partial_flags():
+    snapshots = []
+
+    def fake_stream(audit_id, bill_struct, policy, on_item):
+        for item in AUDIT["structured_bill"]["items"]:
+            on_item(item)
+            snapshots.append(audit_service.audit_store.get(audit_id).get("partial_flags"))
+        return AUDIT
+
+    bill_struct = {"items": [{"description": "Gloves", "amount": 500, "quantity": 10, "unit_price": 50}]}
+    with patch.object(audit_service.settings, "audit_partial_flush_items", 1):
+        audit_id, result = _run_pipeline(fake_stream, bill_struct)
+
+    # Gloves is flagged as soon as it is parsed; Room Rent (covered) adds none
+    assert [[f["charge_description"] for f in flags] for flags in snapshots] == [["Gloves"], ["Gloves"]]
+    assert snapshots[0][0]["line_item_id"] == result.flags[0].line_item_id == "LI-001"
+    assert result.flags[0].reason == snapshots[0][0]["reason"]
+    assert audit_service.get_audit_status(audit_id)["partial_flags"] == snapshots[-1]
+    assert result.bill.charges[0].quantity == 10
+    print("✅ Pipeline publishes partial flags matching the final flags")
+
+
+def test_partial_flag_writes_batched():
+    items = [{"description": f"Syringe {i}", "category": "Consumables", "amount": 10, "status": "May Not Comply",
+              "reference": "IRDAI List I", "reason": "Consumable"} for i in range(25)]
+    audit = {"audit_summary": AUDIT["audit_summary"], "structured_bill": {"items": items}}
+    writes = []
+
+    def fake_stream(audit_id, bill_struct, policy, on_item):
+        for item in items:
+            on_item(item)
+        return audit
+
+    real_update = audit_service.audit_store.update
+
+    def counting_update(audit_id, **fields):
+        if "partial_flags" in fields:
+            writes.append(len(fields["partial_flags"]))
+        return real_update(audit_id, **fields)
+
+    with patch.object(audit_service.settings, "audit_partial_flush_items", 10), \
+         patch.object(audit_service.settings, "audit_partial_flush_seconds", 60), \
+         patch.object(audit_service.audit_store, "update", side_effect=counting_update):
+        audit_id, _ = _run_pipeline(fake_stream, {"items": [{"description": "Syringe 0", "amount": 10}]})
+
+    # Reset, after items 10 and 20, then the last 5 when the stream ends
+    assert writes == [0, 10, 20, 25], writes
+    assert len(audit_service.get_audit_status(audit_id)["partial_flags"]) == 25
+    print(f"✅ 25 streamed items -> {len(writes)} partial-flag writes")
+
+
+def test_old_boto3_skips_streaming():
+    old_client = MagicMock(spec=["retrieve_and_generate"])
+    with patch.object(rag_service, "agent", old_client), patch.object(rag_service, "_streaming_supported", None):
+        assert not rag_service.audit_streaming_supported()
+        # Checked once, not per audit
+        assert not rag_service.audit_streaming_supported()
+
+    audit_id = audit_service.start_audit()["audit_id"]
+    with patch.object(audit_service, "extract_text_from_document", return_value="x" * 100), \
+         patch.object(audit_service, "extract_bill_document", return_value=(_document("x" * 100), [])), \
+         patch.object(audit_service, "structure_bill", return_value={"items": []}), \
+         patch.object(audit_service, "extract_claim_data", return_value={"policy": {"policy_id": "P-1"}, "header": {}}), \
+         patch.object(audit_service, "audit_streaming_supported", return_value=False), \
+         patch.object(audit_service, "audit_claim", return_value=AUDIT) as audit_claim, \
+         patch.object(audit_service, "audit_claim_stream") as audit_claim_stream, \
+         patch.object(audit_service, "write_dispute_letter", return_value="LETTER"), \
+         patch.object(audit_service, "_cleanup_audit_files"):
+        audit_service.process_audit_pipeline(audit_id, None, None, "b", "p", "1" * 64, "2" * 64)
+
+    audit_claim.assert_called_once()
+    audit_claim_stream.assert_not_called()
+    print("✅ boto3 without streaming: detected once, audit runs unstreamed")
+
+
+if __name__ == "__main__":
+    test_items_parsed_incrementally()
+    test_audit_claim_stream()
+    test_pipeline_publishes_partial_flags()
+    test_partial_flag_writes_batched()
+    test_old_boto3_skips_streaming()
@@ -0,0 +1,65 @@
+"""
+Test Shared boto3 Clients (No Real AWS Required)
+
+Checks that:
+1. Clients carry pool size, retry mode, timeouts and keep-alive from settings
+2. One client per service/region is shared, even when many threads ask at once
+3. Service modules' LazyClient attributes resolve to the shared client
+"""
+
+import os
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.services import aws_clients, aws_service
+from app.services.ai import structuring_service
+from app.services.reporting import letter_generator
+
+
+def test_client_config_from_settings():
+    aws_clients.reset_clients()
+    with patch.object(settings, "aws_max_pool_connections", 64), \
+         patch.object(settings, "aws_retry_mode", "adaptive"), \
+         patch.object(settings, "aws_read_timeout_seconds", 30.0):
+        config = aws_clients.get_client("textract", "us-east-1").meta.config
+
+    assert config.max_pool_connections == 64
+    assert config.retries["mode"] == "adaptive"
+    assert config.connect_timeout == settings.aws_connect_timeout_seconds
+    assert config.read_timeout == 30.0
+    assert config.tcp_keepalive is True
+    assert aws_clients.client_config("bedrock-runtime").read_timeout == settings.bedrock_read_timeout_seconds
+    aws_clients.reset_clients()
+    print("✅ Client config: pool size, adaptive retries, timeouts, keep-alive")
+
+
+def test_one_shared_client_across_threads():
+    aws_clients.reset_clients()
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        clients = list(executor.map(lambda _: aws_clients.get_client("s3", "us-east-1"), range(64)))
+    assert len({id(client) for client in clients}) == 1
+    print("✅ 64 concurrent lookups -> one shared S3 client")
+
+
+def test_service_modules_share_clients():
+    aws_clients.reset_clients()
+    region = os.getenv("AWS_REGION", "us-east-1")
+    assert aws_service.s3.meta.service_model.service_name == "s3"
+    assert aws_service.s3.meta.config is aws_clients.get_client("s3", region).meta.config
+    # Both Bedrock runtime users get the same pooled client
+    assert structuring_service.bedrock.meta.config is letter_generator.bedrock.meta.config
+    print("✅ Service modules resolve to shared pooled clients")
+
+
+if __name__ == "__main__":
+    test_client_config_from_settings()
+    test_one_shared_client_across_threads()
+    test_service_modules_share_clients()
@@ -11,12 +11,11 @@ os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
 os.environ['AWS_REGION'] = 'us-east-1'
 os.environ['S3_BUCKET_NAME'] = 'bima-bot-hackathon-2026'
 
-from moto import mock_s3, mock_textract
+from moto import mock_aws  # moto 5+, see requirements-dev.txt
 import boto3
 from pathlib import Path
 
-@mock_s3
-@mock_textract
+@mock_aws
 def test_aws_integration():
     """Test S3 and Textract integration with mock services"""
     
@@ -91,5 +90,5 @@ if __name__ == "__main__":
         test_aws_integration()
     except ImportError:
         print("❌ moto not installed")
-        print("\nInstall with: pip install moto[s3,textract]")
+        print("\nInstall with: pip install -r requirements-dev.txt")
         print("Then run this script again.")
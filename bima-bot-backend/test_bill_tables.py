@@ -0,0 +1,201 @@
+"""
+Test Bill Line Items from Textract Tables (No Real AWS Required)
+
+Checks that:
+1. TABLE/CELL/WORD blocks become cell grids
+2. Header columns (Particulars / Qty / Rate / Amount) map to line items
+   with quantity and unit price; totals and repeated headers are skipped
+3. Only rows the parser cannot resolve are sent to Nova Lite
+4. Without a line-item table the whole text is structured as before
+5. Single-page bills are analysed synchronously from local bytes, and
+   the routing decision is counted like text detection's
+6. A scanned bill gets text and tables from one AnalyzeDocument call (no
+   DetectDocumentText); a born-digital bill makes no Textract call; in a
+   mixed bill only the scanned page is analysed, under its own page number
+7. Free-form quantities / unit prices from the audit LLM are coerced or
+   dropped, never failing LineItem validation
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from PIL import Image
+from reportlab.pdfgen import canvas
+
+from app.services import audit_service
+from app.services import metrics
+from app.services import aws_service
+from app.services.ocr import ocr_service
+from app.models.bill import LineItem
+from app.services.ocr.ocr_document import OcrTable, tables_from_textract_blocks
+from app.services.ingestion.bill_table_parser import line_items_from_tables, parse_amount, detect_columns
+
+
+def _table_blocks(rows, page=1):
+    blocks, cell_ids = [], []
+    for r, row in enumerate(rows, start=1):
+        for c, text in enumerate(row, start=1):
+            cell_id = f"cell-{page}-{r}-{c}"
+            word_ids = []
+            for w, word in enumerate(text.split()):
+                word_ids.append(f"{cell_id}-w{w}")
+                blocks.append({"Id": word_ids[-1], "BlockType": "WORD", "Text": word, "Page": page})
+            cell = {"Id": cell_id, "BlockType": "CELL", "RowIndex": r, "ColumnIndex": c, "Page": page}
+            if word_ids:
+                cell["Relationships"] = [{"Type": "CHILD", "Ids": word_ids}]
+            blocks.append(cell)
+            cell_ids.append(cell_id)
+    blocks.append({"Id": f"table-{page}", "BlockType": "TABLE", "Page": page, "Confidence": 99.1,
+                   "Relationships": [{"Type": "CHILD", "Ids": cell_ids}]})
+    return blocks
+
+
+BILL_ROWS = [
+    ["Sr. No.", "Particulars", "Qty", "Rate (Rs.)", "Amount (Rs.)"],
+    ["1", "Room Rent - Twin Sharing", "3", "4,000.00", "12,000.00"],
+    ["2", "Consultation Dr. Mehta", "2", "1,000", "2,000"],
+    ["3", "CBC Blood Test", "", "", "₹450"],
+    ["4", "Bio-Medical Waste Handling", "1", "300", "300"],
+    ["", "Sub Total", "", "", "14,750.00"],
+]
+
+
+def test_blocks_to_grid_and_amounts():
+    tables = tables_from_textract_blocks(_table_blocks(BILL_ROWS))
+    assert len(tables) == 1
+    assert tables[0].rows[1][1] == "Room Rent - Twin Sharing"
+    assert tables[0].confidence == 99.1
+    assert OcrTable.from_dict(tables[0].to_dict()) == tables[0]
+
+    assert parse_amount("₹1,23,456.50") == 123456.5
+    assert parse_amount("Rs. 500/-") == 500
+    assert parse_amount("(200)") == -200
+    assert parse_amount("N/A") is None
+    assert detect_columns(["Particulars", "Qty", "Unit Price", "Gross Amount", "Net Amount"]) == \
+        {"description": 0, "quantity": 1, "unit_price": 2, "amount": 4}
+    print("✅ Table blocks -> grid; amounts and headers parsed")
+
+
+def test_table_rows_become_line_items():
+    continuation = [BILL_ROWS[0], ["5", "Inj Ceftriaxone 1g", "4", "250", "1,000"]]
+    tables = [OcrTable(1, BILL_ROWS), OcrTable(2, continuation), OcrTable(1, [["Patient", "Ravi"], ["UHID", "123"]])]
+
+    result = line_items_from_tables(tables)
+
+    assert result.tables_used == 2
+    by_name = {item["description"]: item for item in result.items}
+    room = by_name["Room Rent - Twin Sharing"]
+    assert (room["category"], room["quantity"], room["unit_price"], room["amount"]) == ("Room Rent", 3, 4000.0, 12000.0)
+    assert by_name["Consultation Dr. Mehta"]["category"] == "Doctor Fees"
+    assert by_name["CBC Blood Test"]["quantity"] is None
+    assert by_name["Inj Ceftriaxone 1g"]["category"] == "Pharmacy"
+    assert "Sub Total" not in by_name
+    # No category keyword -> left for the LLM, with its column names
+    assert result.unresolved_rows == ["Sr. No.: 4 | Particulars: Bio-Medical Waste Handling | Qty: 1 | Rate (Rs.): 300 | Amount (Rs.): 300"]
+    print(f"✅ {len(result.items)} items read from tables, {len(result.unresolved_rows)} unresolved")
+
+
+def test_llm_only_sees_unresolved_rows():
+    llm_items = {"items": [{"description": "Bio-Medical Waste Handling", "amount": 300, "category": "Admin"}]}
+    with patch.object(audit_service, "structure_and_categorize", return_value=llm_items) as llm:
+        bill = audit_service.structure_bill("full bill text", [OcrTable(1, BILL_ROWS)])
+
+    assert llm.call_count == 1
+    prompt_text = llm.call_args.args[0]
+    assert "Bio-Medical Waste" in prompt_text and "Room Rent" not in prompt_text
+    assert len(bill["items"]) == 4
+    assert bill["items"][-1]["source"] == "llm"
+
+    with patch.object(audit_service, "structure_and_categorize", return_value={"items": []}) as llm:
+        audit_service.structure_bill("full bill text", [])
+    assert llm.call_args.args[0] == "full bill text"
+    print("✅ Nova Lite called for unresolved rows only; no table -> whole text")
+
+
+def test_single_page_bill_analysed_from_local_bytes():
+    metrics.reset()
+    fake_textract = MagicMock()
+    fake_textract.analyze_document.return_value = {"Blocks": _table_blocks(BILL_ROWS)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bill = Path(tmp) / "bill.pdf"
+        Image.new("RGB", (425, 550), "white").save(bill, "PDF")
+        with patch.object(ocr_service, "_ocr_cache", None), \
+             patch.object(aws_service, "textract", fake_textract):
+            tables = ocr_service.extract_tables(str(bill), "audits/AUD-1/bill.pdf")
+
+    kwargs = fake_textract.analyze_document.call_args.kwargs
+    assert kwargs["FeatureTypes"] == ["TABLES"]
+    assert "Bytes" in kwargs["Document"]
+    assert tables[0].rows == BILL_ROWS
+    assert metrics.get_counter("ocr_textract_route_total", {"api": "sync", "reason": "single_page"}) == 1
+    print("✅ Single-page bill: sync AnalyzeDocument (TABLES) on local bytes, route counted")
+
+
+def test_bill_document_from_one_textract_call():
+    fake_textract = MagicMock()
+    lines = [{"Id": f"line-{i}", "BlockType": "LINE", "Text": " ".join(row), "Page": 1, "Confidence": 98.0}
+             for i, row in enumerate(BILL_ROWS)]
+    fake_textract.analyze_document.return_value = {"Blocks": lines + _table_blocks(BILL_ROWS)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scan, digital, mixed = Path(tmp) / "scan.pdf", Path(tmp) / "bill.pdf", Path(tmp) / "mixed.pdf"
+        Image.new("RGB", (425, 550), "white").save(scan, "PDF")
+        for path, blank_pages in ((digital, 0), (mixed, 1)):
+            c = canvas.Canvas(str(path))
+            for i, row in enumerate(BILL_ROWS):
+                c.drawString(72, 750 - i * 20, "   ".join(row))
+            for _ in range(blank_pages):
+                c.showPage()
+                c.rect(72, 72, 100, 100)
+            c.save()
+
+        with patch.object(ocr_service, "_ocr_cache", None), \
+             patch.object(aws_service, "textract", fake_textract):
+            document, tables = ocr_service.extract_bill_document(str(scan), "audits/AUD-1/bill.pdf")
+            assert fake_textract.analyze_document.call_count == 1
+            assert not fake_textract.detect_document_text.called
+            assert "Room Rent - Twin Sharing" in document.text and document.pages[0].source == "textract"
+            assert tables[0].rows == BILL_ROWS
+
+            fake_textract.reset_mock()
+            document, tables = ocr_service.extract_bill_document(str(digital), "audits/AUD-2/bill.pdf")
+            assert not fake_textract.method_calls, "born-digital bill must not call Textract"
+            assert "Room Rent - Twin Sharing" in document.text and tables == []
+
+            # Digital page 1 + scanned page 2: only page 2 goes to Textract
+            document, tables = ocr_service.extract_bill_document(str(mixed), "audits/AUD-3/bill.pdf")
+            assert fake_textract.analyze_document.call_count == 1
+            assert "Bytes" in fake_textract.analyze_document.call_args.kwargs["Document"]
+            assert [p.source for p in document.pages] == ["text_layer", "textract"]
+            assert [t.page_number for t in tables] == [2] and tables[0].rows == BILL_ROWS
+    print("✅ Scanned bill: one AnalyzeDocument; born-digital: no Textract; mixed: scanned page only")
+
+
+def test_audit_item_quantity_coerced():
+    structured = audit_service._structured_items({"items": [{"description": "Gloves", "quantity": 10, "unit_price": 50.0}]})
+    cases = [
+        ({"quantity": "2 Nos", "unit_price": "Rs. 1,200"}, 2, 1200.0),
+        ({"quantity": 1.5, "unit_price": "N/A"}, None, None),
+        ({"quantity": "3.0"}, 3, None),
+        ({"description": "Gloves", "quantity": "ten"}, 10, 50.0),     # falls back to the table parser's value
+    ]
+    for item, quantity, unit_price in cases:
+        item = {"description": "Syringe", "amount": 100, "category": "Pharmacy", **item}
+        charge, _ = audit_service.map_audit_item(0, item, structured)
+        assert (charge["quantity"], charge["unit_price"]) == (quantity, unit_price), item
+        LineItem(**charge)
+    print("✅ Audit item quantities coerced (\"2 Nos\" -> 2) or dropped (1.5), LineItem always valid")
+
+
+if __name__ == "__main__":
+    test_blocks_to_grid_and_amounts()
+    test_table_rows_become_line_items()
+    test_llm_only_sees_unresolved_rows()
+    test_single_page_bill_analysed_from_local_bytes()
+    test_bill_document_from_one_textract_call()
+    test_audit_item_quantity_coerced()
@@ -0,0 +1,258 @@
+"""
+Test Combined Nova Lite Extraction (No Real AWS Required)
+
+Checks that:
+1. Policy limits and header metadata come back from ONE call, validated
+   against the schema ("5,00,000" -> 500000.0); the prompt never asks
+   for bill items
+2. A cached policy is not re-parsed: only its header excerpt is sent,
+   and the template no longer shows a "policy" object
+3. Bill items the model returns anyway are ignored, not a validation error
+4. An invalid combined response falls back to the two split calls
+5. The combined prompt's policy is cached under its own key: split-mode
+   parse_policy_limits never gets it, and a combined prompt version bump
+   re-parses; a parse_policy_limits result is reused by both
+6. In the pipeline the bill is structured while the policy OCR is still
+   running; the combined call covers policy limits + header only
+7. combined_extraction_include_bill: bill items, policy and header in ONE
+   call; the bill is sent once (whole text, or header + unresolved table
+   rows); a response without the requested items falls back to all three
+   split calls; the pipeline makes no separate bill-structuring call
+"""
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services import audit_service
+from app.services.ai import structuring_service
+from app.services.cache import DiskCache, llm_cache
+from app.services.ocr.ocr_document import OcrDocument, OcrPage, OcrTable
+
+BILL_TEXT = "CITY HOSPITAL\nInvoice No: INV-77  Date: 01/02/2026\nPatient: Ravi Kumar\nGloves Rs. 500\nRoom Rent Rs. 1,200"
+POLICY_TEXT = "Policy No: P-12345\nInsurer: Health Insurer Ltd\nSum Insured: 500000\n" + "Clause text. " * 1000
+
+COMBINED = {
+    "policy": {"policy_id": "P-12345", "insurer_name": "Health Insurer Ltd", "coverage_amount": "5,00,000", "ped_list": []},
+    "header": {"patient_name": "Ravi Kumar", "policy_number": "P-12345", "bill_number": "INV-77", "bill_date": None},
+}
+
+
+def _converse_response(payload):
+    text = payload if isinstance(payload, str) else json.dumps(payload)
+    return {"output": {"message": {"content": [{"text": text}]}}}
+
+
+def _prompt(bedrock, call=-1):
+    return bedrock.converse.call_args_list[call].kwargs["messages"][0]["content"][0]["text"]
+
+
+def test_one_call_for_policy_and_header():
+    bedrock = MagicMock()
+    bedrock.converse.return_value = _converse_response(COMBINED)
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch.object(structuring_service, "_policy_cache", DiskCache(tmp, 10_000_000)), \
+         patch.object(structuring_service, "bedrock", bedrock), \
+         patch.object(llm_cache, "_llm_cache", None):
+        result = audit_service.extract_claim_data(BILL_TEXT, POLICY_TEXT)
+
+        assert bedrock.converse.call_count == 1
+        assert set(result) == {"policy", "header"}
+        assert result["policy"]["coverage_amount"] == 500000.0
+        assert result["header"] == {"patient_name": "Ravi Kumar", "policy_number": "P-12345", "bill_number": "INV-77"}
+        prompt = _prompt(bedrock)
+        assert "POLICY TEXT:" in prompt and '"policy":' in prompt
+        assert "bill_items" not in prompt
+
+        # Second audit under the same policy: policy limits come from the cache
+        audit_service.extract_claim_data(BILL_TEXT, POLICY_TEXT)
+        prompt = _prompt(bedrock)
+        assert "POLICY HEADER:" in prompt and "POLICY TEXT:" not in prompt
+        assert "'policy':" not in prompt and '"policy":' not in prompt
+        assert len(prompt) < len(_prompt(bedrock, 0))
+    print("✅ One Nova Lite call for policy + header; cached policy sends header excerpt only")
+
+
+def test_unrequested_bill_items_ignored():
+    bedrock = MagicMock()
+    bedrock.converse.return_value = _converse_response(
+        {**COMBINED, "bill_items": [{"description": "Room", "amount": None}]}
+    )
+    with patch.object(structuring_service, "_policy_cache", None), \
+         patch.object(structuring_service, "bedrock", bedrock), \
+         patch.object(llm_cache, "_llm_cache", None), \
+         patch.object(audit_service, "parse_policy_limits") as policy:
+        result = audit_service.extract_claim_data(BILL_TEXT, POLICY_TEXT)
+
+    assert bedrock.converse.call_count == 1 and policy.call_count == 0
+    assert set(result) == {"policy", "header"}
+    print("✅ Bill items returned anyway are ignored (no fallback)")
+
+
+def test_combined_policy_cached_separately():
+    bedrock = MagicMock()
+    bedrock.converse.return_value = _converse_response(COMBINED)
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch.object(structuring_service, "_policy_cache", DiskCache(tmp, 10_000_000)), \
+         patch.object(structuring_service, "bedrock", bedrock), \
+         patch.object(llm_cache, "_llm_cache", None):
+        structuring_service.extract_combined(BILL_TEXT, POLICY_TEXT)
+
+        # Split mode parses with its own prompt instead of reusing the combined result
+        bedrock.converse.return_value = _converse_response({"policy_id": "P-12345", "coverage_amount": 500000})
+        structuring_service.parse_policy_limits(POLICY_TEXT)
+        assert bedrock.converse.call_count == 2
+        assert "POLICY TEXT:" not in _prompt(bedrock)
+
+        # Combined prompt changed: its cached entries are not reused...
+        bedrock.converse.return_value = _converse_response(COMBINED)
+        with patch.object(structuring_service, "COMBINED_PROMPT_VERSION", structuring_service.COMBINED_PROMPT_VERSION + 1), \
+             patch.object(structuring_service, "POLICY_PROMPT_VERSION", structuring_service.POLICY_PROMPT_VERSION + 1):
+            structuring_service.extract_combined(BILL_TEXT, POLICY_TEXT)
+        assert "POLICY TEXT:" in _prompt(bedrock)
+        # ...but a parse_policy_limits result is
+        structuring_service.extract_combined(BILL_TEXT, POLICY_TEXT)
+        assert "POLICY HEADER:" in _prompt(bedrock)
+    print("✅ Combined-prompt policies cached under their own key and prompt version")
+
+
+def test_invalid_response_falls_back_to_split_calls():
+    bedrock = MagicMock()
+    bedrock.converse.return_value = _converse_response('{"header": "not an object"}')
+    with patch.object(structuring_service, "_policy_cache", None), \
+         patch.object(structuring_service, "bedrock", bedrock), \
+         patch.object(llm_cache, "_llm_cache", None), \
+         patch.object(audit_service, "parse_policy_limits", return_value={"policy_id": "P-12345"}) as policy, \
+         patch.object(audit_service, "extract_header_details", return_value={"bill_number": "INV-77"}) as header:
+        result = audit_service.extract_claim_data(BILL_TEXT, POLICY_TEXT)
+
+    assert policy.call_count == header.call_count == 1
+    assert result == {"policy": {"policy_id": "P-12345"}, "header": {"bill_number": "INV-77"}}
+    print("✅ Invalid combined response -> split calls")
+
+
+def test_pipeline_structures_bill_during_policy_ocr():
+    events = []
+
+    def slow_policy_ocr(*args, **kwargs):
+        time.sleep(0.4)
+        events.append("policy_ocr_done")
+        return POLICY_TEXT
+
+    def structure(bill_text, bill_tables):
+        events.append("bill_structured")
+        return {"items": [{"description": "Gloves", "amount": 500, "category": "Consumables"}]}
+
+    bill_document = OcrDocument(pages=[OcrPage.from_text(1, BILL_TEXT, "text_layer")])
+    audit_json = {"audit_summary": {"total_bill_amount": 500, "amount_requiring_review": 0}, "structured_bill": {"items": []}}
+    audit_id = audit_service.start_audit()["audit_id"]
+    with patch.object(audit_service.settings, "combined_extraction_enabled", True), \
+         patch.object(audit_service, "extract_text_from_document", side_effect=slow_policy_ocr), \
+         patch.object(audit_service, "extract_bill_document", return_value=(bill_document, [])), \
+         patch.object(audit_service, "structure_bill", side_effect=structure), \
+         patch.object(audit_service, "extract_claim_data",
+                      return_value={"policy": {"policy_id": "P-12345"}, "header": {}}) as extract, \
+         patch.object(audit_service, "audit_claim_stream", return_value=audit_json), \
+         patch.object(audit_service, "audit_claim", return_value=audit_json), \
+         patch.object(audit_service, "write_dispute_letter", return_value="LETTER"), \
+         patch.object(audit_service, "_cleanup_audit_files"):
+        audit_service.process_audit_pipeline(audit_id, None, None, "b", "p", "1" * 64, "2" * 64)
+
+    assert events == ["bill_structured", "policy_ocr_done"]
+    assert extract.call_count == 1
+    print("✅ Bill structured during policy OCR; combined call covers policy + header")
+
+
+BILL_ROWS = [
+    ["Sr. No.", "Particulars", "Qty", "Rate (Rs.)", "Amount (Rs.)"],
+    ["1", "Room Rent - Twin Sharing", "3", "4,000.00", "12,000.00"],
+    ["2", "Bio-Medical Waste Handling", "1", "300", "300"],
+]
+
+
+def test_one_call_for_bill_policy_and_header():
+    bedrock = MagicMock()
+    bedrock.converse.return_value = _converse_response({
+        **COMBINED,
+        "bill_items": [{"description": "Gloves", "amount": "Rs. 500", "category": "Consumables"},
+                       {"description": "Room Rent", "amount": "1,200", "category": "Room Rent"}],
+    })
+    with patch.object(structuring_service, "_policy_cache", None), \
+         patch.object(structuring_service, "bedrock", bedrock), \
+         patch.object(llm_cache, "_llm_cache", None):
+        result = audit_service.extract_claim_data(BILL_TEXT, POLICY_TEXT, [], include_bill=True)
+
+        assert bedrock.converse.call_count == 1
+        assert set(result) == {"policy", "header", "bill_struct"}
+        assert [item["amount"] for item in result["bill_struct"]["items"]] == [500.0, 1200.0]
+        prompt = _prompt(bedrock)
+        # The whole bill is sent once, for items and header alike
+        assert prompt.count("Invoice No: INV-77") == 1
+        assert "BILL TEXT:" in prompt and "BILL HEADER:" not in prompt and '"bill_items":' in prompt
+
+        # With a line-item table, only the rows the parser could not resolve are itemised
+        bedrock.converse.return_value = _converse_response({
+            **COMBINED, "bill_items": [{"description": "Bio-Medical Waste Handling", "amount": 300, "category": "Admin"}]
+        })
+        result = audit_service.extract_claim_data(BILL_TEXT, POLICY_TEXT, [OcrTable(1, BILL_ROWS)], include_bill=True)
+        assert bedrock.converse.call_count == 2
+        rows = _prompt(bedrock).split("BILL ROWS TO ITEMISE:")[1].split("POLICY TEXT:")[0]
+        assert "Bio-Medical Waste" in rows and "Room Rent" not in rows
+        assert [item.get("source") for item in result["bill_struct"]["items"]] == ["table", "llm"]
+    print("✅ include_bill: one Nova Lite call for bill items + policy + header, bill sent once")
+
+
+def test_missing_bill_items_fall_back_to_three_split_calls():
+    bedrock = MagicMock()
+    bedrock.converse.return_value = _converse_response(COMBINED)
+    with patch.object(structuring_service, "_policy_cache", None), \
+         patch.object(structuring_service, "bedrock", bedrock), \
+         patch.object(llm_cache, "_llm_cache", None), \
+         patch.object(audit_service, "structure_and_categorize", return_value={"items": []}) as bill, \
+         patch.object(audit_service, "parse_policy_limits", return_value={"policy_id": "P-12345"}) as policy, \
+         patch.object(audit_service, "extract_header_details", return_value={}) as header:
+        result = audit_service.extract_claim_data(BILL_TEXT, POLICY_TEXT, [], include_bill=True)
+
+    assert bill.call_count == policy.call_count == header.call_count == 1
+    assert result["bill_struct"] == {"items": []}
+    print("✅ include_bill: response without bill items -> three split calls")
+
+
+def test_pipeline_single_call_mode():
+    bill_document = OcrDocument(pages=[OcrPage.from_text(1, BILL_TEXT, "text_layer")])
+    audit_json = {"audit_summary": {"total_bill_amount": 500, "amount_requiring_review": 0}, "structured_bill": {"items": []}}
+    extraction = {"policy": {"policy_id": "P-12345"}, "header": {},
+                  "bill_struct": {"items": [{"description": "Gloves", "amount": 500, "category": "Consumables"}]}}
+    audit_id = audit_service.start_audit()["audit_id"]
+    with patch.object(audit_service.settings, "combined_extraction_enabled", True), \
+         patch.object(audit_service.settings, "combined_extraction_include_bill", True), \
+         patch.object(audit_service, "extract_text_from_document", return_value=POLICY_TEXT), \
+         patch.object(audit_service, "extract_bill_document", return_value=(bill_document, [])), \
+         patch.object(audit_service, "structure_bill") as structure, \
+         patch.object(audit_service, "extract_claim_data", return_value=extraction) as extract, \
+         patch.object(audit_service, "audit_claim_stream", return_value=audit_json), \
+         patch.object(audit_service, "audit_claim", return_value=audit_json), \
+         patch.object(audit_service, "write_dispute_letter", return_value="LETTER"), \
+         patch.object(audit_service, "_cleanup_audit_files"):
+        result = audit_service.process_audit_pipeline(audit_id, None, None, "b", "p", "1" * 64, "2" * 64)
+
+    assert result.status != audit_service.AuditStatus.FAILED, result.flags
+    assert extract.call_count == 1 and extract.call_args.kwargs == {"include_bill": True}
+    assert structure.call_count == 0
+    print("✅ Pipeline (include_bill): one extraction call, no separate bill structuring")
+
+
+if __name__ == "__main__":
+    test_one_call_for_policy_and_header()
+    test_unrequested_bill_items_ignored()
+    test_combined_policy_cached_separately()
+    test_invalid_response_falls_back_to_split_calls()
+    test_pipeline_structures_bill_during_policy_ocr()
+    test_one_call_for_bill_policy_and_header()
+    test_missing_bill_items_fall_back_to_three_split_calls()
+    test_pipeline_single_call_mode()
@@ -0,0 +1,131 @@
+"""
+Test Photographed-Bill Normalization (No Real AWS Required)
+
+Checks that:
+1. A sideways 12 MP photo is EXIF-rotated, cropped to the paper,
+   downscaled and re-encoded much smaller
+2. A flat scan with a dark header band is not cropped
+3. /upload stores the normalized image in S3 as bill.jpg and reports
+   before/after sizes (disk and s3_stream modes); s3_stream leaves no
+   local upload dir behind
+"""
+
+import os
+os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+os.environ['AWS_REGION'] = 'us-east-1'
+
+import sys
+import hashlib
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import boto3
+from moto import mock_aws
+from PIL import Image, ImageDraw
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.api.routes import audit as audit_routes
+from app.services import aws_service
+from app.services.audit_service import audit_store
+from app.services.image_normalization import normalize_image_file, find_document_bbox
+
+BUCKET = "bima-bot-test-bucket"
+
+
+def _paper(width, height):
+    paper = Image.new("RGB", (width, height), (245, 245, 240))
+    draw = ImageDraw.Draw(paper)
+    for y in range(height // 10, height - height // 10, max(8, height // 40)):
+        draw.rectangle((width // 10, y, width - width // 10, y + max(2, height // 200)), fill=(20, 20, 20))
+    return paper
+
+
+def _photo_bytes() -> bytes:
+    """4000x3000 landscape photo of a portrait page on a dark desk, EXIF orientation 6"""
+    # The camera stores the page sideways; orientation 6 = rotate 90° CW to view
+    desk = Image.new("RGB", (4000, 3000), (70, 60, 50))
+    page = _paper(2100, 2700).rotate(90, expand=True)   # stored sideways
+    desk.paste(page, (600, 200))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = BytesIO()
+    desk.save(buffer, "JPEG", quality=95, exif=exif)
+    return buffer.getvalue()
+
+
+def test_photo_is_rotated_cropped_and_shrunk():
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "bill.pdf"           # routes store uploads under bill.pdf
+        src.write_bytes(_photo_bytes())
+
+        result = normalize_image_file(str(src), tmp)
+
+        assert result.exif_rotated and result.cropped and result.reencoded
+        assert result.extension == "jpg" and Path(result.path).name == "bill.jpg"
+        assert not src.exists()
+        width, height = result.normalized_size
+        assert height > width, "page should be upright (portrait)"
+        assert max(width, height) <= settings.image_max_long_edge_px
+        # Roughly the paper only: 2100x2700 (+ small margin)
+        assert 2000 <= width <= 2300 and 2600 <= height <= 2900
+        assert result.normalized_bytes < result.original_bytes / 2
+        print(f"✅ Photo {result.original_bytes // 1024} KB -> {result.normalized_bytes // 1024} KB, {result.normalized_size}")
+
+
+def test_flat_scan_with_dark_header_not_cropped():
+    scan = _paper(1240, 1754)
+    ImageDraw.Draw(scan).rectangle((0, 0, 1240, 200), fill=(30, 40, 90))
+    assert find_document_bbox(scan) is None
+    print("✅ Flat scan with dark header band left uncropped")
+
+
+def _upload(client, audit_id):
+    files = {
+        "bill": ("bill.jpg", _photo_bytes(), "image/jpeg"),
+        "policy": ("policy.pdf", b"%PDF-1.4\n" + b"p" * 2000, "application/pdf"),
+    }
+    return client.post(f"/audit/{audit_id}/upload", files=files)
+
+
+@mock_aws
+def test_upload_route_normalizes_bill_photo():
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket=BUCKET)
+    client = TestClient(app)
+
+    for mode in ("disk", "s3_stream"):
+        with tempfile.TemporaryDirectory() as tmp, \
+             patch.object(aws_service, "s3", s3), \
+             patch.object(aws_service, "BUCKET_NAME", BUCKET), \
+             patch.object(audit_routes, "UPLOAD_DIR", Path(tmp)), \
+             patch.object(settings, "upload_mode", mode):
+            audit_id = client.post("/audit/start").json()["audit_id"]
+            response = _upload(client, audit_id)
+            assert response.status_code == 200, response.text
+            body = response.json()
+
+            summary = body["bill_normalization"]
+            assert summary["normalized_bytes"] < summary["original_bytes"]
+            record = audit_store.get(audit_id)
+            assert record["bill_s3_key"] == f"audits/{audit_id}/bill.jpg"
+            stored = s3.get_object(Bucket=BUCKET, Key=record["bill_s3_key"])["Body"].read()
+            assert hashlib.sha256(stored).hexdigest() == record["bill_sha256"] == body["bill_sha256"]
+            assert len(stored) == summary["normalized_bytes"]
+            # s3_stream keeps no local copy (no upload_local_fallback), and
+            # removes the upload dir it created for normalizing the photo
+            assert (record["bill_path"] is None) == (mode == "s3_stream")
+            assert (Path(tmp) / audit_id).exists() == (mode == "disk")
+        print(f"✅ {mode}: bill photo uploaded as bill.jpg ({summary['original_bytes'] // 1024} KB -> {summary['normalized_bytes'] // 1024} KB)")
+
+
+if __name__ == "__main__":
+    test_photo_is_rotated_cropped_and_shrunk()
+    test_flat_scan_with_dark_header_not_cropped()
+    test_upload_route_normalizes_bill_photo()
@@ -0,0 +1,157 @@
+"""
+Test Bounded Audit Job Queue
+
+Checks backpressure and lifecycle of the in-process worker pool:
+1. Queue positions while jobs wait
+2. QueueFullError once max depth is reached
+3. Unused reservations are released
+4. Shutdown drains queued jobs
+5. Durable SQLite queue: FIFO claims, positions, stale-job recovery,
+   only the claim holder finalizes a job
+6. The worker marks a job failed when its audit failed, done otherwise
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app import worker
+from app.config import settings
+from app.models.audit import AuditStatus
+from app.services import audit_service
+from app.services.job_queue import AuditJobQueue, QueueFullError, QueueClosedError
+from app.services.durable_queue import SQLiteJobQueue
+
+
+def test_queue_backpressure_and_positions():
+    gate = threading.Event()
+    done = []
+
+    def handler(job_id):
+        gate.wait(5)
+        done.append(job_id)
+
+    queue = AuditJobQueue(handler, workers=1, max_depth=2)
+    queue.start()
+
+    queue.submit("JOB-1")
+    # Wait until the single worker has picked up JOB-1
+    for _ in range(100):
+        if queue.position("JOB-1") == 0:
+            break
+        threading.Event().wait(0.01)
+
+    assert queue.submit("JOB-2") == 1
+    assert queue.submit("JOB-3") == 2
+    assert queue.position("JOB-3") == 2
+
+    try:
+        queue.submit("JOB-4")
+        raise AssertionError("Expected QueueFullError")
+    except QueueFullError as e:
+        assert e.retry_after >= 1
+
+    gate.set()
+    abandoned = queue.shutdown(timeout=5)
+    assert abandoned == []
+    assert done == ["JOB-1", "JOB-2", "JOB-3"]
+    print("✅ Positions reported, full queue rejected, shutdown drained all jobs")
+
+
+def test_unused_reservation_is_released():
+    queue = AuditJobQueue(lambda job_id: None, workers=1, max_depth=1)
+
+    try:
+        with queue.reserve():
+            raise RuntimeError("caller bailed out")
+    except RuntimeError:
+        pass
+
+    # The slot is free again
+    with queue.reserve() as slot:
+        slot.submit("JOB-OK")
+
+    queue.shutdown(timeout=5)
+    try:
+        queue.submit("JOB-LATE")
+        raise AssertionError("Expected QueueClosedError")
+    except QueueClosedError:
+        pass
+    print("✅ Unused reservation released; closed queue rejects new jobs")
+
+
+def test_durable_queue_claims_and_recovery():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = SQLiteJobQueue(str(Path(tmp) / "jobs.db"), max_depth=2)
+
+        assert queue.submit("AUD-1") == 1
+        assert queue.submit("AUD-2") == 2
+        try:
+            queue.submit("AUD-3")
+            raise AssertionError("Expected QueueFullError")
+        except QueueFullError:
+            pass
+
+        # A second handle (e.g. another process) sees the same queue
+        worker_side = SQLiteJobQueue(str(Path(tmp) / "jobs.db"), max_depth=2)
+        assert worker_side.claim("w1", visibility_timeout=60, max_attempts=2) == "AUD-1"
+        assert queue.position("AUD-1") == 0
+        assert queue.position("AUD-2") == 1
+
+        # w1 dies: after the visibility timeout AUD-1 is handed out again
+        time.sleep(0.05)
+        assert worker_side.claim("w2", visibility_timeout=0.01, max_attempts=2) == "AUD-1"
+        time.sleep(0.05)
+        assert worker_side.reap_exhausted(visibility_timeout=0.01, max_attempts=2) == ["AUD-1"]
+
+        assert worker_side.claim("w2", visibility_timeout=60, max_attempts=2) == "AUD-2"
+        # Only the worker holding the claim can finish the job
+        assert not worker_side.fail("AUD-2", "w1", "stale worker")
+        assert worker_side.complete("AUD-2", "w2")
+        assert queue.position("AUD-2") is None
+        assert worker_side.claim("w2", visibility_timeout=60, max_attempts=2) is None
+    print("✅ Durable queue: FIFO claims, shared across handles, stale jobs retried then failed")
+
+
+def test_worker_maps_audit_outcome_to_job_status():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = SQLiteJobQueue(str(Path(tmp) / "jobs.db"), max_depth=5)
+        queue.submit("AUD-OK")
+        queue.submit("AUD-BAD")
+        shutdown = threading.Event()
+        outcomes = {"AUD-OK": None, "AUD-BAD": "Policy OCR failed"}
+
+        def run_audit_job(job_id):
+            if job_id == "AUD-BAD":
+                shutdown.set()
+            return outcomes[job_id]
+
+        with patch.object(audit_service, "run_audit_job", side_effect=run_audit_job), \
+             patch.object(settings, "worker_poll_interval_seconds", 0.01):
+            worker._worker_loop(queue, "w1", shutdown)
+
+        rows = dict(
+            (job_id, (status, error))
+            for job_id, status, error in queue._conn().execute("SELECT job_id, status, error FROM jobs")
+        )
+    assert rows == {"AUD-OK": ("done", None), "AUD-BAD": ("failed", "Policy OCR failed")}, rows
+
+    # run_audit_job reports the outcome it recorded in the audit store
+    audit_id = audit_service.start_audit()["audit_id"]
+    audit_service.audit_store.transition(audit_id, AuditStatus.CREATED, AuditStatus.PROCESSING)
+    with patch.object(audit_service, "process_audit_pipeline", side_effect=RuntimeError("Textract throttled")):
+        assert audit_service.run_audit_job(audit_id) == "Textract throttled"
+    assert audit_service.get_audit_status(audit_id)["status"] == AuditStatus.FAILED
+    print("✅ Worker: failed audit -> failed job, completed audit -> done")
+
+
+if __name__ == "__main__":
+    test_queue_backpressure_and_positions()
+    test_unused_reservation_is_released()
+    test_durable_queue_claims_and_recovery()
+    test_worker_maps_audit_outcome_to_job_status()
@@ -0,0 +1,194 @@
+"""
+Test Bedrock LLM Response Cache (No Real AWS Required)
+
+Checks that:
+1. An identical temperature-0 converse call is served from memory, then
+   from disk in a fresh process (new LLMCache on the same directory)
+2. The key covers model, prompt and inference config
+3. Sampled calls (temperature > 0, or no temperature) bypass the cache
+   unless the caller opts in
+4. Entries expire after the TTL; failed calls are not cached
+5. retrieve_and_generate is cached on temperature 0, never with a session;
+   the audit's temperature is settings.audit_temperature (None: model
+   default, not cached)
+6. Hit / miss counters
+7. A response the caller cannot parse is not cached (the next audit asks
+   again), and a stored entry the parser now rejects is evicted
+"""
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.services import metrics
+from app.services.ai import rag_service, structuring_service
+from app.services.cache import LLMCache, cached_converse, cached_retrieve_and_generate, llm_cache
+
+MODEL = "amazon.nova-lite-v1:0"
+
+
+def _request(text="Structure this bill", temperature=0.0):
+    return {
+        "modelId": MODEL,
+        "messages": [{"role": "user", "content": [{"text": text}]}],
+        "inferenceConfig": {"temperature": temperature},
+    }
+
+
+def _client():
+    client = MagicMock()
+    client.converse.side_effect = lambda **request: {
+        "output": {"message": {"content": [{"text": f"reply {client.converse.call_count}"}]}},
+        "ResponseMetadata": {"RequestId": f"req-{client.converse.call_count}"},
+    }
+    return client
+
+
+def test_memory_then_disk_hits():
+    client = _client()
+    with tempfile.TemporaryDirectory() as tmp:
+        with patch.object(llm_cache, "_llm_cache", LLMCache(tmp, 1_000_000, ttl_seconds=3600)):
+            first = cached_converse(client, **_request())
+            second = cached_converse(client, **_request())
+            assert client.converse.call_count == 1
+            assert second["output"] == first["output"]
+            assert "ResponseMetadata" not in second
+            assert llm_cache._llm_cache.counts == {"memory": 1, "disk": 0, "miss": 1}
+
+            # Anything in the key changes -> new call
+            cached_converse(client, **_request(text="Structure this other bill"))
+            cached_converse(client, **{**_request(), "modelId": "amazon.nova-pro-v1:0"})
+            cached_converse(client, **{**_request(), "inferenceConfig": {"temperature": 0.0, "maxTokens": 512}})
+            assert client.converse.call_count == 4
+
+        # Another worker process: same directory, empty memory tier
+        with patch.object(llm_cache, "_llm_cache", LLMCache(tmp, 1_000_000, ttl_seconds=3600)):
+            assert cached_converse(client, **_request())["output"] == first["output"]
+            assert llm_cache._llm_cache.counts["disk"] == 1
+            cached_converse(client, **_request())
+            assert llm_cache._llm_cache.counts["memory"] == 1
+            assert client.converse.call_count == 4
+    print("✅ Identical temperature-0 call served from memory, then from disk; key covers model / prompt / config")
+
+
+def test_sampled_calls_bypass_cache():
+    client = _client()
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch.object(llm_cache, "_llm_cache", LLMCache(tmp, 1_000_000, ttl_seconds=3600)):
+        for _ in range(2):
+            cached_converse(client, **_request(temperature=0.7))
+            cached_converse(client, modelId=MODEL, messages=_request()["messages"])
+        assert client.converse.call_count == 4
+
+        cached_converse(client, cache=True, **_request(temperature=0.7))
+        cached_converse(client, cache=True, **_request(temperature=0.7))
+        cached_converse(client, cache=False, **_request())
+        cached_converse(client, cache=False, **_request())
+        assert client.converse.call_count == 7
+    print("✅ Sampled calls bypass the cache unless opted in; cache=False forces a call")
+
+
+def test_ttl_and_failures():
+    client = _client()
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch.object(llm_cache, "_llm_cache", LLMCache(tmp, 1_000_000, ttl_seconds=0.2)):
+        cached_converse(client, **_request())
+        time.sleep(0.3)
+        cached_converse(client, **_request())
+        assert client.converse.call_count == 2, "expired entry must not be served"
+
+        failing = MagicMock()
+        failing.converse.side_effect = [RuntimeError("throttled"), {"output": {"message": {"content": [{"text": "ok"}]}}}]
+        try:
+            cached_converse(failing, **_request(text="retry me"))
+            assert False, "error swallowed"
+        except RuntimeError:
+            pass
+        assert cached_converse(failing, **_request(text="retry me"))["output"]["message"]["content"][0]["text"] == "ok"
+        assert failing.converse.call_count == 2
+    print("✅ Entries expire after the TTL; failed calls are retried, not cached")
+
+
+def test_retrieve_and_generate():
+    agent = MagicMock()
+    agent.retrieve_and_generate.return_value = {"output": {"text": '{"audit_summary": {"status": "OK"}, "structured_bill": {"items": []}}'}}
+    before = metrics.get_counter("llm_cache_requests_total", {"api": "retrieve_and_generate", "result": "memory"})
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch.object(llm_cache, "_llm_cache", LLMCache(tmp, 1_000_000, ttl_seconds=3600)), \
+         patch.object(rag_service, "agent", agent):
+        bill, limits = {"items": [{"description": "Gloves", "amount": 500}]}, {"coverage_amount": 500000}
+        first = rag_service.audit_claim(bill, limits)
+        assert rag_service.audit_claim(bill, limits) == first
+        assert agent.retrieve_and_generate.call_count == 1
+
+        config = agent.retrieve_and_generate.call_args.kwargs["retrieveAndGenerateConfiguration"]
+        cached_retrieve_and_generate(agent, input={"text": "follow-up"}, retrieveAndGenerateConfiguration=config, sessionId="s-1")
+        cached_retrieve_and_generate(agent, input={"text": "follow-up"}, retrieveAndGenerateConfiguration=config, sessionId="s-1")
+        assert agent.retrieve_and_generate.call_count == 3, "session calls must not be cached"
+
+        with patch.object(settings, "audit_temperature", None):
+            rag_service.audit_claim(bill, limits)
+            rag_service.audit_claim(bill, limits)
+        kb_config = agent.retrieve_and_generate.call_args.kwargs["retrieveAndGenerateConfiguration"]["knowledgeBaseConfiguration"]
+        assert "generationConfiguration" not in kb_config
+        assert agent.retrieve_and_generate.call_count == 5, "model-default audits must not be cached"
+
+    after = metrics.get_counter("llm_cache_requests_total", {"api": "retrieve_and_generate", "result": "memory"})
+    assert after - before == 1
+    print("✅ Nova Pro audit (temperature 0) cached; session / model-default calls never cached; counters updated")
+
+
+def test_malformed_responses_not_cached():
+    header = {"patient_name": "Ravi Kumar", "bill_number": "INV-77"}
+    bedrock = MagicMock()
+    bedrock.converse.side_effect = [
+        {"output": {"message": {"content": [{"text": "Sorry, I can't read this bill"}]}}},
+        {"output": {"message": {"content": [{"text": json.dumps(header)}]}}},
+    ]
+    agent = MagicMock()
+    agent.retrieve_and_generate.side_effect = [
+        {"output": {"text": '"not an audit"'}},
+        {"output": {"text": '{"audit_summary": {"status": "OK"}, "structured_bill": {"items": []}}'}},
+    ]
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch.object(llm_cache, "_llm_cache", LLMCache(tmp, 1_000_000, ttl_seconds=3600)), \
+         patch.object(structuring_service, "bedrock", bedrock), \
+         patch.object(rag_service, "agent", agent):
+        assert structuring_service.extract_header_details("bill", "policy") == {}
+        assert structuring_service.extract_header_details("bill", "policy") == header
+        assert structuring_service.extract_header_details("bill", "policy") == header
+        assert bedrock.converse.call_count == 2
+
+        bill, limits = {"items": []}, {}
+        assert rag_service.audit_claim(bill, limits)["audit_summary"]["status"] == "Error"
+        assert rag_service.audit_claim(bill, limits)["audit_summary"]["status"] == "OK"
+        rag_service.audit_claim(bill, limits)
+        assert agent.retrieve_and_generate.call_count == 2
+
+        # Entry stored before the parser got stricter: evicted, asked again
+        def strict(response):
+            text = response["output"]["message"]["content"][0]["text"]
+            if text == "reply 1":
+                raise ValueError("rejected")
+            return text
+
+        client = _client()
+        cached_converse(client, **_request())
+        assert cached_converse(client, parse=strict, **_request()) == "reply 2"
+        assert cached_converse(client, parse=strict, **_request()) == "reply 2"
+        assert client.converse.call_count == 2
+    print("✅ Malformed responses are not cached; entries the parser rejects are evicted")
+
+
+if __name__ == "__main__":
+    test_memory_then_disk_hits()
+    test_sampled_calls_bypass_cache()
+    test_ttl_and_failures()
+    test_retrieve_and_generate()
+    test_malformed_responses_not_cached()
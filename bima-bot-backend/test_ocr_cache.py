@@ -0,0 +1,83 @@
+"""
+Test Content-Addressed OCR Cache (No Real AWS Required)
+
+Checks:
+1. DiskCache round-trips values and treats corrupt entries as misses
+2. Least-recently-used entries are evicted once the size cap is exceeded
+3. extract_text_from_document skips Textract when the document hash is cached
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.cache import DiskCache
+from app.services.ocr import engines, ocr_service
+
+
+def test_disk_cache_roundtrip_and_corruption():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DiskCache(tmp, max_bytes=1_000_000)
+        cache.set("ab" * 32, {"text": "Policy wording ₹5,000", "line_count": 1})
+        assert cache.get("ab" * 32) == {"text": "Policy wording ₹5,000", "line_count": 1}
+        assert cache.get("cd" * 32) is None
+
+        # A torn/corrupt file is just a miss
+        cache._path("ef" * 32).parent.mkdir(parents=True, exist_ok=True)
+        cache._path("ef" * 32).write_text("{not json")
+        assert cache.get("ef" * 32) is None
+    print("✅ DiskCache round-trip; corrupt entries read as misses")
+
+
+def test_disk_cache_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DiskCache(tmp, max_bytes=3_000)
+        payload = {"text": "x" * 900}
+        keys = [f"{i:02d}" * 32 for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.set(key, payload)
+            # Distinct mtimes so LRU order is deterministic
+            os.utime(cache._path(key), (time.time() - 100 + i, time.time() - 100 + i))
+
+        cache.get(keys[0])               # keys[0] becomes most recently used
+        cache.set("99" * 32, payload)    # pushes the cache over its cap
+
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None, "Least recently used entry should be evicted"
+        assert cache.get("99" * 32) is not None
+        assert cache.stats()["size_bytes"] <= 3_000
+    print("✅ LRU eviction keeps recently used entries under the size cap")
+
+
+def test_repeat_document_skips_textract():
+    text = "Sum insured Rs 5,00,000. Room rent capped at 1% of sum insured."
+    textract_result = {
+        "text": text, "pages": [{"page_number": 1, "text": text}],
+        "line_count": 1, "page_count": 1, "mean_confidence": 99.1, "textract_api": "sync"
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DiskCache(tmp, max_bytes=1_000_000)
+        with patch.object(ocr_service, "_ocr_cache", cache), \
+             patch.object(engines, "detect_document_from_s3_file", return_value=dict(textract_result)) as textract:
+            sha = "a1" * 32
+            first = ocr_service.extract_text_from_document(None, "audits/AUD-1/policy.pdf", sha)
+            second = ocr_service.extract_text_from_document(None, "audits/AUD-2/policy.pdf", sha)
+            # Without a hash the cache is bypassed
+            ocr_service.extract_text_from_document(None, "audits/AUD-3/policy.pdf")
+
+        assert first == second == textract_result["text"]
+        assert textract.call_count == 2, "Second audit of the same policy should not call Textract"
+        cached = cache.get(ocr_service._cache_key(sha))
+        assert cached["page_count"] == 1 and "ocr_ms" in cached
+    print("✅ Repeat policy served from the OCR cache, Textract called once")
+
+
+if __name__ == "__main__":
+    test_disk_cache_roundtrip_and_corruption()
+    test_disk_cache_lru_eviction()
+    test_repeat_document_skips_textract()
@@ -0,0 +1,99 @@
+"""
+Test Structured OCR Output (OcrDocument)
+
+Checks that:
+1. Textract LINE/WORD blocks become pages -> lines -> words with
+   bounding boxes and confidence
+2. .text matches the old flat '\\n'.join(lines) output
+3. Blank pages (PAGE block, no LINEs) are kept as empty pages
+4. Serialisation is columnar and round-trips (as stored in the OCR cache)
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.aws_service import _summarize_blocks
+from app.services.ocr.ocr_document import OcrDocument, OcrPage, pages_from_textract_blocks
+
+
+def _box(left, top, width=0.3, height=0.02):
+    return {"BoundingBox": {"Left": left, "Top": top, "Width": width, "Height": height}}
+
+
+def _line(line_id, text, top, page=1, confidence=99.0):
+    words = text.split()
+    word_blocks = [
+        {"BlockType": "WORD", "Id": f"{line_id}-w{i}", "Text": word, "Confidence": confidence - i,
+         "Page": page, "Geometry": _box(0.1 + 0.1 * i, top, 0.08)}
+        for i, word in enumerate(words)
+    ]
+    line_block = {"BlockType": "LINE", "Id": line_id, "Text": text, "Confidence": confidence, "Page": page,
+                  "Geometry": _box(0.1, top), "Relationships": [{"Type": "CHILD", "Ids": [w["Id"] for w in word_blocks]}]}
+    return [line_block] + word_blocks
+
+
+BLOCKS = (
+    [{"BlockType": "PAGE", "Page": 1}]
+    + _line("l1", "APOLLO HOSPITALS", 0.05)
+    + _line("l2", "Bill No: B-1001", 0.10)
+    + _line("l3", "Room Rent 15,000.00", 0.50, confidence=91.0)
+    + [{"BlockType": "PAGE", "Page": 2}]
+    + _line("l4", "Total 15,500.00", 0.20, page=2)
+)
+
+
+def test_blocks_to_pages_lines_words():
+    pages = pages_from_textract_blocks(BLOCKS)
+    assert [p.page_number for p in pages] == [1, 2]
+
+    lines = list(pages[0].lines())
+    assert [l.text for l in lines] == ["APOLLO HOSPITALS", "Bill No: B-1001", "Room Rent 15,000.00"]
+    assert [w.text for w in lines[2].words] == ["Room", "Rent", "15,000.00"]
+    assert lines[2].confidence == 91.0
+    assert lines[2].words[1].confidence == 90.0
+    assert lines[1].bbox == (0.1, 0.1, 0.3, 0.02)
+    assert lines[2].words[2].bbox == (0.3, 0.5, 0.08, 0.02)
+    print("✅ Textract blocks -> pages -> lines -> words with geometry and confidence")
+
+
+def test_text_view_is_backwards_compatible():
+    result = _summarize_blocks(BLOCKS, api="sync")
+    assert result["text"] == "APOLLO HOSPITALS\nBill No: B-1001\nRoom Rent 15,000.00\nTotal 15,500.00"
+    document = OcrDocument.from_dict(result)
+    assert document.text == result["text"]
+    assert result["line_count"] == 4 and result["page_count"] == 2
+    print("✅ .text view matches the old flat OCR string")
+
+
+def test_blank_pages_kept():
+    blocks = BLOCKS + [{"BlockType": "PAGE", "Page": 3}, {"BlockType": "PAGE", "Page": 4}] + _line("l5", "Signature", 0.9, page=4)
+    pages = pages_from_textract_blocks(blocks)
+    assert [(p.page_number, len(p.line_text)) for p in pages] == [(1, 3), (2, 1), (3, 0), (4, 1)]
+    assert pages[2] == OcrPage(page_number=3, source="textract")
+    assert _summarize_blocks(blocks, api="async")["page_count"] == 4
+    print("✅ Blank Textract pages kept as empty pages")
+
+
+def test_columnar_roundtrip():
+    document = OcrDocument(pages=pages_from_textract_blocks(BLOCKS))
+    data = json.loads(json.dumps(document.to_dict()))
+    page = data["pages"][0]
+    # Parallel arrays, not one dict per block
+    assert set(page["lines"]) == {"text", "conf", "bbox", "word_start"}
+    assert len(page["lines"]["bbox"]) == 4 * len(page["lines"]["text"])
+    assert page["lines"]["word_start"] == [0, 2, 5, 8]
+
+    restored = OcrDocument.from_dict(data)
+    assert restored == document
+    assert [p.page_number for p in restored.pages] == [1, 2]
+    print("✅ Columnar serialisation round-trips")
+
+
+if __name__ == "__main__":
+    test_blocks_to_pages_lines_words()
+    test_text_view_is_backwards_compatible()
+    test_blank_pages_kept()
+    test_columnar_roundtrip()
@@ -0,0 +1,178 @@
+"""
+Test Pluggable OCR Engines (No Real AWS Required)
+
+Checks that:
+1. settings.ocr_engine selects the engine; unknown names are rejected;
+   the Tesseract process pool is spawned, never forked
+2. Tesseract word data becomes an OcrPage with normalised geometry
+3. Page images are read from scanned PDFs (embedded images) and TIFFs
+4. ocr_service sends scanned pages to the configured engine and caches
+   per engine
+5. OpenCV deskew recovers a small rotation (skipped without OpenCV)
+6. End-to-end Tesseract + OpenCV OCR (skipped when not installed)
+"""
+
+import importlib.util
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from PIL import Image, ImageDraw
+
+from app.config import settings
+from app.services.cache import DiskCache
+from app.services.ocr import ocr_service
+from app.services.ocr.engines import OcrEngine, TextractEngine, get_ocr_engine
+from app.services.ocr.ocr_document import OcrPage
+from app.services.ocr.tesseract_engine import TesseractEngine, load_page_images, page_from_tesseract_data
+
+
+def _scan(path, pages, fmt="PDF", text=None):
+    images = []
+    for n in range(pages):
+        image = Image.new("RGB", (850, 1100), "white")
+        if text:
+            ImageDraw.Draw(image).text((80, 100), f"{text} {n + 1}", fill="black")
+        images.append(image)
+    images[0].save(path, fmt, save_all=pages > 1, append_images=images[1:])
+
+
+class RecordingEngine(OcrEngine):
+    name = "recording"
+
+    def __init__(self):
+        self.calls = []
+
+    def ocr_pages(self, file_path, s3_key, page_numbers, page_count):
+        self.calls.append(("pages", list(page_numbers)))
+        return {n: OcrPage.from_text(n, f"scanned page {n}", self.name) for n in page_numbers}
+
+    def ocr_document(self, file_path, s3_key):
+        self.calls.append(("document", s3_key))
+        return [OcrPage.from_text(1, "whole document", self.name)], {"engine": self.name}
+
+
+def test_engine_selection():
+    assert isinstance(get_ocr_engine("textract"), TextractEngine)
+    assert isinstance(get_ocr_engine("tesseract"), TesseractEngine)
+    with patch.object(settings, "ocr_engine", "tesseract"):
+        assert get_ocr_engine().name == "tesseract"
+    try:
+        get_ocr_engine("abbyy")
+        assert False, "unknown engine accepted"
+    except ValueError:
+        pass
+    engine = TesseractEngine(workers=2)
+    assert engine._get_pool()._mp_context.get_start_method() == "spawn"
+    engine.shutdown()
+    print("✅ Engine registry: textract / tesseract, unknown rejected")
+
+
+def test_tesseract_data_to_page():
+    data = {
+        "level": [1, 5, 5, 5, 5],
+        "block_num": [0, 1, 1, 1, 2],
+        "par_num": [0, 1, 1, 1, 1],
+        "line_num": [0, 1, 1, 2, 1],
+        "left": [0, 100, 300, 100, 500],
+        "top": [0, 50, 50, 120, 900],
+        "width": [1000, 150, 120, 200, 100],
+        "height": [1000, 30, 30, 30, 40],
+        "conf": [-1, 96.5, 90.5, 80, 70],
+        "text": ["", "Room", "Rent", "Gloves", "500"],
+    }
+    page = page_from_tesseract_data(2, data, (1000, 1000))
+
+    assert page.source == "tesseract"
+    assert page.line_text == ["Room Rent", "Gloves", "500"]
+    assert page.line_conf[0] == 93.5
+    first = next(page.lines())
+    assert first.bbox == (0.1, 0.05, 0.32, 0.03)
+    assert [w.text for w in first.words] == ["Room", "Rent"]
+    assert list(page.lines())[2].bbox == (0.5, 0.9, 0.1, 0.04)
+    print("✅ Tesseract words -> lines with normalised geometry")
+
+
+def test_page_images_from_scans():
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf, tiff = Path(tmp) / "scan.pdf", Path(tmp) / "scan.tiff"
+        _scan(pdf, 3)
+        _scan(tiff, 2, "TIFF")
+
+        images = load_page_images(str(pdf), [1, 3])
+        assert sorted(images) == [1, 3]
+        assert all(png.startswith(b"\x89PNG") for png in images.values())
+        assert sorted(load_page_images(str(tiff))) == [1, 2]
+    print("✅ Page images from scanned PDF pages and TIFF frames")
+
+
+def test_ocr_service_uses_configured_engine():
+    engine = RecordingEngine()
+    with tempfile.TemporaryDirectory() as tmp:
+        scan, png = Path(tmp) / "scan.pdf", Path(tmp) / "bill.png"
+        _scan(scan, 2)
+        _scan(png, 1, "PNG")
+        cache = DiskCache(str(Path(tmp) / "cache"), 1024 * 1024)
+
+        with patch.object(ocr_service, "_ocr_cache", cache), \
+             patch.object(ocr_service, "get_ocr_engine", return_value=engine), \
+             patch.object(settings, "ocr_engine", "recording"):
+            document = ocr_service.extract_document(str(scan), "audits/AUD-1/scan.pdf", "ab" * 32)
+            assert ocr_service.extract_text_from_document(str(png), "audits/AUD-1/bill.png") == "whole document"
+            # Cached under the engine's own key
+            ocr_service.extract_document(str(scan), "audits/AUD-1/scan.pdf", "ab" * 32)
+            assert cache.get(f"{'ab' * 32}-recording-v{ocr_service.OCR_CACHE_VERSION}") is not None
+
+    assert engine.calls == [("pages", [1, 2]), ("document", "audits/AUD-1/bill.png")]
+    assert document.text == "scanned page 1\nscanned page 2"
+    print("✅ ocr_service: scanned pages -> configured engine, cached per engine")
+
+
+def test_deskew_recovers_rotation():
+    if importlib.util.find_spec("cv2") is None or importlib.util.find_spec("numpy") is None:
+        print("⏭️  Skipping deskew test (opencv-python / numpy not installed)")
+        return
+    import numpy as np
+    from app.services.ocr.preprocessing import estimate_skew, preprocess_image
+
+    page = Image.new("L", (1200, 1600), 255)
+    draw = ImageDraw.Draw(page)
+    for y in range(100, 1500, 40):
+        draw.rectangle((100, y, 1000, y + 14), fill=0)
+
+    assert estimate_skew(np.array(page.rotate(2, fillcolor=255))) == -2.0
+    cleaned = preprocess_image(page.rotate(2, fillcolor=255).convert("RGB"))
+    assert cleaned.mode == "L"
+    assert estimate_skew(np.array(cleaned)) == 0.0
+    print("✅ Deskew: 2° rotation detected and corrected")
+
+
+def test_tesseract_end_to_end():
+    missing = [m for m in ("pytesseract", "cv2", "numpy") if importlib.util.find_spec(m) is None]
+    if missing or shutil.which("tesseract") is None:
+        print(f"⏭️  Skipping Tesseract end-to-end (missing: {', '.join(missing) or 'tesseract binary'})")
+        return
+
+    engine = TesseractEngine(workers=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        scan = Path(tmp) / "scan.pdf"
+        _scan(scan, 2, text="HOSPITAL BILL PAGE")
+        pages = engine.ocr_pages(str(scan), "audits/AUD-1/scan.pdf", [1, 2], 2)
+    engine.shutdown()
+
+    assert "BILL" in pages[1].text.upper()
+    assert pages[2].has_geometry
+    print("✅ Tesseract + OpenCV OCR end to end")
+
+
+if __name__ == "__main__":
+    test_engine_selection()
+    test_tesseract_data_to_page()
+    test_page_images_from_scans()
+    test_ocr_service_uses_configured_engine()
+    test_deskew_recovers_rotation()
+    test_tesseract_end_to_end()
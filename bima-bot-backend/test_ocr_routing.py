@@ -0,0 +1,101 @@
+"""
+Test Textract Sync/Async Routing + Metrics (No Real AWS Required)
+
+Checks that:
+1. Local inspection picks sync for single pages / images and async for
+   multi-page or oversized documents (probe only when unknown)
+2. A 3-page scanned PDF goes straight to async Textract
+3. Routing decisions show up at GET /metrics
+4. A JPEG/PNG over the sync limit is shrunk locally and sent to sync
+   Textract (the async APIs only take PDF/TIFF)
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from PIL import Image
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import metrics
+from app.services.ocr import engines, ocr_service
+from app.services.ocr.document_info import inspect_document, choose_textract_api, DocumentInfo, SYNC_MAX_BYTES
+
+
+def _scan(path, pages, fmt="PDF"):
+    images = [Image.new("RGB", (425, 550), "white") for _ in range(pages)]
+    images[0].save(path, fmt, save_all=pages > 1, append_images=images[1:])
+
+
+def test_routing_decisions():
+    with tempfile.TemporaryDirectory() as tmp:
+        one, three, png = Path(tmp) / "one.pdf", Path(tmp) / "three.pdf", Path(tmp) / "bill.png"
+        _scan(one, 1)
+        _scan(three, 3)
+        _scan(png, 1, "PNG")
+
+        assert choose_textract_api(inspect_document(str(one))) == ("sync", "single_page")
+        assert choose_textract_api(inspect_document(str(three))) == ("async", "multi_page")
+        info = inspect_document(str(png))
+        assert info.mime_type == "image/png"
+        assert choose_textract_api(info) == ("sync", "single_page")
+
+    big = DocumentInfo("application/pdf", 1, SYNC_MAX_BYTES + 1)
+    assert choose_textract_api(big) == ("async", "over_sync_size_limit")
+    assert choose_textract_api(None) == ("probe", "unknown_document")
+    print("✅ Routing: single page/image -> sync, multi-page/oversized -> async, unknown -> probe")
+
+
+def test_multi_page_scan_skips_sync_attempt_and_is_counted():
+    metrics.reset()
+    result = {"text": "a\nb\nc", "line_count": 3, "mean_confidence": 95.0, "textract_api": "async",
+              "pages": [{"page_number": n, "text": t} for n, t in enumerate("abc", start=1)]}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        policy = Path(tmp) / "policy.pdf"
+        _scan(policy, 3)
+        with patch.object(ocr_service, "_ocr_cache", None), \
+             patch.object(engines, "detect_document_from_s3_file", return_value=result) as textract:
+            pages = ocr_service.extract_pages_from_document(str(policy), "audits/AUD-1/policy.pdf")
+
+    assert textract.call_args.kwargs["api"] == "async"
+    assert [p.page_number for p in pages] == [1, 2, 3]
+    assert metrics.get_counter("ocr_textract_route_total", {"api": "async", "reason": "multi_page"}) == 1
+
+    body = TestClient(app).get("/metrics").text
+    assert 'ocr_textract_route_total{api="async",reason="multi_page"} 1' in body
+    assert 'ocr_documents_total{engine="textract_async"} 1' in body
+    assert "audit_queue_max_depth" in body
+    print("✅ Multi-page scan routed straight to async; decision visible at /metrics")
+
+
+def test_oversized_image_downscaled_for_sync():
+    sync_result = {"text": "Room Rent 5,000", "line_count": 1, "mean_confidence": 97.0, "textract_api": "sync",
+                   "pages": [{"page_number": 1, "text": "Room Rent 5,000"}]}
+    with tempfile.TemporaryDirectory() as tmp:
+        photo = Path(tmp) / "bill.png"
+        Image.frombytes("RGB", (2100, 2000), os.urandom(2100 * 2000 * 3)).save(photo, "PNG")
+        info = inspect_document(str(photo))
+        assert info.size_bytes > SYNC_MAX_BYTES
+        assert choose_textract_api(info) == ("downscale", "oversized_image")
+
+        with patch.object(engines, "detect_document_bytes_with_textract", return_value=sync_result) as sync, \
+             patch.object(engines, "detect_document_from_s3_file") as s3_route:
+            pages, meta = engines.TextractEngine().ocr_document(str(photo), "audits/AUD-1/bill.png")
+
+    sent = sync.call_args.args[0]
+    assert len(sent) <= SYNC_MAX_BYTES and sent.startswith(b"\xff\xd8\xff")
+    assert not s3_route.called
+    assert meta["textract_api"] == "sync" and pages[0].text == "Room Rent 5,000"
+    print(f"✅ {info.size_bytes // 1024} KB PNG shrunk to {len(sent) // 1024} KB JPEG for sync Textract, no async job")
+
+
+if __name__ == "__main__":
+    test_routing_decisions()
+    test_multi_page_scan_skips_sync_attempt_and_is_counted()
+    test_oversized_image_downscaled_for_sync()
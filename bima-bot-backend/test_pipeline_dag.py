@@ -0,0 +1,122 @@
+"""
+Test Pipeline DAG Runner
+
+Checks the stage scheduler used by the audit pipeline:
+1. Independent stages overlap (wall time ~ critical path)
+2. Dependency results are passed as keyword arguments
+3. Bill structuring starts while a slow policy OCR is still running,
+   and every stage reports its start offset and duration
+4. A failing stage surfaces as StageFailedError and skips its dependents;
+   stages already running have finished (unreported) by the time it raises
+5. Cycles / unknown dependencies are rejected up front
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.pipeline_dag import Stage, StageFailedError, run_stages
+
+
+def _slow(value, delay=0.2):
+    time.sleep(delay)
+    return value
+
+
+def test_independent_stages_overlap():
+    stages = [
+        Stage("bill_text", lambda: _slow("bill")),
+        Stage("policy_text", lambda: _slow("policy")),
+        Stage("bill_struct", lambda bill_text: _slow(bill_text.upper()), deps=("bill_text",)),
+        Stage("clean_policy", lambda policy_text: _slow(policy_text.upper()), deps=("policy_text",)),
+        Stage("header", lambda bill_text, policy_text: _slow(f"{bill_text}+{policy_text}"),
+              deps=("bill_text", "policy_text")),
+        Stage("audit", lambda bill_struct, clean_policy: f"{bill_struct}/{clean_policy}",
+              deps=("bill_struct", "clean_policy")),
+    ]
+
+    start = time.monotonic()
+    results = run_stages(stages)
+    elapsed = time.monotonic() - start
+
+    assert results["audit"] == "BILL/POLICY"
+    assert results["header"] == "bill+policy"
+    # Sequential would be ~1.0s; the critical path is two 0.2s stages
+    assert elapsed < 0.7, f"Stages did not overlap ({elapsed:.2f}s)"
+    print(f"✅ DAG finished in {elapsed:.2f}s (sequential would take ~1.0s)")
+
+
+def test_bill_structuring_overlaps_policy_ocr():
+    timings = {}
+    stages = [
+        Stage("bill_text", lambda: _slow("bill", 0.05)),
+        Stage("policy_text", lambda: _slow("policy", 0.4)),
+        Stage("bill_struct", lambda bill_text: _slow(bill_text, 0.1), deps=("bill_text",)),
+    ]
+    run_stages(stages, on_stage_done=lambda name, t: timings.setdefault(name, t))
+
+    assert set(timings) == {"bill_text", "policy_text", "bill_struct"}
+    assert all(t["ok"] for t in timings.values())
+    policy_end = timings["policy_text"]["start_ms"] + timings["policy_text"]["duration_ms"]
+    bill_struct_end = timings["bill_struct"]["start_ms"] + timings["bill_struct"]["duration_ms"]
+    assert bill_struct_end < policy_end, timings
+    print(f"✅ Bill structuring done at +{bill_struct_end} ms, policy OCR at +{policy_end} ms")
+
+
+def test_failure_skips_dependents():
+    ran = []
+
+    def boom():
+        raise RuntimeError("OCR exploded")
+
+    stages = [
+        Stage("bill_text", boom),
+        Stage("bill_struct", lambda bill_text: ran.append("bill_struct"), deps=("bill_text",)),
+    ]
+    try:
+        run_stages(stages)
+        raise AssertionError("Expected StageFailedError")
+    except StageFailedError as e:
+        assert e.stage == "bill_text"
+        assert isinstance(e.cause, RuntimeError)
+    assert ran == []
+
+    # A sibling still running when the failure arrives is waited for
+    def slow_boom():
+        time.sleep(0.05)
+        boom()
+
+    finished, reported = [], []
+    stages = [
+        Stage("bill_text", slow_boom),
+        Stage("policy_text", lambda: finished.append(_slow("policy", 0.3))),
+    ]
+    try:
+        run_stages(stages, on_stage_done=lambda name, t: reported.append(name))
+        raise AssertionError("Expected StageFailedError")
+    except StageFailedError:
+        assert finished == ["policy"], "running stage outlived run_stages"
+    assert reported == ["bill_text"]
+    print("✅ Failing stage reported; dependents never started; running stages waited for")
+
+
+def test_invalid_graphs_rejected():
+    for stages in (
+        [Stage("a", lambda b: b, deps=("b",)), Stage("b", lambda a: a, deps=("a",))],
+        [Stage("a", lambda missing: missing, deps=("missing",))],
+    ):
+        try:
+            run_stages(stages)
+            raise AssertionError("Expected ValueError")
+        except ValueError:
+            pass
+    print("✅ Cycles and unknown dependencies rejected")
+
+
+if __name__ == "__main__":
+    test_independent_stages_overlap()
+    test_bill_structuring_overlaps_policy_ocr()
+    test_failure_skips_dependents()
+    test_invalid_graphs_rejected()
@@ -0,0 +1,63 @@
+"""
+Test Parsed-Policy Cache (No Real AWS Required)
+
+Checks that parse_policy_limits:
+1. Calls Nova Lite once for the same policy wording (whitespace-insensitive)
+2. Re-parses when the prompt version changes
+3. Never caches a failed parse
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.cache import DiskCache, llm_cache
+from app.services.ai import structuring_service
+
+POLICY_TEXT = "Policy No: P-12345\nInsurer: Health Insurer Ltd\nSum Insured: 500000"
+PARSED = {"policy_id": "P-12345", "insurer_name": "Health Insurer Ltd", "coverage_amount": 500000, "ped_list": []}
+
+
+def _converse_response(payload):
+    return {"output": {"message": {"content": [{"text": json.dumps(payload)}]}}}
+
+
+def test_same_policy_parsed_once():
+    bedrock = MagicMock()
+    bedrock.converse.return_value = _converse_response(PARSED)
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch.object(structuring_service, "_policy_cache", DiskCache(tmp, 1_000_000)), \
+         patch.object(structuring_service, "bedrock", bedrock), \
+         patch.object(llm_cache, "_llm_cache", None):
+        first = structuring_service.parse_policy_limits(POLICY_TEXT)
+        # Same wording, different OCR line breaks
+        second = structuring_service.parse_policy_limits(POLICY_TEXT.replace("\n", "  \n "))
+
+        assert first == second == PARSED
+        assert bedrock.converse.call_count == 1
+
+        with patch.object(structuring_service, "POLICY_PROMPT_VERSION", structuring_service.POLICY_PROMPT_VERSION + 1):
+            structuring_service.parse_policy_limits(POLICY_TEXT)
+        assert bedrock.converse.call_count == 2, "Prompt version change must invalidate the cache"
+    print("✅ Identical policy parsed by Nova Lite once; prompt version bump re-parses")
+
+
+def test_failed_parse_not_cached():
+    bedrock = MagicMock()
+    bedrock.converse.side_effect = [RuntimeError("throttled"), _converse_response(PARSED)]
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch.object(structuring_service, "_policy_cache", DiskCache(tmp, 1_000_000)), \
+         patch.object(structuring_service, "bedrock", bedrock), \
+         patch.object(llm_cache, "_llm_cache", None):
+        assert structuring_service.parse_policy_limits(POLICY_TEXT) == {}
+        assert structuring_service.parse_policy_limits(POLICY_TEXT) == PARSED
+    print("✅ Failed parse is retried on the next audit, not cached")
+
+
+if __name__ == "__main__":
+    test_same_policy_parsed_once()
+    test_failed_parse_not_cached()
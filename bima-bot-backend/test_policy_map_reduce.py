@@ -0,0 +1,170 @@
+"""
+Test Map-Reduce Policy Parsing (No Real AWS Required)
+
+Checks that:
+1. Long policies are cut into chunks at section boundaries, within budget
+2. Chunks are parsed concurrently, never more than the concurrency cap at
+   once, so latency stays flat as the page count grows
+3. Chunk results merge deterministically (first mention, most frequent
+   sum insured, sub-limit / PED union) into PolicyData fields
+4. A failed chunk makes the result uncached; short policies keep the
+   single call
+"""
+
+import json
+import re
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.models.policy import PolicyData
+from app.services import audit_service
+from app.services.ai import structuring_service
+from app.services.ai.prompt_compaction import chunk_text, estimate_tokens
+from app.services.ai.structuring_service import ChunkPolicyLimits, merge_policy_chunks
+from app.services.cache import DiskCache, llm_cache
+
+
+def _policy(sections):
+    lines = ["POLICY SCHEDULE", "Policy No: P-778812", "Policy Holder: Ravi Kumar", "Insurer: Health Insurer Ltd"]
+    for n in range(1, sections + 1):
+        lines.append(f"SECTION {n}. GENERAL CONDITION {n}")
+        lines += [f"Condition {n}.{k}: the insured person shall follow the procedure in clause {n}.{k}." for k in range(25)]
+    lines += [
+        "SECTION 90. TABLE OF BENEFITS",
+        "Sum Insured: Rs. 5,00,000. Room rent: single private room. Co-pay: 10%. Cataract limited to Rs. 40,000.",
+        "SECTION 91. PRE-EXISTING DISEASES",
+        "Declared PED: Diabetes, Hypertension. Waiting period 36 months.",
+    ]
+    return "\n".join(lines)
+
+
+class FakeBedrock:
+    """Answers each chunk prompt from its text; tracks concurrency"""
+
+    def __init__(self, delay=0.0, fail_part=None):
+        self.delay, self.fail_part = delay, fail_part
+        self.calls, self.active, self.max_active = 0, 0, 0
+        self._lock = threading.Lock()
+
+    def converse(self, **request):
+        prompt = request["messages"][0]["content"][0]["text"]
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            part = int(re.search(r"part (\d+) of", prompt).group(1)) if "part " in prompt else 0
+            if part == self.fail_part:
+                raise RuntimeError("throttled")
+            out = {"sub_limits": None, "ped_list": []}
+            if "Policy No: P-778812" in prompt:
+                out.update(policy_id="P-778812", policy_holder_name="Ravi Kumar", insurer_name="Health Insurer Ltd")
+            if "TABLE OF BENEFITS" in prompt:
+                out.update(coverage_amount="5,00,000", room_limit_type="category", room_limit_value="single private",
+                           copay_percentage=10, sub_limits=[{"category": "Cataract", "limit_amount": "40,000"}])
+            if "PRE-EXISTING" in prompt:
+                out.update(ped_list=["Diabetes", "Hypertension"], ped_waiting_period_months=36)
+            return {"output": {"message": {"content": [{"text": json.dumps(out)}]}}}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_chunks_follow_sections():
+    policy = _policy(60)
+    chunks = chunk_text(policy, 3000)
+    assert len(chunks) > 4
+    assert all(estimate_tokens(chunk) <= 3000 for chunk in chunks)
+    # Every chunk after the first starts at a section heading; nothing lost
+    assert all(chunk.startswith("SECTION") for chunk in chunks[1:])
+    assert sum(chunk.count("Condition ") for chunk in chunks) == policy.count("Condition ")
+    print(f"✅ {estimate_tokens(policy)}-token policy -> {len(chunks)} section-aligned chunks")
+
+
+def _parse(policy, bedrock, cache_dir):
+    with patch.object(structuring_service, "bedrock", bedrock), \
+         patch.object(structuring_service, "_policy_cache", DiskCache(cache_dir, 10_000_000)), \
+         patch.object(llm_cache, "_llm_cache", None), \
+         patch.object(settings, "policy_chunk_concurrency", 4):
+        return structuring_service.parse_policy_limits(policy)
+
+
+def test_concurrent_map_reduce():
+    timings = {}
+    for sections in (30, 60):
+        bedrock = FakeBedrock(delay=0.1)
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            result = _parse(_policy(sections), bedrock, tmp)
+            timings[sections] = (time.perf_counter() - start, bedrock.calls)
+
+        assert bedrock.calls == len(chunk_text(_policy(sections), settings.policy_chunk_tokens))
+        assert bedrock.max_active == 4
+        assert result == {
+            "policy_id": "P-778812", "patient_name": "Ravi Kumar", "policy_holder_name": "Ravi Kumar",
+            "insurer_name": "Health Insurer Ltd", "coverage_amount": 500000.0,
+            "room_limit_type": "category", "room_limit_value": "single private", "copay_percentage": 10.0,
+            "ped_waiting_period_months": 36,
+            "sub_limits": [{"category": "Cataract", "limit_amount": 40000.0, "limit_percentage": None}],
+            "ped_list": ["Diabetes", "Hypertension"],
+        }
+        # Merged fields are valid PolicyData
+        PolicyData(policy_id="P", policy_holder_name="R", insurer_name="H", coverage_amount=1, ped_list=[],
+                   **audit_service._policy_limit_fields(result))
+
+    (small_time, small_calls), (large_time, large_calls) = timings[30], timings[60]
+    # Sequential would take 0.1 s per chunk; 4 at a time takes ~a quarter
+    assert large_calls > small_calls and large_time < 0.1 * large_calls / 2, "chunks must run concurrently"
+    print(f"✅ {small_calls} chunks in {small_time:.2f}s, {large_calls} chunks in {large_time:.2f}s (cap 4); merged into PolicyData fields")
+
+
+def test_merge_is_deterministic():
+    parts = [
+        ChunkPolicyLimits(coverage_amount=300000, ped_list=["Asthma"]),
+        ChunkPolicyLimits(coverage_amount=500000, ped_list=["asthma ", "Diabetes"],
+                          sub_limits=[{"category": "Cataract", "limit_amount": 40000}]),
+        ChunkPolicyLimits(coverage_amount=500000, copay_percentage=20,
+                          sub_limits=[{"category": "cataract", "limit_amount": 25000}]),
+        ChunkPolicyLimits(copay_percentage=10),
+    ]
+    merged = merge_policy_chunks(parts)
+    assert merged["coverage_amount"] == 500000       # most frequent
+    assert merged["copay_percentage"] == 20          # first mention
+    assert merged["ped_list"] == ["Asthma", "Diabetes"]
+    assert [s["limit_amount"] for s in merged["sub_limits"]] == [40000]
+    assert merge_policy_chunks(parts) == merged
+    assert merge_policy_chunks(parts[:1] + parts[2:3])["coverage_amount"] == 300000   # tie -> earliest
+    print("✅ Merge: first mention, most frequent sum insured, sub-limit / PED union")
+
+
+def test_failed_chunk_not_cached_and_short_policy_single_call():
+    policy = _policy(60)
+    with tempfile.TemporaryDirectory() as tmp:
+        partial = _parse(policy, FakeBedrock(fail_part=3), tmp)
+        assert partial["policy_id"] == "P-778812"
+        retry = FakeBedrock()
+        _parse(policy, retry, tmp)
+        assert retry.calls > 0, "incomplete parse must not be cached"
+        cached = FakeBedrock()
+        _parse(policy, cached, tmp)
+        assert cached.calls == 0
+
+        short = FakeBedrock()
+        assert _parse(_policy(1), short, tmp)["policy_id"] == "P-778812"
+        assert short.calls == 1
+    print("✅ Failed chunk -> not cached; short policy -> single call")
+
+
+if __name__ == "__main__":
+    test_chunks_follow_sections()
+    test_concurrent_map_reduce()
+    test_merge_is_deterministic()
+    test_failed_chunk_not_cached_and_short_policy_single_call()
@@ -0,0 +1,102 @@
+"""
+Test Token-Budgeted Prompt Compaction (No Real AWS Required)
+
+Checks that:
+1. Page furniture, repeated running headers/footers and whitespace runs
+   are removed (first occurrence of a running header kept)
+2. Repeated bill rows survive (they are real line items)
+3. A long policy is packed into the budget with the limits table, PED
+   clause and policy header kept, where the old 15,000-character slice
+   cut the limits table off
+4. The structuring prompts use the compacted text; with compaction
+   disabled they fall back to plain truncation
+"""
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.services.ai import structuring_service
+from app.services.ai.prompt_compaction import clean_ocr_text, compact_text, estimate_tokens, split_sections
+from app.services.cache import llm_cache
+
+FOOTER = "Health Insurer Ltd | Policy Wording | UIN HIIHLIP21001V012021"
+
+
+def _long_policy(pages=24):
+    lines = ["POLICY SCHEDULE", "Policy No: P-778812", "Policy Holder: Ravi Kumar", "Insurer: Health Insurer Ltd", ""]
+    for page in range(1, pages + 1):
+        lines.append(f"SECTION {page}. GENERAL CONDITIONS PART {page}")
+        for n in range(12):
+            lines.append(f"The insured person shall comply with general condition {page}.{n} of this contract and its terms.  ")
+        lines += ["", FOOTER, f"Page {page} of {pages + 1}", "", "", ""]
+    lines += [
+        "SECTION 30. TABLE OF BENEFITS",
+        "Sum Insured: Rs. 5,00,000 per annum",
+        "Room Rent limit: up to 1% of Sum Insured per day",
+        "ICU limit: up to 2% of Sum Insured per day",
+        "Co-pay: 10% on all claims",
+        "SECTION 31. PRE-EXISTING DISEASES",
+        "Pre-existing diseases declared: Diabetes, Hypertension. Waiting period 36 months.",
+        FOOTER, f"Page {pages + 1} of {pages + 1}",
+    ]
+    return "\n".join(lines)
+
+
+def test_clean_removes_furniture_keeps_bill_rows():
+    text = "\n".join([
+        FOOTER, "Policy No: P-1", "Page 1 of 3", "", "", "", "Clause   one   text",
+        FOOTER, "- 2 -", "Continued on next page", "Clause two", FOOTER, "Page 3 of 3",
+    ])
+    cleaned = clean_ocr_text(text)
+    assert cleaned == f"{FOOTER}\nPolicy No: P-1\n\nClause one text\nClause two"
+
+    bill = "\n".join(["Room Rent Day 1", "5,000", "Room Rent Day 2", "5,000", "Room Rent Day 3", "5,000", "Page 1 of 1"])
+    assert compact_text(bill, ("line_items",), 4000) == bill.rsplit("\n", 1)[0]
+    print("✅ Page furniture / running footers / whitespace removed; repeated bill rows kept")
+
+
+def test_long_policy_packed_by_relevance():
+    policy = _long_policy()
+    assert "Room Rent limit" not in policy[:15000], "fixture: old slice must miss the limits table"
+
+    compacted = compact_text(policy, structuring_service.POLICY_TASKS, 1000)
+    assert estimate_tokens(compacted) <= 1000
+    assert estimate_tokens(compacted) < estimate_tokens(policy) / 4
+    for needle in ("Policy No: P-778812", "Room Rent limit: up to 1%", "Co-pay: 10%", "Diabetes, Hypertension"):
+        assert needle in compacted, needle
+    assert compacted.count(FOOTER) <= 1 and "Page 3 of" not in compacted
+    assert "[...]" in compacted
+    # Sections come back in document order
+    assert compacted.index("Policy No") < compacted.index("TABLE OF BENEFITS") < compacted.index("PRE-EXISTING")
+    assert len(split_sections(policy)) > 20
+    print(f"✅ Long policy: ~{estimate_tokens(policy)} -> ~{estimate_tokens(compacted)} tokens, limits / PED / header kept")
+
+
+def test_prompts_use_compacted_text():
+    policy = _long_policy()
+    bedrock = MagicMock()
+    bedrock.converse.return_value = {"output": {"message": {"content": [{"text": json.dumps({"policy_id": "P-778812"})}]}}}
+    with patch.object(structuring_service, "bedrock", bedrock), \
+         patch.object(structuring_service, "_policy_cache", None), \
+         patch.object(llm_cache, "_llm_cache", None), \
+         patch.object(settings, "policy_map_reduce_enabled", False):
+        structuring_service.parse_policy_limits(policy)
+        prompt = bedrock.converse.call_args.kwargs["messages"][0]["content"][0]["text"]
+        assert "Room Rent limit" in prompt and "Page 7 of" not in prompt
+
+        with patch.object(settings, "prompt_compaction_enabled", False):
+            structuring_service.parse_policy_limits(policy)
+        prompt = bedrock.converse.call_args.kwargs["messages"][0]["content"][0]["text"]
+        assert "Room Rent limit" not in prompt and policy[:settings.prompt_policy_tokens * 4] in prompt
+    print("✅ Policy prompt carries the compacted text; disabled -> plain truncation")
+
+
+if __name__ == "__main__":
+    test_clean_removes_furniture_keeps_bill_rows()
+    test_long_policy_packed_by_relevance()
+    test_prompts_use_compacted_text()
@@ -0,0 +1,139 @@
+"""
+Test Concurrent S3 Uploads (No Real AWS Required)
+
+Uploads bill and policy to a moto S3 stand-in and checks:
+1. Both files are uploaded concurrently with per-file timings
+2. When one upload fails, the other (still running in its thread) has
+   settled before the error propagates, so /upload's cleanup leaves no
+   object behind
+3. Cancelling the request waits for the in-flight PUT the same way
+"""
+
+import os
+os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+os.environ['AWS_REGION'] = 'us-east-1'
+os.environ['S3_BUCKET_NAME'] = 'bima-bot-test-bucket'
+
+import sys
+import time
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from moto import mock_aws
+import boto3
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.api.routes import audit as audit_routes
+from app.services import aws_service, upload_service
+from app.services.aws_service import BUCKET_NAME, AWSServiceError
+from app.services.upload_service import discard_upload, upload_files_to_s3_concurrently
+
+
+def _bucket():
+    # Rebind aws_service's client inside the mock (see test_s3_multipart_stream)
+    s3 = boto3.client('s3', region_name='us-east-1')
+    aws_service.s3 = s3
+    s3.create_bucket(Bucket=BUCKET_NAME)
+    return s3
+
+
+def _objects(s3):
+    return [obj['Key'] for obj in s3.list_objects_v2(Bucket=BUCKET_NAME).get('Contents', [])]
+
+
+def _slow_bill_upload(landed):
+    """upload_file_to_s3 where the bill PUT takes 0.3 s and the policy fails"""
+    real_upload = upload_service.upload_file_to_s3
+
+    def upload(local_path, s3_key):
+        if s3_key.endswith("policy.pdf"):
+            raise AWSServiceError("Failed to upload file to S3: SlowDown")
+        time.sleep(0.3)
+        result = real_upload(local_path, s3_key)
+        landed.set()
+        return result
+
+    return upload
+
+
+@mock_aws
+def test_concurrent_upload():
+    s3 = _bucket()
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        for label in ("bill", "policy"):
+            path = Path(tmp) / f"{label}.pdf"
+            path.write_bytes(b"%PDF-1.4 " + label.encode())
+            files[label] = (str(path), f"audits/TEST/{label}.pdf")
+
+        timings = asyncio.run(upload_files_to_s3_concurrently(files))
+
+    assert set(timings) == {"bill", "policy"}
+    assert sorted(_objects(s3)) == ["audits/TEST/bill.pdf", "audits/TEST/policy.pdf"]
+    print(f"✅ Concurrent upload: {timings}")
+
+
+@mock_aws
+def test_failed_upload_leaves_no_objects():
+    s3 = _bucket()
+    landed = threading.Event()
+    client = TestClient(app)
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch.object(upload_service, "upload_file_to_s3", _slow_bill_upload(landed)), \
+         patch.object(audit_routes, "UPLOAD_DIR", Path(tmp)), \
+         patch.object(settings, "upload_mode", "disk"):
+        audit_id = client.post("/audit/start").json()["audit_id"]
+        response = client.post(f"/audit/{audit_id}/upload", files={
+            "bill": ("bill.pdf", b"%PDF-1.4 bill", "application/pdf"),
+            "policy": ("policy.pdf", b"%PDF-1.4 policy", "application/pdf"),
+        })
+        assert response.status_code == 500, response.text
+        # The bill PUT finished before cleanup ran, and cleanup removed it
+        assert landed.is_set()
+        assert _objects(s3) == []
+        assert not [p for p in Path(tmp).rglob("*") if p.is_file()]
+    print("✅ Policy upload failed: bill PUT settled before cleanup, no objects left")
+
+
+@mock_aws
+def test_cancelled_upload_leaves_no_objects():
+    s3 = _bucket()
+    landed = threading.Event()
+
+    async def cancel_mid_upload(files):
+        task = asyncio.ensure_future(upload_files_to_s3_concurrently(files))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        # Cancellation returns only once the running PUT has settled
+        assert landed.is_set()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch.object(upload_service, "upload_file_to_s3", _slow_bill_upload(landed)):
+        upload_dir = Path(tmp) / "TEST"
+        upload_dir.mkdir()
+        path = upload_dir / "bill.pdf"
+        path.write_bytes(b"%PDF-1.4 bill")
+        asyncio.run(cancel_mid_upload({"bill": (str(path), "audits/TEST/bill.pdf")}))
+        discard_upload("TEST", upload_dir, delete_from_s3=True)
+        assert not upload_dir.exists()
+
+    assert _objects(s3) == []
+    print("✅ Cancelled upload: in-flight PUT awaited, cleanup left no objects or upload dir")
+
+
+if __name__ == "__main__":
+    test_concurrent_upload()
+    test_failed_upload_leaves_no_objects()
+    test_cancelled_upload_leaves_no_objects()
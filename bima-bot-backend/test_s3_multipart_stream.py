@@ -0,0 +1,136 @@
+"""
+Test Direct-to-S3 Streaming Upload (No Real AWS Required)
+
+Streams documents into a moto S3 stand-in and checks:
+1. Large uploads go through multipart and reassemble byte-for-byte
+2. Small uploads use a single PUT
+3. Oversized uploads abort the multipart upload
+4. Local tee writes an identical copy when enabled
+5. An unexpected error during /upload (not an S3 / HTTP error) still
+   removes the stored bill, local copies and the partial upload
+"""
+
+import os
+os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+os.environ['AWS_REGION'] = 'us-east-1'
+os.environ['S3_BUCKET_NAME'] = 'bima-bot-test-bucket'
+
+import sys
+import time
+import asyncio
+import hashlib
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from moto import mock_aws
+import boto3
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.api.routes import audit as audit_routes
+from app.services import aws_service, upload_service
+from app.services.aws_service import BUCKET_NAME
+from app.services.upload_service import stream_upload_to_s3, UploadTooLargeError, MIN_PART_SIZE
+
+
+def _bucket():
+    # aws_service may have been imported (by another test) before the fake
+    # credentials above were set, so rebind its client inside the mock
+    s3 = boto3.client('s3', region_name='us-east-1')
+    aws_service.s3 = s3
+    s3.create_bucket(Bucket=BUCKET_NAME)
+    return s3
+
+
+@mock_aws
+def test_multipart_stream_roundtrip():
+    s3 = _bucket()
+    data = os.urandom(MIN_PART_SIZE * 2 + 12345)
+    upload = UploadFile(file=BytesIO(data), filename="policy.pdf")
+
+    receipt = asyncio.run(stream_upload_to_s3(
+        upload, "audits/TEST/policy.pdf", max_bytes=len(data) + 1,
+        part_size=MIN_PART_SIZE, max_concurrency=2
+    ))
+
+    stored = s3.get_object(Bucket=BUCKET_NAME, Key="audits/TEST/policy.pdf")['Body'].read()
+    assert stored == data
+    assert receipt.sha256 == hashlib.sha256(data).hexdigest()
+    assert receipt.path is None
+    print(f"✅ Multipart stream: {receipt.size_bytes} bytes reassembled in S3")
+
+
+@mock_aws
+def test_small_upload_single_put_with_tee():
+    s3 = _bucket()
+    data = b"%PDF-1.4 small bill"
+    with tempfile.TemporaryDirectory() as tmp:
+        tee = Path(tmp) / "bill.pdf"
+        upload = UploadFile(file=BytesIO(data), filename="bill.pdf")
+
+        receipt = asyncio.run(stream_upload_to_s3(upload, "audits/TEST/bill.pdf", 1024, tee_path=tee))
+
+        assert s3.get_object(Bucket=BUCKET_NAME, Key="audits/TEST/bill.pdf")['Body'].read() == data
+        assert tee.read_bytes() == data
+        assert receipt.path == str(tee.absolute())
+    print("✅ Small upload stored with single PUT and local tee")
+
+
+@mock_aws
+def test_oversized_stream_aborts():
+    s3 = _bucket()
+    data = os.urandom(MIN_PART_SIZE + 1024)
+    upload = UploadFile(file=BytesIO(data), filename="policy.pdf")
+
+    try:
+        asyncio.run(stream_upload_to_s3(upload, "audits/TEST/big.pdf", max_bytes=MIN_PART_SIZE + 10))
+        raise AssertionError("Expected UploadTooLargeError")
+    except UploadTooLargeError:
+        pass
+
+    assert 'Contents' not in s3.list_objects_v2(Bucket=BUCKET_NAME)
+    assert not s3.list_multipart_uploads(Bucket=BUCKET_NAME).get('Uploads')
+    print("✅ Oversized stream aborted, no object or dangling multipart upload")
+
+
+@mock_aws
+def test_upload_route_cleans_up_on_unexpected_error():
+    s3 = _bucket()
+    real_put = upload_service.upload_bytes_to_s3
+
+    def put(data, s3_key):
+        if s3_key.endswith("policy.pdf"):
+            time.sleep(0.2)                      # bill lands first
+            raise OSError("connection reset")    # not an AWSServiceError
+        return real_put(data, s3_key)
+
+    client = TestClient(app, raise_server_exceptions=False)
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch.object(upload_service, "upload_bytes_to_s3", put), \
+         patch.object(audit_routes, "UPLOAD_DIR", Path(tmp)), \
+         patch.object(settings, "upload_mode", "s3_stream"), \
+         patch.object(settings, "upload_local_fallback", True):
+        audit_id = client.post("/audit/start").json()["audit_id"]
+        response = client.post(f"/audit/{audit_id}/upload", files={
+            "bill": ("bill.pdf", b"%PDF-1.4 bill", "application/pdf"),
+            "policy": ("policy.pdf", b"%PDF-1.4 policy", "application/pdf"),
+        })
+        assert response.status_code == 500
+        assert not (Path(tmp) / audit_id).exists()
+
+    assert 'Contents' not in s3.list_objects_v2(Bucket=BUCKET_NAME)
+    print("✅ Unexpected upload error: stored bill and local copies removed")
+
+
+if __name__ == "__main__":
+    test_multipart_stream_roundtrip()
+    test_small_upload_single_put_with_tee()
+    test_oversized_stream_aborts()
+    test_upload_route_cleans_up_on_unexpected_error()
@@ -0,0 +1,108 @@
+"""
+Test Page-Sharded Textract (No Real AWS Required)
+
+Checks that:
+1. Page ranges cover the document exactly
+2. An 11-page scanned PDF is OCR'd as concurrent shards (multi-page shards
+   via S3 + async tracker, the single-page tail via sync bytes), text is
+   reassembled in page order and shard objects are cleaned up
+3. The token bucket holds callers to the configured rate
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from PIL import Image
+from pypdf import PdfReader
+
+from app.config import settings
+from app.services.ocr import engines, ocr_service, sharded_ocr
+from app.services.ocr.sharded_ocr import plan_shards
+from app.services.rate_limit import TokenBucket
+
+
+def _scanned_pdf(path, pages):
+    images = [Image.new("RGB", (425, 550), "white") for _ in range(pages)]
+    images[0].save(path, "PDF", save_all=True, append_images=images[1:])
+
+
+class FakeTracker:
+    """Async Textract stand-in: each shard takes 0.2s"""
+
+    def __init__(self, uploads):
+        self.uploads = uploads
+
+    def submit(self, key):
+        future = Future()
+
+        def run():
+            time.sleep(0.2)
+            pages = len(PdfReader(BytesIO(self.uploads[key])).pages)
+            future.set_result({"pages": [{"page_number": n, "text": f"{key} p{n}"} for n in range(1, pages + 1)]})
+        threading.Thread(target=run).start()
+        return future
+
+
+def test_plan_shards():
+    assert plan_shards(11, 5) == [(1, 5), (6, 10), (11, 11)]
+    assert plan_shards(4, 5) == [(1, 4)]
+    assert plan_shards(3, 1) == [(1, 1), (2, 2), (3, 3)]
+    print("✅ Shard plan covers every page once")
+
+
+def test_long_scan_is_sharded_and_reassembled():
+    uploads, deleted = {}, []
+
+    def single_page(data, label):
+        time.sleep(0.2)
+        return {"pages": [{"page_number": 1, "text": f"sync {label}"}]}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        policy = Path(tmp) / "policy.pdf"
+        _scanned_pdf(policy, 11)
+
+        with patch.object(settings, "ocr_shard_pages", 5), \
+             patch.object(settings, "ocr_shard_min_pages", 8), \
+             patch.object(ocr_service, "_ocr_cache", None), \
+             patch.object(engines, "detect_document_from_s3_file") as whole_doc, \
+             patch.object(sharded_ocr, "upload_bytes_to_s3", side_effect=lambda data, key: uploads.__setitem__(key, data)), \
+             patch.object(sharded_ocr, "delete_multiple_files_from_s3", side_effect=deleted.extend), \
+             patch.object(sharded_ocr, "detect_document_bytes_with_textract", side_effect=single_page), \
+             patch.object(sharded_ocr, "get_textract_tracker", return_value=FakeTracker(uploads)):
+            start = time.monotonic()
+            pages = ocr_service.extract_pages_from_document(str(policy), "audits/AUD-1/policy.pdf")
+            elapsed = time.monotonic() - start
+
+    assert whole_doc.call_count == 0
+    assert [p.page_number for p in pages] == list(range(1, 12))
+    assert pages[6].text == "audits/AUD-1/policy.pdf.shards/0006-0010.pdf p2"
+    assert pages[10].text == "sync policy.pdf page 11"
+    assert sorted(deleted) == sorted(uploads) and len(uploads) == 2
+    # Three 0.2s shards in parallel, not 0.6s in sequence
+    assert elapsed < 0.5, f"Shards did not run concurrently ({elapsed:.2f}s)"
+    print(f"✅ 11-page scan OCR'd in 3 concurrent shards ({elapsed:.2f}s), pages in order")
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate_per_second=20, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+    # First token is free, the next four need 4 x 50ms
+    assert 0.15 <= elapsed < 0.5, elapsed
+    print(f"✅ Token bucket paced 5 calls at 20/s ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    test_plan_shards()
+    test_long_scan_is_sharded_and_reassembled()
+    test_token_bucket_rate()
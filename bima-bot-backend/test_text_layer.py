@@ -0,0 +1,120 @@
+"""
+Test Born-Digital PDF Fast Path / Per-Page Hybrid OCR (No Real AWS Required)
+
+Checks that:
+1. Clean text layers score high; empty / broken ones score zero
+2. A reportlab-generated bill is read locally without calling Textract
+3. An image-only (scanned) PDF falls back to Textract
+4. In a mixed PDF only the scanned page goes to Textract, and page
+   numbers survive stitching
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from PIL import Image
+from reportlab.pdfgen import canvas
+
+from app.services.ocr import engines, ocr_service
+from app.services.ocr.text_layer import score_text_layer, extract_text_layer
+
+TEXTRACT_RESULT = {"text": "scanned text from textract",
+                   "pages": [{"page_number": 1, "text": "scanned text from textract"}], "line_count": 1, "page_count": 1,
+                   "mean_confidence": 90.0, "textract_api": "sync"}
+
+
+def _digital_pdf(path):
+    c = canvas.Canvas(str(path))
+    lines = ["APOLLO HOSPITALS - Final Bill", "Patient Name: John Doe",
+             "Room Rent (3 days)   Rs 15,000.00", "Surgical Gloves   Rs 500.00", "Total   Rs 15,500.00"]
+    for i, line in enumerate(lines):
+        c.drawString(72, 750 - i * 20, line)
+    c.save()
+
+
+def _scanned_pdf(path):
+    Image.new("RGB", (850, 1100), "white").save(path, "PDF")
+
+
+def _mixed_pdf(path, tmp):
+    """Pages 1 and 3 digital, page 2 a scanned endorsement"""
+    scan = Path(tmp) / "endorsement.png"
+    Image.new("RGB", (850, 1100), "white").save(scan)
+    c = canvas.Canvas(str(path))
+    c.drawString(72, 750, "Section 1: Sum insured Rs 5,00,000 per policy year.")
+    c.showPage()
+    c.drawImage(str(scan), 0, 0, width=595, height=842)
+    c.showPage()
+    c.drawString(72, 750, "Section 3: Room rent is limited to 1% of the sum insured per day.")
+    c.save()
+
+
+def test_quality_scores():
+    assert score_text_layer("Room Rent (3 days) Rs 15,000.00\nSurgical Gloves Rs 500.00") >= 0.8
+    assert score_text_layer("") == 0.0
+    assert score_text_layer("   \n  ") == 0.0
+    assert score_text_layer("(cid:12)(cid:45) (cid:7)(cid:9) (cid:3) garbage layer from broken font") == 0.0
+    print("✅ Text-layer quality scores separate clean text from scans / broken fonts")
+
+
+def test_digital_pdf_skips_textract():
+    with tempfile.TemporaryDirectory() as tmp:
+        bill = Path(tmp) / "bill.pdf"
+        _digital_pdf(bill)
+        assert extract_text_layer(str(bill)).scanned_pages(0.8) == []
+
+        with patch.object(ocr_service, "_ocr_cache", None), \
+             patch.object(engines, "detect_document_from_s3_file", return_value=dict(TEXTRACT_RESULT)) as textract:
+            text = ocr_service.extract_text_from_document(str(bill), "audits/AUD-1/bill.pdf")
+
+        assert textract.call_count == 0
+        assert "Surgical Gloves" in text and "15,500.00" in text
+    print("✅ Born-digital bill read from its text layer, Textract not called")
+
+
+def test_scanned_pdf_uses_textract():
+    with tempfile.TemporaryDirectory() as tmp:
+        scan = Path(tmp) / "policy.pdf"
+        _scanned_pdf(scan)
+        assert extract_text_layer(str(scan)).scanned_pages(0.8) == [1]
+
+        with patch.object(ocr_service, "_ocr_cache", None), \
+             patch.object(engines, "detect_document_from_s3_file", return_value=dict(TEXTRACT_RESULT)) as textract:
+            text = ocr_service.extract_text_from_document(str(scan), "audits/AUD-1/policy.pdf")
+
+        assert textract.call_count == 1
+        assert text == TEXTRACT_RESULT["text"]
+    print("✅ Scanned PDF falls back to Textract")
+
+
+def test_mixed_pdf_sends_only_scanned_pages():
+    page_result = {"text": "Endorsement: Cataract sub-limit Rs 40,000", "line_count": 1,
+                   "pages": [{"page_number": 1, "text": "Endorsement: Cataract sub-limit Rs 40,000"}]}
+    with tempfile.TemporaryDirectory() as tmp:
+        policy = Path(tmp) / "policy.pdf"
+        _mixed_pdf(policy, tmp)
+
+        with patch.object(ocr_service, "_ocr_cache", None), \
+             patch.object(engines, "detect_document_from_s3_file") as whole_doc, \
+             patch.object(engines, "detect_document_bytes_with_textract", return_value=page_result) as per_page:
+            pages = ocr_service.extract_pages_from_document(str(policy), "audits/AUD-1/policy.pdf")
+
+        assert whole_doc.call_count == 0
+        assert per_page.call_count == 1
+        # Textract received a standalone single-page PDF
+        assert per_page.call_args[0][0].startswith(b"%PDF-")
+        assert [(p.page_number, p.source) for p in pages] == [(1, "text_layer"), (2, "textract"), (3, "text_layer")]
+        assert "Cataract sub-limit" in pages[1].text
+        assert "Room rent is limited" in pages[2].text
+    print("✅ Mixed PDF: only the scanned page went to Textract, page numbers kept")
+
+
+if __name__ == "__main__":
+    test_quality_scores()
+    test_digital_pdf_skips_textract()
+    test_scanned_pdf_uses_textract()
+    test_mixed_pdf_sends_only_scanned_pages()
@@ -0,0 +1,117 @@
+"""
+Test Async Textract Job Tracker (No Real AWS Required)
+
+Uses a fake Textract client to check that:
+1. Hundreds of concurrent jobs are tracked without a thread per job
+2. Paginated results are collected and summarised
+3. notify(job_id) wakes a waiting job before its backoff expires
+4. Failed and timed-out jobs raise AWSServiceError
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import wait
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services import aws_service
+from app.services.aws_service import AWSServiceError
+from app.services.textract_tracker import TextractJobTracker
+
+
+class FakeTextract:
+    """Jobs succeed after `polls_needed` status checks; results come in 2 pages"""
+
+    def __init__(self, polls_needed=3, status="SUCCEEDED"):
+        self.polls_needed = polls_needed
+        self.final_status = status
+        self.polls = {}
+        self.lock = threading.Lock()
+
+    def start_document_text_detection(self, DocumentLocation):
+        job_id = "job-" + DocumentLocation["S3Object"]["Name"]
+        with self.lock:
+            self.polls[job_id] = 0
+        return {"JobId": job_id}
+
+    def get_document_text_detection(self, JobId, NextToken=None):
+        if NextToken:
+            return {"JobStatus": "SUCCEEDED", "Blocks": [
+                {"BlockType": "LINE", "Text": f"{JobId} page 2", "Page": 2, "Confidence": 98.0}
+            ]}
+        with self.lock:
+            self.polls[JobId] += 1
+            done = self.polls[JobId] >= self.polls_needed
+        if not done:
+            return {"JobStatus": "IN_PROGRESS"}
+        if self.final_status == "FAILED":
+            return {"JobStatus": "FAILED", "StatusMessage": "Unsupported"}
+        return {"JobStatus": "SUCCEEDED", "NextToken": "t1", "Blocks": [
+            {"BlockType": "PAGE", "Page": 1},
+            {"BlockType": "LINE", "Text": f"{JobId} page 1", "Page": 1, "Confidence": 96.0}
+        ]}
+
+
+def test_many_jobs_on_one_loop():
+    fake = FakeTextract(polls_needed=3)
+    tracker = TextractJobTracker(api_workers=4, initial_delay=0.01, max_delay=0.05, timeout=10)
+    threads_before = threading.active_count()
+
+    with patch.object(aws_service, "textract", fake):
+        futures = [tracker.submit(f"audits/AUD-{i}/policy.pdf") for i in range(300)]
+        # Tracker loop + API pool only, no matter how many jobs are in flight
+        assert threading.active_count() - threads_before <= 1 + 4
+        done, not_done = wait(futures, timeout=20)
+
+    assert not not_done
+    result = futures[7].result()
+    assert result["text"] == "job-audits/AUD-7/policy.pdf page 1\njob-audits/AUD-7/policy.pdf page 2"
+    assert result["page_count"] == 2 and result["textract_api"] == "async"
+    tracker.shutdown()
+    print("✅ 300 concurrent Textract jobs tracked on one event loop")
+
+
+def test_notify_wakes_waiting_job():
+    fake = FakeTextract(polls_needed=2)
+    tracker = TextractJobTracker(api_workers=1, initial_delay=5.0, max_delay=5.0, timeout=30)
+
+    with patch.object(aws_service, "textract", fake):
+        start = time.monotonic()
+        future = tracker.submit("audits/AUD-N/bill.pdf")
+        for job_id in ("job-audits/AUD-N/bill.pdf",) * 2:
+            # Wait for the job to register, then signal completion
+            for _ in range(100):
+                if tracker.in_flight():
+                    break
+                time.sleep(0.01)
+            time.sleep(0.05)
+            tracker.notify(job_id)
+        future.result(timeout=5)
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 2, f"notify() should wake the job early ({elapsed:.2f}s)"
+    tracker.shutdown()
+    print(f"✅ Notification completed the job in {elapsed:.2f}s (backoff was 5s)")
+
+
+def test_failed_and_timed_out_jobs_raise():
+    tracker = TextractJobTracker(api_workers=1, initial_delay=0.01, max_delay=0.02, timeout=0.3)
+    for fake, expected in ((FakeTextract(polls_needed=1, status="FAILED"), "failed"),
+                           (FakeTextract(polls_needed=10_000), "timed out")):
+        with patch.object(aws_service, "textract", fake):
+            try:
+                tracker.submit("audits/AUD-X/bill.pdf").result(timeout=5)
+                raise AssertionError("Expected AWSServiceError")
+            except AWSServiceError as e:
+                assert expected in str(e), str(e)
+    tracker.shutdown()
+    print("✅ Failed / timed-out Textract jobs raise AWSServiceError")
+
+
+if __name__ == "__main__":
+    test_many_jobs_on_one_loop()
+    test_notify_wakes_waiting_job()
+    test_failed_and_timed_out_jobs_raise()
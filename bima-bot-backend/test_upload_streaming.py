@@ -0,0 +1,56 @@
+"""
+Test Streaming Upload Ingest
+
+Verifies chunked uploads:
+1. Hash and size match the original bytes
+2. Oversized uploads abort and leave nothing on disk
+"""
+
+import sys
+import asyncio
+import hashlib
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi import UploadFile
+from app.services.upload_service import stream_upload_to_disk, UploadTooLargeError
+
+
+def test_stream_upload_hash_and_size():
+    data = b"%PDF-1.4\n" + b"x" * 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        dest = Path(tmp) / "bill.pdf"
+        upload = UploadFile(file=BytesIO(data), filename="bill.pdf")
+
+        receipt = asyncio.run(stream_upload_to_disk(upload, dest, max_bytes=1_000_000, chunk_size=4096))
+
+        assert receipt.size_bytes == len(data)
+        assert receipt.sha256 == hashlib.sha256(data).hexdigest()
+        assert dest.read_bytes() == data
+        print(f"✅ Streamed {receipt.size_bytes} bytes, sha256={receipt.sha256[:12]}...")
+
+
+def test_stream_upload_rejects_oversized():
+    data = b"y" * 50_000
+    with tempfile.TemporaryDirectory() as tmp:
+        dest = Path(tmp) / "policy.pdf"
+        upload = UploadFile(file=BytesIO(data), filename="policy.pdf")
+
+        try:
+            asyncio.run(stream_upload_to_disk(upload, dest, max_bytes=10_000, chunk_size=4096))
+            raise AssertionError("Expected UploadTooLargeError")
+        except UploadTooLargeError:
+            pass
+
+        assert not dest.exists()
+        assert list(Path(tmp).iterdir()) == []
+        print("✅ Oversized upload aborted with no partial file left behind")
+
+
+if __name__ == "__main__":
+    test_stream_upload_hash_and_size()
+    test_stream_upload_rejects_oversized()